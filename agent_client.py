@@ -0,0 +1,230 @@
+import asyncio
+import http.client
+import json
+import queue
+import socket
+import time
+from typing import Any, Iterator, List, Tuple
+
+
+class AgentClient:
+    """
+    HTTP client for the coverage monitoring agent. Keep-alive connections are pooled and reused across requests,
+    failed connections are retried with a linear backoff.
+    """
+
+    def __init__(self, port: int, host: str = 'localhost', timeout: float = 10.0, retries: int = 2,
+                 backoff: float = 0.1, pool_size: int = 4):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        # Bytes of the response bodies received by fetch_all, as sent by the agent before decoding
+        self.received_bytes = 0
+        # Paths whose last request failed, their errors are printed once until they succeed again
+        self.__failing_paths = set()
+        self.__pool: queue.LifoQueue = queue.LifoQueue(maxsize=pool_size)
+
+    def get(self, path: str) -> Tuple[int, bytes]:
+        """
+        Sends a GET request to the agent and reads the whole response body
+        Args:
+            path: request path, e.g. /methodcoverage
+
+        Returns:
+            Tuple[int, bytes]: status code and response body
+        """
+        with self.stream(path) as response:
+            return response.status, response.read()
+
+    def get_json(self, path: str) -> Any:
+        """
+        Sends a GET request to the agent and parses the response body as JSON
+        Args:
+            path: request path
+
+        Returns:
+            Any: parsed response
+        """
+        with self.stream(path) as response:
+            return json.load(response)
+
+    def stream(self, path: str) -> '_PooledResponse':
+        """
+        Sends a GET request to the agent and returns the response without reading its body, so that it can be
+        consumed incrementally. The connection goes back to the pool once the response is closed.
+        Args:
+            path: request path
+
+        Returns:
+            _PooledResponse: file-like response, to be used as a context manager
+        """
+        attempt = 0
+        while True:
+            connection = self.__acquire()
+            try:
+                connection.request('GET', path, headers={'Connection': 'keep-alive'})
+                return _PooledResponse(self, connection, connection.getresponse())
+            except (http.client.HTTPException, ConnectionError, socket.timeout, OSError):
+                connection.close()
+                if attempt >= self.retries:
+                    raise
+                attempt += 1
+                time.sleep(self.backoff * attempt)
+
+    def fetch_all(self, paths: List[str]) -> List[Tuple[int, Any]]:
+        """
+        Sends GET requests for the given paths concurrently and returns their decoded responses
+        Args:
+            paths: request paths
+
+        Returns:
+            List[Tuple[int, Any]]: status code and response text per path, in the same order as the paths.
+            A failed request is returned as (-100, exception), its error is printed only if the previous request of
+            the path succeeded, so that polling an unavailable agent does not repeat it.
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            raw_responses = asyncio.run(AsyncAgentClient(self).get_many(paths))
+        else:
+            # Already inside an event loop, fall back to sequential requests
+            raw_responses = []
+            for path in paths:
+                try:
+                    raw_responses.append(self.get(path))
+                except Exception as e:
+                    raw_responses.append((-100, e))
+
+        responses = []
+        for path, (status_code, response) in zip(paths, raw_responses):
+            if isinstance(response, Exception):
+                if path not in self.__failing_paths:
+                    print(f"Error executing http request: {path}: {response}")
+                    self.__failing_paths.add(path)
+                responses.append((-100, response))
+            else:
+                self.__failing_paths.discard(path)
+                self.received_bytes += len(response)
+                responses.append((status_code, response.decode('utf-8', errors='replace').strip()))
+        return responses
+
+    def close(self):
+        """
+        Closes all the pooled connections
+        """
+        while True:
+            try:
+                self.__pool.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def _release(self, connection: http.client.HTTPConnection, reusable: bool):
+        """
+        Returns a connection to the pool, or closes it if it cannot be reused or the pool is full
+        """
+        if not reusable:
+            connection.close()
+            return
+        try:
+            self.__pool.put_nowait(connection)
+        except queue.Full:
+            connection.close()
+
+    def __acquire(self) -> http.client.HTTPConnection:
+        try:
+            return self.__pool.get_nowait()
+        except queue.Empty:
+            return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class _PooledResponse:
+    """
+    Agent response that hands its connection back to the pool when closed
+    """
+
+    def __init__(self, client: AgentClient, connection: http.client.HTTPConnection,
+                 response: http.client.HTTPResponse):
+        self.__client = client
+        self.__connection = connection
+        self.__response = response
+        self.status = response.status
+
+    def read(self, amount: int = None) -> bytes:
+        return self.__response.read(amount)
+
+    def iter_chunks(self, chunk_size: int = 65536) -> Iterator[bytes]:
+        """
+        Yields the response body in chunks
+        Args:
+            chunk_size:
+
+        Returns:
+            Iterator[bytes]: body chunks
+        """
+        while True:
+            chunk = self.__response.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+    def close(self):
+        if self.__connection is None:
+            return
+        # Drain the body so that the connection can serve the next request
+        reusable = not self.__response.will_close
+        if reusable:
+            try:
+                while self.__response.read(65536):
+                    pass
+            except (http.client.HTTPException, OSError):
+                reusable = False
+        self.__response.close()
+        self.__client._release(self.__connection, reusable)
+        self.__connection = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class AsyncAgentClient:
+    """
+    asyncio variant of the agent client, used to fetch several agent endpoints concurrently
+    """
+
+    def __init__(self, client: AgentClient):
+        self.client = client
+
+    async def get(self, path: str) -> Tuple[int, bytes]:
+        """
+        Sends a GET request to the agent without blocking the event loop
+        Args:
+            path: request path
+
+        Returns:
+            Tuple[int, bytes]: status code and response body
+        """
+        return await asyncio.to_thread(self.client.get, path)
+
+    async def get_many(self, paths: List[str]) -> List[Tuple[int, Any]]:
+        """
+        Sends GET requests for all the paths concurrently
+        Args:
+            paths: request paths
+
+        Returns:
+            List[Tuple[int, Any]]: status code and response body per path, in the same order as the paths.
+            A failed request is returned as (-100, exception).
+        """
+        responses = await asyncio.gather(*[self.get(path) for path in paths], return_exceptions=True)
+        return [(-100, response) if isinstance(response, Exception) else response for response in responses]
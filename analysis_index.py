@@ -0,0 +1,160 @@
+import hashlib
+import os
+import pickle
+import tempfile
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Optional, Union
+
+from analysis_loader import DependencyGraph, SymbolTable
+from call_graph_index import CallGraphIndex
+from db_line_index import DBLineIndex
+from type_hierarchy_index import TypeHierarchyIndex
+
+if TYPE_CHECKING:
+    from cldk.analysis.java import JavaAnalysis
+
+# Bump whenever the content or the layout of any of the indexes changes
+INDEX_FORMAT_VERSION = 2
+
+
+class AnalysisIndex:
+    """
+    All the indexes derived from the static analysis of an application: call graph adjacency with method line
+    ranges, code and entrypoints, interface implementors and database interaction lines
+    """
+
+    def __init__(self, call_graph: CallGraphIndex, type_hierarchy: TypeHierarchyIndex, db_lines: DBLineIndex):
+        self.call_graph = call_graph
+        self.type_hierarchy = type_hierarchy
+        self.db_lines = db_lines
+
+    @classmethod
+    def from_analysis(cls, analysis: Union['JavaAnalysis', SymbolTable],
+                      dependency_graph: Optional[DependencyGraph] = None) -> 'AnalysisIndex':
+        """
+        Builds all the indexes from the analysis
+        Args:
+            analysis: CLDK analysis of the application, or its streamed symbol table
+            dependency_graph: streamed dependency graph to take the call edges from instead of the CLDK call graph,
+                so that the analysis does not need to be built at call graph level
+
+        Returns:
+            AnalysisIndex: analysis index
+        """
+        type_hierarchy = TypeHierarchyIndex.from_analysis(analysis)
+        call_edges = dependency_graph.get_call_edges() if dependency_graph is not None else None
+        return cls(CallGraphIndex.from_analysis(analysis, type_hierarchy.concrete_classes, call_edges),
+                   type_hierarchy, DBLineIndex.from_analysis(analysis))
+
+    def save(self, path: Union[str, Path]):
+        """
+        Writes the indexes to the given file. The file is replaced atomically, so concurrent readers never see a
+        partially written index.
+        Args:
+            path: index file
+        """
+        state = {"version": INDEX_FORMAT_VERSION,
+                 "call_graph": (self.call_graph.methods, self.call_graph.start_lines, self.call_graph.end_lines,
+                                self.call_graph.successors, self.call_graph.entrypoints,
+                                self.call_graph.method_codes, self.call_graph.accessed_fields),
+                 "implementors": self.type_hierarchy.implementors,
+                 "db_lines": self.db_lines.methods_by_class}
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        try:
+            with os.fdopen(file_descriptor, 'wb') as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary_path, path)
+        except BaseException:
+            os.unlink(temporary_path)
+            raise
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> Optional['AnalysisIndex']:
+        """
+        Reads the indexes from the given file
+        Args:
+            path: index file
+
+        Returns:
+            Optional[AnalysisIndex]: analysis index, or None if the file is missing or has another format version
+        """
+        try:
+            with open(path, 'rb') as f:
+                state = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        if not isinstance(state, dict) or state.get("version") != INDEX_FORMAT_VERSION:
+            return None
+        return cls(CallGraphIndex(*state["call_graph"]), TypeHierarchyIndex(state["implementors"]),
+                   DBLineIndex(state["db_lines"]))
+
+
+class AnalysisIndexCache:
+    """
+    On-disk cache of analysis indexes, keyed by a content hash of the analysis.json they were derived from.
+    A cache hit loads the indexes without importing or running CLDK, and a miss can build them without CLDK too.
+    """
+
+    def __init__(self, cache_dir: Union[str, Path]):
+        self.cache_dir = Path(cache_dir)
+
+    @staticmethod
+    def get_analysis_hash(analysis_json_path: Union[str, Path]) -> str:
+        """
+        Computes the content hash of an analysis file
+        Args:
+            analysis_json_path: analysis.json file
+
+        Returns:
+            str: SHA-256 hex digest of the file
+        """
+        digest = hashlib.sha256()
+        with open(analysis_json_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def get_index_path(self, analysis_hash: str) -> Path:
+        return self.cache_dir.joinpath(f"{analysis_hash}.v{INDEX_FORMAT_VERSION}.index")
+
+    def load(self, analysis_json_path: Union[str, Path]) -> Optional[AnalysisIndex]:
+        """
+        Loads the cached indexes of the given analysis file
+        Args:
+            analysis_json_path: analysis.json file
+
+        Returns:
+            Optional[AnalysisIndex]: analysis index, or None if it is not cached
+        """
+        return AnalysisIndex.load(self.get_index_path(self.get_analysis_hash(analysis_json_path)))
+
+    def get_or_build(self, analysis_json_path: Union[str, Path],
+                     build_analysis: Optional[Callable[[], 'JavaAnalysis']] = None,
+                     dependency_graph: Optional[DependencyGraph] = None) -> AnalysisIndex:
+        """
+        Loads the cached indexes of the given analysis file, or builds and caches them
+        Args:
+            analysis_json_path: analysis.json file
+            build_analysis: creates the CLDK analysis, only called on a cache miss. If None, the symbol table is
+                streamed from the analysis file instead, which also reads files CLDK cannot, e.g. with invalid UTF-8
+            dependency_graph: streamed dependency graph to take the call edges from on a cache miss. If None, it is
+                streamed from the analysis file when no build_analysis is given, and the CLDK call graph is used
+                otherwise
+
+        Returns:
+            AnalysisIndex: analysis index
+        """
+        index_path = self.get_index_path(self.get_analysis_hash(analysis_json_path))
+        analysis_index = AnalysisIndex.load(index_path)
+        if analysis_index is None:
+            if build_analysis is None:
+                analysis = SymbolTable.load(analysis_json_path)
+                if dependency_graph is None:
+                    dependency_graph = DependencyGraph.load(analysis_json_path)
+            else:
+                analysis = build_analysis()
+            analysis_index = AnalysisIndex.from_analysis(analysis, dependency_graph)
+            analysis_index.save(index_path)
+        return analysis_index
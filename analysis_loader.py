@@ -0,0 +1,367 @@
+import codecs
+import json
+import re
+from array import array
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
+
+CALL_DEPENDENCY = "CALL_DEP"
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_STRUCTURE = re.compile(r'["{}\[\]]')
+_SCALAR = re.compile(r'[^,}\]\s]*')
+
+
+class _JSONStream:
+    """
+    Incremental reader over a JSON document. Bytes are decoded in chunks, invalid UTF-8 is replaced instead of
+    failing, and only the values that are asked for are materialized.
+    """
+
+    def __init__(self, f: BinaryIO, chunk_size: int):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self.json_decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.position = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """
+        Reads the next chunk, dropping the consumed part of the buffer
+        Returns:
+            bool: False if the end of the document was reached
+        """
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        self.eof = not chunk
+        self.buffer = self.buffer[self.position:] + self.decoder.decode(chunk, final=self.eof)
+        self.position = 0
+        return not self.eof
+
+    def peek(self) -> str:
+        self.skip_whitespace()
+        while self.position >= len(self.buffer):
+            if not self.fill():
+                raise ValueError("Unexpected end of the analysis file")
+            self.skip_whitespace()
+        return self.buffer[self.position]
+
+    def expect(self, character: str):
+        if self.peek() != character:
+            raise ValueError(f"Expected '{character}' at offset {self.position} of the buffered analysis file")
+        self.position += 1
+
+    def skip_whitespace(self):
+        self.position = _WHITESPACE.match(self.buffer, self.position).end()
+
+    def decode_value(self):
+        """
+        Decodes the next value, reading more chunks until it is complete
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self.json_decoder.raw_decode(self.buffer, self.position)
+                # A value ending with the buffer, e.g. a number, may continue in the next chunk
+                if end < len(self.buffer) or self.eof:
+                    self.position = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self.fill()
+
+    def skip_value(self):
+        """
+        Skips the next value without decoding it
+        """
+        character = self.peek()
+        if character == '"':
+            self.position += 1
+            self.__skip_string_tail()
+        elif character in '{[':
+            depth = 0
+            while True:
+                match = _STRUCTURE.search(self.buffer, self.position)
+                if match is None:
+                    self.position = len(self.buffer)
+                    if not self.fill():
+                        raise ValueError("Unexpected end of the analysis file")
+                    continue
+                self.position = match.end()
+                if match.group() == '"':
+                    self.__skip_string_tail()
+                elif match.group() in '{[':
+                    depth += 1
+                else:
+                    depth -= 1
+                    if depth == 0:
+                        return
+        else:
+            while True:
+                self.position = _SCALAR.match(self.buffer, self.position).end()
+                if self.position < len(self.buffer) or not self.fill():
+                    return
+
+    def __skip_string_tail(self):
+        """
+        Skips the rest of a string whose opening quote was consumed
+        """
+        while True:
+            end = self.buffer.find('"', self.position)
+            while end != -1:
+                backslashes = 0
+                while end - 1 - backslashes >= 0 and self.buffer[end - 1 - backslashes] == '\\':
+                    backslashes += 1
+                if backslashes % 2 == 0:
+                    self.position = end + 1
+                    return
+                end = self.buffer.find('"', end + 1)
+            # Keep trailing backslashes in the buffer, they may escape the first quote of the next chunk
+            self.position = len(self.buffer)
+            while self.position > 0 and self.buffer[self.position - 1] == '\\':
+                self.position -= 1
+            if not self.fill():
+                raise ValueError("Unterminated string in the analysis file")
+
+
+def _iter_member(analysis_json_path: Union[str, Path], member: str,
+                 chunk_size: int) -> Iterator[Tuple[Optional[str], Any]]:
+    """
+    Yields the items of a top-level array or object of an analysis.json one at a time. Values before the member
+    are skipped without being decoded, and reading stops after its last item.
+    Args:
+        analysis_json_path: analysis.json file
+        member: key of the top-level member
+        chunk_size: number of bytes read at a time
+
+    Returns:
+        Iterator[Tuple[Optional[str], Any]]: key and value of every item, with None as key for array items
+    """
+    with open(analysis_json_path, 'rb') as f:
+        stream = _JSONStream(f, chunk_size)
+        stream.expect('{')
+        while stream.peek() != '}':
+            key = stream.decode_value()
+            stream.expect(':')
+            if key == member and stream.peek() in '[{':
+                closing = ']' if stream.peek() == '[' else '}'
+                stream.position += 1
+                while stream.peek() != closing:
+                    item_key = None
+                    if closing == '}':
+                        item_key = stream.decode_value()
+                        stream.expect(':')
+                    yield item_key, stream.decode_value()
+                    if stream.peek() == ',':
+                        stream.position += 1
+                return
+            else:
+                stream.skip_value()
+            if stream.peek() == ',':
+                stream.position += 1
+
+
+def iter_dependency_edges(analysis_json_path: Union[str, Path], chunk_size: int = 1 << 16) -> Iterator[dict]:
+    """
+    Yields the edges of the system_dependency_graph of an analysis.json one at a time. Values before the edges,
+    such as the symbol table, are skipped without being decoded, and reading stops after the last edge.
+    Args:
+        analysis_json_path: analysis.json file
+        chunk_size: number of bytes read at a time
+
+    Returns:
+        Iterator[dict]: edges with source, target, type and weight
+    """
+    for _, edge in _iter_member(analysis_json_path, "system_dependency_graph", chunk_size):
+        yield edge
+
+
+def iter_compilation_units(analysis_json_path: Union[str, Path],
+                           chunk_size: int = 1 << 16) -> Iterator[Tuple[str, dict]]:
+    """
+    Yields the compilation units of the symbol_table of an analysis.json one at a time
+    Args:
+        analysis_json_path: analysis.json file
+        chunk_size: number of bytes read at a time
+
+    Returns:
+        Iterator[Tuple[str, dict]]: file path and compilation unit
+    """
+    yield from _iter_member(analysis_json_path, "symbol_table", chunk_size)
+
+
+class SymbolTable:
+    """
+    Classes and methods of an application read from the symbol_table of an analysis.json, with the parts of the
+    JavaAnalysis interface the analysis indexes use. Compilation units are streamed one at a time and only the
+    fields the indexes need are kept, so that analysis files CLDK cannot read, e.g. with invalid UTF-8, can still
+    be indexed.
+    """
+
+    def __init__(self, classes: Dict[str, SimpleNamespace]):
+        self.classes = classes
+
+    @classmethod
+    def load(cls, analysis_json_path: Union[str, Path], chunk_size: int = 1 << 16) -> 'SymbolTable':
+        """
+        Streams the symbol_table of an analysis.json into a symbol table
+        Args:
+            analysis_json_path: analysis.json file
+            chunk_size: number of bytes read at a time
+
+        Returns:
+            SymbolTable: symbol table
+        """
+        classes = {}
+        for _, compilation_unit in iter_compilation_units(analysis_json_path, chunk_size):
+            for klazz, type_declaration in (compilation_unit.get("type_declarations") or {}).items():
+                classes[klazz] = cls.__get_class(type_declaration)
+        return cls(classes)
+
+    def get_classes(self) -> Dict[str, SimpleNamespace]:
+        return self.classes
+
+    def get_class(self, qualified_class_name: str) -> Optional[SimpleNamespace]:
+        return self.classes.get(qualified_class_name)
+
+    def get_method(self, qualified_class_name: str, qualified_method_name: str) -> Optional[SimpleNamespace]:
+        class_details = self.classes.get(qualified_class_name)
+        return class_details.callable_declarations.get(qualified_method_name) if class_details is not None else None
+
+    def get_methods_in_class(self, qualified_class_name: str) -> Dict[str, SimpleNamespace]:
+        return self.classes[qualified_class_name].callable_declarations
+
+    @staticmethod
+    def __get_class(type_declaration: dict) -> SimpleNamespace:
+        return SimpleNamespace(
+            is_interface=type_declaration.get("is_interface", False),
+            modifiers=type_declaration.get("modifiers") or [],
+            implements_list=type_declaration.get("implements_list") or [],
+            extends_list=type_declaration.get("extends_list") or [],
+            annotations=type_declaration.get("annotations") or [],
+            callable_declarations={signature: SymbolTable.__get_callable(callable_declaration)
+                                   for signature, callable_declaration in
+                                   (type_declaration.get("callable_declarations") or {}).items()})
+
+    @staticmethod
+    def __get_callable(callable_declaration: dict) -> SimpleNamespace:
+        return SimpleNamespace(
+            start_line=callable_declaration["start_line"], end_line=callable_declaration["end_line"],
+            is_entrypoint=callable_declaration.get("is_entrypoint", False),
+            is_constructor=callable_declaration.get("is_constructor", False),
+            declaration=callable_declaration.get("declaration", ""), code=callable_declaration.get("code", ""),
+            accessed_fields=callable_declaration.get("accessed_fields") or [],
+            annotations=callable_declaration.get("annotations") or [],
+            call_sites=[SimpleNamespace(receiver_type=call_site.get("receiver_type", ""),
+                                        callee_signature=call_site.get("callee_signature", ""),
+                                        start_line=call_site["start_line"])
+                        for call_site in callable_declaration.get("call_sites") or []],
+            crud_operations=[SimpleNamespace(line_number=crud_operation["line_number"])
+                             for crud_operation in callable_declaration.get("crud_operations") or []])
+
+
+class DependencyGraph:
+    """
+    System dependency graph of an application, with class names and method signatures interned into integer IDs.
+    Nodes are (class ID, signature ID) pairs and edges are stored in parallel arrays of node IDs.
+    """
+
+    def __init__(self):
+        self.classes: List[str] = []
+        self.signatures: List[str] = []
+        self.nodes: List[Tuple[int, int]] = []
+        self.edge_types: List[str] = []
+        self.edge_sources = array('i')
+        self.edge_targets = array('i')
+        self.edge_type_ids = array('b')
+        self.__class_ids: Dict[str, int] = {}
+        self.__signature_ids: Dict[str, int] = {}
+        self.__node_ids: Dict[Tuple[int, int], int] = {}
+        self.__edge_type_ids: Dict[str, int] = {}
+
+    @classmethod
+    def load(cls, analysis_json_path: Union[str, Path], chunk_size: int = 1 << 16) -> 'DependencyGraph':
+        """
+        Streams the system_dependency_graph of an analysis.json into a dependency graph
+        Args:
+            analysis_json_path: analysis.json file
+            chunk_size: number of bytes read at a time
+
+        Returns:
+            DependencyGraph: dependency graph
+        """
+        dependency_graph = cls()
+        for edge in iter_dependency_edges(analysis_json_path, chunk_size):
+            dependency_graph.add_edge(edge["source"]["type_declaration"], edge["source"]["signature"],
+                                      edge["target"]["type_declaration"], edge["target"]["signature"],
+                                      edge["type"])
+        return dependency_graph
+
+    def add_edge(self, source_class: str, source_signature: str, target_class: str, target_signature: str,
+                 edge_type: str):
+        edge_type_id = self.__edge_type_ids.get(edge_type)
+        if edge_type_id is None:
+            edge_type_id = self.__edge_type_ids[edge_type] = len(self.edge_types)
+            self.edge_types.append(edge_type)
+        self.edge_sources.append(self.get_node_id(source_class, source_signature))
+        self.edge_targets.append(self.get_node_id(target_class, target_signature))
+        self.edge_type_ids.append(edge_type_id)
+
+    def get_node_id(self, qualified_class_name: str, method_signature: str) -> int:
+        """
+        Returns the ID of the given method, adding it to the graph if needed
+        """
+        class_id = self.__class_ids.get(qualified_class_name)
+        if class_id is None:
+            class_id = self.__class_ids[qualified_class_name] = len(self.classes)
+            self.classes.append(qualified_class_name)
+        signature_id = self.__signature_ids.get(method_signature)
+        if signature_id is None:
+            signature_id = self.__signature_ids[method_signature] = len(self.signatures)
+            self.signatures.append(method_signature)
+        node = (class_id, signature_id)
+        node_id = self.__node_ids.get(node)
+        if node_id is None:
+            node_id = self.__node_ids[node] = len(self.nodes)
+            self.nodes.append(node)
+        return node_id
+
+    def get_node(self, node_id: int) -> Tuple[str, str]:
+        """
+        Returns:
+            Tuple[str, str]: class name and method signature of the node
+        """
+        class_id, signature_id = self.nodes[node_id]
+        return self.classes[class_id], self.signatures[signature_id]
+
+    def get_edges(self, edge_type: str) -> Iterator[Tuple[int, int]]:
+        """
+        Yields the source and target node IDs of all the edges of the given type
+        Args:
+            edge_type: CALL_DEP, CONTROL_DEP or DATA_DEP
+
+        Returns:
+            Iterator[Tuple[int, int]]: source and target node IDs
+        """
+        if edge_type not in self.__edge_type_ids:
+            return
+        edge_type_id = self.__edge_type_ids[edge_type]
+        for source, target, type_id in zip(self.edge_sources, self.edge_targets, self.edge_type_ids):
+            if type_id == edge_type_id:
+                yield source, target
+
+    def get_call_edges(self) -> Iterator[Tuple[Tuple[str, str], Tuple[str, str]]]:
+        """
+        Yields the call edges in the node format of the CLDK call graph, (method signature, class name)
+        Returns:
+            Iterator[Tuple[Tuple[str, str], Tuple[str, str]]]: source and target nodes
+        """
+        for source, target in self.get_edges(CALL_DEPENDENCY):
+            source_class, source_signature = self.get_node(source)
+            target_class, target_signature = self.get_node(target)
+            yield (source_signature, source_class), (target_signature, target_class)
@@ -0,0 +1,396 @@
+import argparse
+import gc
+import json
+import math
+import pickle
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import networkx as nx
+
+from analysis_index import AnalysisIndex
+from coverage_snapshot import CoverageSnapshot
+from emb_coverage import EMBCoverage
+from reachability_emb import EMBReachability
+
+BASELINE_PATH = Path(__file__).parent.joinpath('benchmark_baseline.json')
+DEFAULT_SIZES = [50, 100, 200, 400]
+# Lines taken by each synthetic method, calls start on the line after the declaration
+METHOD_LENGTH = 12
+
+
+class SyntheticAnalysis:
+    """
+    Generated application model with the parts of the JavaAnalysis interface used by the coverage evaluation.
+    Classes are arranged in call_depth layers: methods of layer 0 are the endpoints, and every method calls
+    methods of the next layer, either directly or through an interface implemented by interface_fan_out classes.
+    """
+
+    def __init__(self, num_classes: int = 100, methods_per_class: int = 8, interface_fan_out: int = 2,
+                 call_depth: int = 4, calls_per_method: int = 3, crud_density: float = 0.2,
+                 entity_density: float = 0.1, transactional_density: float = 0.1, seed: int = 0):
+        rnd = random.Random(seed)
+        self.classes: Dict[str, SimpleNamespace] = {}
+        self.call_graph = nx.DiGraph()
+        layers: List[List[str]] = [[] for _ in range(call_depth)]
+        for class_number in range(num_classes):
+            layer_number = class_number * call_depth // num_classes
+            layers[layer_number].append(f"app.layer{layer_number}.Class{class_number}")
+        signatures = [f"m{method_number}(String)" for method_number in range(methods_per_class)]
+
+        # Every group of interface_fan_out classes below the endpoints implements one interface
+        interfaces: Dict[str, List[str]] = {}
+        interface_of: Dict[str, str] = {}
+        for layer_number, layer in enumerate(layers[1:], start=1):
+            for group_start in range(0, len(layer), interface_fan_out):
+                interface = f"app.layer{layer_number}.Interface{len(interfaces)}"
+                interfaces[interface] = layer[group_start:group_start + interface_fan_out]
+                for klazz in interfaces[interface]:
+                    interface_of[klazz] = interface
+        entity_classes = {klazz for klazz in layers[-1] if rnd.random() < entity_density}
+
+        for layer_number, layer in enumerate(layers):
+            callees = layers[layer_number + 1] if layer_number + 1 < call_depth else []
+            for klazz in layer:
+                methods = {}
+                for method_number, signature in enumerate(signatures):
+                    start_line = 10 + method_number * METHOD_LENGTH
+                    call_sites = []
+                    for call_number in range(min(calls_per_method, len(callees))):
+                        callee_class = rnd.choice(callees)
+                        callee_signature = f"m{rnd.randrange(methods_per_class)}(java.lang.String)"
+                        line = start_line + 1 + call_number
+                        if rnd.random() < 0.5 and callee_class in interface_of:
+                            receiver_type = interface_of[callee_class]
+                        else:
+                            receiver_type = callee_class
+                            self.call_graph.add_edge((signature, klazz),
+                                                     (callee_signature.replace('java.lang.', ''), callee_class))
+                        call_sites.append(SimpleNamespace(receiver_type=receiver_type,
+                                                          callee_signature=callee_signature, start_line=line))
+                    crud_lines = [start_line + METHOD_LENGTH - 3] if rnd.random() < crud_density else []
+                    methods[signature] = self.create_method(
+                        start_line, start_line + METHOD_LENGTH - 2, call_sites, is_entrypoint=layer_number == 0,
+                        annotations=['@Transactional'] if rnd.random() < transactional_density else [],
+                        crud_lines=crud_lines)
+                self.classes[klazz] = self.create_class(
+                    methods, implements_list=[interface_of[klazz]] if klazz in interface_of else [],
+                    annotations=['@Entity'] if klazz in entity_classes else [])
+        for interface in interfaces:
+            self.classes[interface] = self.create_class(
+                {signature: self.create_method(10 + method_number, 10 + method_number)
+                 for method_number, signature in enumerate(signatures)}, is_interface=True)
+
+    @staticmethod
+    def create_method(start_line: int, end_line: int, call_sites: Optional[list] = None, is_entrypoint: bool = False,
+                      annotations: Optional[List[str]] = None, crud_lines: Optional[List[int]] = None):
+        return SimpleNamespace(start_line=start_line, end_line=end_line, call_sites=call_sites or [],
+                               is_entrypoint=is_entrypoint, is_constructor=False, declaration='', code='',
+                               accessed_fields=[], annotations=annotations or [],
+                               crud_operations=[SimpleNamespace(line_number=line) for line in crud_lines or []])
+
+    @staticmethod
+    def create_class(methods: dict, is_interface: bool = False, implements_list: Optional[List[str]] = None,
+                     annotations: Optional[List[str]] = None):
+        return SimpleNamespace(callable_declarations=methods, is_interface=is_interface,
+                               implements_list=implements_list or [], extends_list=[],
+                               modifiers=['public', 'abstract'] if is_interface else ['public'],
+                               annotations=annotations or [])
+
+    def get_classes(self) -> Dict[str, SimpleNamespace]:
+        return self.classes
+
+    def get_class(self, qualified_class_name: str) -> Optional[SimpleNamespace]:
+        return self.classes.get(qualified_class_name)
+
+    def get_method(self, qualified_class_name: str, qualified_method_name: str) -> Optional[SimpleNamespace]:
+        class_details = self.classes.get(qualified_class_name)
+        return class_details.callable_declarations.get(qualified_method_name) if class_details is not None else None
+
+    def get_methods_in_class(self, qualified_class_name: str) -> Dict[str, SimpleNamespace]:
+        return self.classes[qualified_class_name].callable_declarations
+
+    def get_call_graph(self) -> nx.DiGraph:
+        return self.call_graph
+
+
+def generate_payloads(analysis: SyntheticAnalysis, coverage: float = 0.6, seed: int = 0) -> Dict[str, bytes]:
+    """
+    Generates agent responses matching the methods of the analysis
+    Args:
+        analysis: synthetic analysis
+        coverage: probability of a line being covered
+        seed: random seed
+
+    Returns:
+        Dict[str, bytes]: response body of each agent path
+    """
+    rnd = random.Random(seed)
+    method_coverage = {}
+    uncovered_lines = {}
+    for klazz, class_details in analysis.get_classes().items():
+        if class_details.is_interface:
+            continue
+        for method_signature, method_details in class_details.callable_declarations.items():
+            key = f"{method_signature.split('(')[0]}:{method_details.start_line + 1}"
+            lines = list(range(method_details.start_line + 1, method_details.end_line + 1))
+            uncovered = [line for line in lines if rnd.random() >= coverage]
+            total_branches = rnd.randrange(5)
+            total_insts = len(lines) * 3
+            method_coverage.setdefault(klazz, {})[key] = {
+                "totalLines": len(lines), "coveredLines": len(lines) - len(uncovered),
+                "totalBranches": total_branches, "fullyCoveredBranches": rnd.randint(0, total_branches),
+                "totalInsts": total_insts, "coveredInsts": (len(lines) - len(uncovered)) * 3}
+            uncovered_lines.setdefault(klazz, {})[key] = uncovered
+    app_coverage = {"app": {"line": coverage * 100.0, "branch": coverage * 80.0, "instruction": coverage * 90.0}}
+    return {"/methodcoverage": json.dumps(method_coverage).encode(),
+            "/uncovered": json.dumps(uncovered_lines).encode(),
+            "/appcoverage": json.dumps(app_coverage).encode()}
+
+
+class StandInAgentServer:
+    """
+    In-process HTTP server answering the coverage monitoring agent paths with the given payloads. The payloads are
+    read on every request, so that changing them changes the agent's answers.
+    """
+
+    def __init__(self, payloads: Dict[str, Any]):
+        """
+        Args:
+            payloads: response body of every agent path, as bytes or as an object to encode as JSON, paths without
+                a payload are answered with 404
+        """
+        self.payloads = payloads
+        self.host = '127.0.0.1'
+        # Client addresses the server was connected from, to check connection reuse
+        self.connections: Set[Tuple[str, int]] = set()
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body are written separately, Nagle's algorithm would delay the body
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                stand_in.connections.add(self.client_address)
+                payload = stand_in.payloads.get(self.path)
+                if payload is None:
+                    self.send_error(404)
+                    return
+                body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((self.host, 0), Handler)
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def measure(setup: Callable[[], tuple], phase: Callable, repeat: int = 3) -> Dict[str, float]:
+    """
+    Measures a phase on fresh inputs: the best wall-clock time over repeat runs, then the peak memory allocated
+    during one more run under tracemalloc
+    Args:
+        setup: creates the arguments of the phase, not measured
+        phase: phase to measure
+        repeat: number of timed runs
+
+    Returns:
+        Dict[str, float]: seconds and peak bytes of the phase
+    """
+    seconds = math.inf
+    for _ in range(repeat):
+        arguments = setup()
+        # Like timeit, keep garbage collection pauses out of the timed runs
+        gc.collect()
+        gc.disable()
+        try:
+            started_at = time.perf_counter()
+            phase(*arguments)
+            seconds = min(seconds, time.perf_counter() - started_at)
+        finally:
+            gc.enable()
+    arguments = setup()
+    tracemalloc.start()
+    try:
+        phase(*arguments)
+        _, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"seconds": seconds, "peak_bytes": peak_bytes}
+
+
+def benchmark_size(num_classes: int, reachability_depth: int = 3, repeat: int = 3, **model_options) -> Dict[str, dict]:
+    """
+    Measures every phase of the coverage evaluation on a synthetic application of the given size
+    Args:
+        num_classes: number of concrete classes
+        reachability_depth: depth of the reachability analysis
+        repeat: number of timed runs per phase
+        **model_options: further arguments of SyntheticAnalysis
+
+    Returns:
+        Dict[str, dict]: seconds and peak bytes of each phase
+    """
+    analysis = SyntheticAnalysis(num_classes, **model_options)
+    # Each run gets its own copy of the indexes, so that memoized closures and lookups start cold
+    pickled_index = pickle.dumps(AnalysisIndex.from_analysis(analysis))
+    with StandInAgentServer(generate_payloads(analysis)) as server:
+        def create_emb_coverage() -> EMBCoverage:
+            return EMBCoverage(analysis, server.port, reachability_depth=reachability_depth,
+                               analysis_index=pickle.loads(pickled_index), agent_host=server.host)
+
+        def create_evaluation() -> Tuple[EMBCoverage, CoverageSnapshot]:
+            emb_coverage = create_emb_coverage()
+            snapshot = emb_coverage.refresh_snapshot()
+            # Parse the payloads up front so that only the joins are measured
+            _ = snapshot.method_coverage, snapshot.uncovered_lines, snapshot.app_coverage
+            return emb_coverage, snapshot
+
+        def capture(emb_coverage: EMBCoverage):
+            snapshot = emb_coverage.refresh_snapshot()
+            _ = snapshot.method_coverage, snapshot.uncovered_lines, snapshot.app_coverage
+
+        def get_all_reachable_methods(reachability: EMBReachability):
+            for endpoint in reachability.index.entrypoints:
+                reachability.get_reachable_methods(*reachability.index.methods[endpoint], depth=reachability_depth)
+
+        def get_db_coverage(emb_coverage: EMBCoverage, snapshot: CoverageSnapshot):
+            emb_coverage.db_line_index.get_db_coverage(snapshot.uncovered_lines)
+
+        def get_reachability_coverage(emb_coverage: EMBCoverage, snapshot: CoverageSnapshot):
+            emb_coverage.get_reachability_coverage(snapshot)
+
+        def get_app_coverage(emb_coverage: EMBCoverage, snapshot: CoverageSnapshot):
+            emb_coverage.get_app_coverage(snapshot)
+
+        phases = {"analysis_index": measure(lambda: (analysis,), AnalysisIndex.from_analysis, repeat),
+                  "capture": measure(lambda: (create_emb_coverage(),), capture, repeat),
+                  "reachable_methods": measure(lambda: (create_emb_coverage().reachability,),
+                                               get_all_reachable_methods, repeat),
+                  "db_coverage": measure(create_evaluation, get_db_coverage, repeat),
+                  "reachability_coverage": measure(create_evaluation, get_reachability_coverage, repeat),
+                  "app_coverage": measure(create_evaluation, get_app_coverage, repeat)}
+    return phases
+
+
+def run_benchmark(sizes: Optional[List[int]] = None, repeat: int = 3, **options) -> Dict[str, Dict[str, dict]]:
+    """
+    Measures every phase across a sweep of application sizes
+    Args:
+        sizes: numbers of concrete classes to generate
+        repeat: number of timed runs per phase
+        **options: further arguments of benchmark_size
+
+    Returns:
+        Dict[str, Dict[str, dict]]: seconds and peak bytes of each phase, per size
+    """
+    return {str(size): benchmark_size(size, repeat=repeat, **options) for size in sizes or DEFAULT_SIZES}
+
+
+def get_scaling_exponents(results: Dict[str, Dict[str, dict]]) -> Dict[str, float]:
+    """
+    Estimates how each phase scales with the application size, as the log-log slope of its time between the
+    smallest and the largest size: about 1 for linear phases and 2 for quadratic ones
+    """
+    sizes = sorted(results, key=int)
+    if len(sizes) < 2:
+        return {}
+    smallest, largest = results[sizes[0]], results[sizes[-1]]
+    size_ratio = math.log(int(sizes[-1]) / int(sizes[0]))
+    return {phase: round(math.log(max(largest[phase]["seconds"], 1e-9) /
+                                  max(smallest[phase]["seconds"], 1e-9)) / size_ratio, 2)
+            for phase in smallest}
+
+
+def compare_with_baseline(results: Dict[str, Dict[str, dict]], baseline: Dict[str, Dict[str, dict]],
+                          tolerance: float = 2.0, min_seconds: float = 0.005) -> List[str]:
+    """
+    Compares the results with a stored baseline
+    Args:
+        results: current results
+        baseline: baseline results
+        tolerance: ratio to the baseline above which a phase is reported
+        min_seconds: phases faster than this in both runs are not compared in time, they are dominated by noise
+
+    Returns:
+        List[str]: description of every regression
+    """
+    regressions = []
+    for size, phases in results.items():
+        for phase, measurement in phases.items():
+            reference = baseline.get(size, {}).get(phase)
+            if reference is None:
+                continue
+            if (max(measurement["seconds"], reference["seconds"]) >= min_seconds and
+                    measurement["seconds"] > reference["seconds"] * tolerance):
+                regressions.append(f"{phase} at {size} classes: {measurement['seconds']:.4f}s, "
+                                   f"baseline {reference['seconds']:.4f}s")
+            if measurement["peak_bytes"] > reference["peak_bytes"] * tolerance:
+                regressions.append(f"{phase} at {size} classes: {measurement['peak_bytes']} bytes peak, "
+                                   f"baseline {reference['peak_bytes']} bytes")
+    return regressions
+
+
+def print_results(results: Dict[str, Dict[str, dict]]):
+    for size, phases in results.items():
+        print(f"{size} classes")
+        for phase, measurement in phases.items():
+            print(f"  {phase:<24}{measurement['seconds'] * 1000:>10.2f} ms"
+                  f"{measurement['peak_bytes'] / 1024:>12.1f} KiB")
+    for phase, exponent in get_scaling_exponents(results).items():
+        print(f"{phase} scales as size^{exponent}")
+
+
+def main(arguments: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Measures the coverage evaluation on synthetic applications")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="numbers of classes")
+    parser.add_argument('--repeat', type=int, default=5, help="timed runs per phase")
+    parser.add_argument('--depth', type=int, default=3, help="reachability depth")
+    parser.add_argument('--baseline', type=Path, default=BASELINE_PATH, help="baseline file")
+    parser.add_argument('--save-baseline', action='store_true', help="store the results as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=2.0, help="allowed ratio to the baseline")
+    parsed = parser.parse_args(arguments)
+
+    results = run_benchmark(parsed.sizes, parsed.repeat, reachability_depth=parsed.depth)
+    print_results(results)
+    if parsed.save_baseline:
+        with open(parsed.baseline, 'w') as f:
+            json.dump(results, f, indent=4)
+        print(f"Baseline stored in {parsed.baseline}")
+        return 0
+    if not parsed.baseline.exists():
+        print(f"No baseline in {parsed.baseline}")
+        return 0
+    with open(parsed.baseline) as f:
+        regressions = compare_with_baseline(results, json.load(f), parsed.tolerance)
+    for regression in regressions:
+        print(f"Regression: {regression}")
+    return 1 if len(regressions) > 0 else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
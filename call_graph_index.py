@@ -0,0 +1,193 @@
+import re
+from functools import lru_cache
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Optional, Tuple
+
+from coverage_metrics import EvaluationMetrics
+
+if TYPE_CHECKING:
+    from cldk.analysis.java import JavaAnalysis
+
+CALLEE_TYPE_PATTERN = re.compile(r"\b(?:[a-zA-Z_][\w\.]*\.)+([a-zA-Z_][\w]*)\b|<[^>]*>")
+
+
+class CallGraphIndex:
+    """
+    Integer-ID index over the methods of an application and the edges between them. Methods are numbered once,
+    successors are stored as tuples of method IDs and depth-bounded reachable sets are memoized, so that endpoints
+    sharing services or repositories do not walk them again.
+    """
+
+    def __init__(self, methods: List[Tuple[str, str]], start_lines: List[int], end_lines: List[int],
+                 successors: List[Tuple[int, ...]], entrypoints: List[int], method_codes: Optional[List[str]] = None,
+                 accessed_fields: Optional[List[Tuple[str, ...]]] = None):
+        self.methods = methods
+        self.start_lines = start_lines
+        self.end_lines = end_lines
+        self.successors = successors
+        self.entrypoints = entrypoints
+        # Declaration and code, and accessed fields of every method, None if the index was built without them
+        self.method_codes = method_codes
+        self.accessed_fields = accessed_fields
+        self.method_ids: Dict[Tuple[str, str], int] = {method: method_id for method_id, method in enumerate(methods)}
+        self.__closures: Dict[Tuple[int, int], Tuple[int, ...]] = {}
+        # Metrics of the current evaluation, None if disabled
+        self.metrics: Optional[EvaluationMetrics] = None
+
+    @classmethod
+    def from_analysis(cls, analysis: 'JavaAnalysis', concrete_classes: Callable[[str], List[str]],
+                      call_edges: Optional[Iterable[Tuple[Tuple[str, str], Tuple[str, str]]]] = None
+                      ) -> 'CallGraphIndex':
+        """
+        Builds the index from the symbol table and the call graph of the analysis
+        Args:
+            analysis: CLDK analysis of the application
+            concrete_classes: returns the concrete classes implementing the given interface or abstract class
+            call_edges: (method signature, class name) source and target of every call, read from the CLDK call
+                graph if not given
+
+        Returns:
+            CallGraphIndex: index over all the methods declared in the application, with their code and accessed
+            fields
+        """
+        methods = []
+        start_lines = []
+        end_lines = []
+        method_codes = []
+        accessed_fields = []
+        entrypoints = []
+        callables = []
+        all_classes = analysis.get_classes()
+        for klazz in all_classes:
+            class_details = all_classes[klazz]
+            if class_details is None:
+                continue
+            for method_signature, method_details in class_details.callable_declarations.items():
+                if method_details.is_entrypoint and not method_details.is_constructor:
+                    entrypoints.append(len(methods))
+                methods.append((klazz, method_signature))
+                start_lines.append(method_details.start_line)
+                end_lines.append(method_details.end_line)
+                method_codes.append(method_details.declaration + '\n' + method_details.code)
+                accessed_fields.append(tuple(method_details.accessed_fields))
+                callables.append(method_details)
+        method_ids = {method: method_id for method_id, method in enumerate(methods)}
+
+        # Calls on interface and abstract class receivers are dispatched to every concrete implementation
+        interface_successors: List[Dict[int, None]] = [{} for _ in methods]
+        for method_id, method_details in enumerate(callables):
+            interface_class_method_pairs: Dict[str, List[str]] = {}
+            for call_site in method_details.call_sites:
+                receiver_type = call_site.receiver_type
+                if not receiver_type:
+                    continue
+                class_details = all_classes.get(receiver_type)
+                if class_details is not None and (class_details.is_interface or
+                                                  'abstract' in (class_details.modifiers or [])):
+                    interface_class_method_pairs.setdefault(receiver_type, []).append(
+                        cls.process_callee_signature(call_site.callee_signature))
+            for interface_class in interface_class_method_pairs:
+                for concrete_class in concrete_classes(interface_class):
+                    for callee_signature in interface_class_method_pairs[interface_class]:
+                        callee_id = method_ids.get(cls.normalize_signature(concrete_class, callee_signature))
+                        if callee_id is not None:
+                            interface_successors[method_id][callee_id] = None
+
+        # Direct callees from the call graph are those of the calling method itself, both ends of an edge are
+        # matched in the <init> form of constructors
+        call_graph_successors: List[Dict[int, None]] = [{} for _ in methods]
+        if call_edges is None:
+            call_edges = analysis.get_call_graph().edges()
+        for source, target in call_edges:
+            source_id = method_ids.get(cls.normalize_signature(source[1], source[0]))
+            target_id = method_ids.get(cls.normalize_signature(target[1], target[0]))
+            if source_id is not None and target_id is not None:
+                call_graph_successors[source_id][target_id] = None
+
+        successors = []
+        for method_id in range(len(methods)):
+            method_successors = dict(interface_successors[method_id])
+            method_successors.update(call_graph_successors[method_id])
+            successors.append(tuple(method_successors))
+        return cls(methods, start_lines, end_lines, successors, entrypoints, method_codes, accessed_fields)
+
+    def method_id(self, qualified_class_name: str, method_signature: str) -> Optional[int]:
+        """
+        Returns the ID of the given method, or None if the method is not declared in the application
+        Args:
+            qualified_class_name:
+            method_signature:
+
+        Returns:
+            Optional[int]: method ID
+        """
+        return self.method_ids.get(self.normalize_signature(qualified_class_name, method_signature))
+
+    def reachable(self, method_id: int, depth: int) -> Tuple[int, ...]:
+        """
+        Computes the methods reachable from the given method within depth levels, the method itself included.
+        Methods are returned in depth-first order and closures are memoized per (method, depth).
+        Args:
+            method_id:
+            depth:
+
+        Returns:
+            Tuple[int, ...]: IDs of the reachable methods
+        """
+        if depth <= 0:
+            return ()
+        key = (method_id, depth)
+        closure = self.__closures.get(key)
+        if self.metrics is not None:
+            self.metrics.increment("reachability_memo_hits" if closure is not None else "reachability_steps")
+        if closure is None:
+            if depth == 1:
+                closure = (method_id,)
+            else:
+                closure_methods = {method_id: None}
+                for successor in self.successors[method_id]:
+                    for reachable_method in self.reachable(successor, depth - 1):
+                        if reachable_method not in closure_methods:
+                            closure_methods[reachable_method] = None
+                closure = tuple(closure_methods)
+            self.__closures[key] = closure
+        return closure
+
+    @staticmethod
+    def normalize_signature(qualified_class_name: str, method_signature: str) -> Tuple[str, str]:
+        """
+        Maps constructor signatures to the <init> form used as key in the symbol table
+        Args:
+            qualified_class_name:
+            method_signature:
+
+        Returns:
+            Tuple[str, str]: class name and method signature
+        """
+        constructor_prefix = qualified_class_name.split('.')[-1] + '('
+        if method_signature.startswith(constructor_prefix):
+            method_signature = method_signature.replace(constructor_prefix, '<init>(')
+        return qualified_class_name, method_signature
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def process_callee_signature(callee_signature: str) -> str:
+        """
+        Processes callee signature. Results are memoized, since the same callees are called from many call sites.
+        Args:
+            callee_signature:
+
+        Returns:
+
+        """
+        # Find the part within the parentheses
+        start = callee_signature.find("(") + 1
+        end = callee_signature.rfind(")")
+
+        # Extract the elements inside the parentheses
+        elements = callee_signature[start:end].split(",")
+
+        # Apply the regex to each element
+        simplified_elements = [CALLEE_TYPE_PATTERN.sub(r"\1", element.strip()) for element in elements]
+
+        # Reconstruct the string with simplified elements
+        return f"{callee_signature[:start]}{', '.join(simplified_elements)}{callee_signature[end:]}"
@@ -0,0 +1,222 @@
+import argparse
+import json
+import os
+import re
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+REACHABILITY_COVERAGE_FILE = 'reachability_coverage.json'
+APPLICATION_COVERAGE_FILE = 'application_coverage.json'
+REACHABILITY_METRICS = ("line_coverage", "branch_coverage", "instruction_coverage", "database_interaction_coverage")
+APPLICATION_METRICS = ("line_coverage", "branch_coverage", "instruction_coverage",
+                       "database_interaction_line_coverage")
+MISSING = -100.0
+
+_RUN_DIRECTORY = re.compile(r'^(?P<sut>.+)_(?P<seed>\d+)$')
+
+
+def discover_runs(covs_dir: Union[str, Path]) -> Dict[str, List[Tuple[int, Path]]]:
+    """
+    Finds the result directories of every SUT and seed, named <sut>_<seed>
+    Args:
+        covs_dir: directory with the archived results
+
+    Returns:
+        Dict[str, List[Tuple[int, Path]]]: seeds and result directories of each SUT, sorted by seed
+    """
+    runs: Dict[str, List[Tuple[int, Path]]] = {}
+    for run_dir in sorted(Path(covs_dir).iterdir()):
+        match = _RUN_DIRECTORY.match(run_dir.name)
+        if match is None or not run_dir.is_dir():
+            continue
+        runs.setdefault(match.group('sut'), []).append((int(match.group('seed')), run_dir))
+    for sut_runs in runs.values():
+        sut_runs.sort(key=lambda run: run[0])
+    return dict(sorted(runs.items()))
+
+
+def load_report(path: Path) -> Optional[dict]:
+    """
+    Loads a coverage report, printing the error and returning None if it is missing or malformed
+    """
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Could not load {path}: {e}")
+        return None
+
+
+def to_array(values: List[List[float]]) -> np.ndarray:
+    """
+    Converts coverage values to an array of seeds x items x metrics, with the -100.0 sentinel as NaN
+    """
+    array = np.array(values, dtype=np.float64)
+    array[array == MISSING] = np.nan
+    return array
+
+
+def get_statistics(array: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Computes the mean, standard deviation, minimum and maximum over the seeds (first axis), ignoring missing
+    values. Items missing in every seed stay NaN.
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', category=RuntimeWarning)
+        return {"mean": np.nanmean(array, axis=0), "std": np.nanstd(array, axis=0),
+                "min": np.nanmin(array, axis=0), "max": np.nanmax(array, axis=0)}
+
+
+def to_value(value: float) -> float:
+    return MISSING if np.isnan(value) else float(value)
+
+
+def get_missing_summary(sut: str) -> dict:
+    """
+    Returns the summary of a SUT without any loadable seed, with every statistic set to -100.0
+    """
+    missing_statistics = {statistic: MISSING for statistic in ("mean", "std", "min", "max")}
+    return {"sut": sut,
+            "seeds": [],
+            "reachability_coverage": {},
+            "overall_coverage": {metric: dict(missing_statistics) for metric in REACHABILITY_METRICS},
+            "union_coverage": {"reached_methods": 0, "covered_methods": 0, "method_coverage": MISSING},
+            "application_coverage": {metric: dict(missing_statistics) for metric in APPLICATION_METRICS}}
+
+
+def aggregate_sut(sut: str, runs: List[Tuple[int, Path]]) -> dict:
+    """
+    Aggregates the reports of all the seeds of a SUT. Methods are matched across seeds by class, signature and
+    position among the entries of the same method. A method missing from a seed, or a -100.0 value, does not
+    count towards the statistics of that metric.
+    Args:
+        sut: name of the SUT
+        runs: seeds and result directories of the SUT
+
+    Returns:
+        dict: per-method and overall statistics of the reachability coverage, and statistics of the application
+            coverage
+    """
+    seeds = []
+    reachability_reports = []
+    application_reports = []
+    for seed, run_dir in runs:
+        reachability_report = load_report(run_dir.joinpath(REACHABILITY_COVERAGE_FILE))
+        application_report = load_report(run_dir.joinpath(APPLICATION_COVERAGE_FILE))
+        if reachability_report is None or application_report is None:
+            continue
+        seeds.append(seed)
+        reachability_reports.append(reachability_report)
+        application_reports.append(application_report)
+    if len(seeds) == 0:
+        print(f"No seed of {sut} has both coverage reports")
+        return get_missing_summary(sut)
+
+    # Give each method entry a row, in the order of first appearance
+    rows: Dict[Tuple[str, str, int], int] = {}
+    seed_rows: List[Dict[Tuple[str, str, int], dict]] = []
+    for reachability_report in reachability_reports:
+        methods = {}
+        for klazz, method_coverages in reachability_report.items():
+            if klazz == "overall_coverage":
+                continue
+            occurrences: Dict[str, int] = {}
+            for method_coverage in method_coverages:
+                method_signature = method_coverage["method_signature"]
+                occurrence = occurrences.get(method_signature, 0)
+                occurrences[method_signature] = occurrence + 1
+                methods[(klazz, method_signature, occurrence)] = method_coverage
+                rows.setdefault((klazz, method_signature, occurrence), len(rows))
+        seed_rows.append(methods)
+
+    method_values = np.full((len(seeds), len(rows), len(REACHABILITY_METRICS)), np.nan)
+    for seed_index, methods in enumerate(seed_rows):
+        for key, method_coverage in methods.items():
+            method_values[seed_index, rows[key]] = [method_coverage[metric] for metric in REACHABILITY_METRICS]
+    method_values[method_values == MISSING] = np.nan
+    method_statistics = get_statistics(method_values)
+    # A method is covered by the union of the seeds if any seed covers at least one of its lines
+    covered_seeds = np.sum(method_values[:, :, 0] > 0.0, axis=0)
+
+    methods_summary: Dict[str, List[dict]] = {}
+    for key, row in rows.items():
+        klazz, method_signature, _ = key
+        seed_methods = [methods[key] for methods in seed_rows if key in methods]
+        summary = {"method_signature": method_signature,
+                   "seeds": len(seed_methods),
+                   "covered_seeds": int(covered_seeds[row])}
+        for metric_index, metric in enumerate(REACHABILITY_METRICS):
+            summary[metric] = {statistic: to_value(values[row, metric_index])
+                               for statistic, values in method_statistics.items()}
+        # Database lines left uncovered by every seed that reached the method
+        database_uncovered_lines = set.intersection(
+            *[set(method_coverage["database_uncovered_lines"] or []) for method_coverage in seed_methods])
+        summary["database_uncovered_lines"] = sorted(database_uncovered_lines) if database_uncovered_lines else None
+        methods_summary.setdefault(klazz, []).append(summary)
+
+    overall_statistics = get_statistics(to_array(
+        [[reachability_report["overall_coverage"][0][metric] for metric in REACHABILITY_METRICS]
+         for reachability_report in reachability_reports]).reshape(len(seeds), len(REACHABILITY_METRICS)))
+    application_statistics = get_statistics(to_array(
+        [[application_report[metric] for metric in APPLICATION_METRICS]
+         for application_report in application_reports]).reshape(len(seeds), len(APPLICATION_METRICS)))
+
+    return {"sut": sut,
+            "seeds": seeds,
+            "reachability_coverage": methods_summary,
+            "overall_coverage": {metric: {statistic: to_value(values[metric_index])
+                                          for statistic, values in overall_statistics.items()}
+                                 for metric_index, metric in enumerate(REACHABILITY_METRICS)},
+            "union_coverage": {"reached_methods": len(rows),
+                               "covered_methods": int(np.sum(covered_seeds > 0)),
+                               "method_coverage": float(np.sum(covered_seeds > 0)) / len(rows) * 100.0 if
+                               len(rows) > 0 else MISSING},
+            "application_coverage": {metric: {statistic: to_value(values[metric_index])
+                                              for statistic, values in application_statistics.items()}
+                                     for metric_index, metric in enumerate(APPLICATION_METRICS)}}
+
+
+def aggregate_runs(covs_dir: Union[str, Path], output_dir: Union[str, Path, None] = None,
+                   max_workers: Optional[int] = None) -> Dict[str, dict]:
+    """
+    Aggregates the archived results of every SUT across its seeds, one SUT per worker process
+    Args:
+        covs_dir: directory with one <sut>_<seed> directory per run
+        output_dir: directory to write one <sut>_summary.json per SUT to, nothing is written if None
+        max_workers: number of worker processes, the number of CPUs if None
+
+    Returns:
+        Dict[str, dict]: summary of each SUT, SUTs whose aggregation failed are left out
+    """
+    runs = discover_runs(covs_dir)
+    summaries = {}
+    if len(runs) > 0:
+        with ProcessPoolExecutor(max_workers=min(max_workers or os.cpu_count() or 1, len(runs))) as executor:
+            futures = {sut: executor.submit(aggregate_sut, sut, sut_runs) for sut, sut_runs in runs.items()}
+            for sut, future in futures.items():
+                try:
+                    summaries[sut] = future.result()
+                except Exception as e:
+                    # A broken SUT does not lose the summaries of the others
+                    print(f"Aggregating {sut} failed: {e!r}")
+    if output_dir is not None:
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        for sut, summary in summaries.items():
+            with open(output_dir.joinpath(f"{sut}_summary.json"), 'w') as f:
+                json.dump(summary, f, indent=4)
+    return summaries
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Aggregates the coverage reports of every SUT across seeds")
+    parser.add_argument('covs_dir', nargs='?', default='covs', help="directory with the <sut>_<seed> results")
+    parser.add_argument('--output-dir', default='summaries', help="directory to write the summaries to")
+    parser.add_argument('--workers', type=int, default=None, help="number of worker processes")
+    arguments = parser.parse_args()
+    for sut, summary in aggregate_runs(arguments.covs_dir, arguments.output_dir, arguments.workers).items():
+        print(sut, len(summary["seeds"]), "seeds", json.dumps(summary["overall_coverage"]["line_coverage"]))
@@ -0,0 +1,271 @@
+import multiprocessing
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from multiprocessing.pool import Pool
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Union
+
+from agent_client import AgentClient
+from analysis_index import AnalysisIndex
+from coverage_snapshot import CoverageSnapshot
+from emb_coverage import EMBCoverage
+
+if TYPE_CHECKING:
+    from cldk.analysis.java import JavaAnalysis
+
+# Analysis indexes loaded by a join worker process, per index file
+_worker_indexes: Dict[str, AnalysisIndex] = {}
+
+
+class CoverageTarget:
+    """
+    A running SUT to collect coverage from: the agent port and the analysis of the application, either as a CLDK
+    analysis or as prebuilt analysis indexes
+    """
+
+    def __init__(self, name: str, jacoco_port_number: int, analysis: Optional['JavaAnalysis'] = None,
+                 analysis_index: Optional[AnalysisIndex] = None, host: str = 'localhost',
+                 timeout: Optional[float] = None):
+        if analysis is None and analysis_index is None:
+            raise ValueError(f"Target {name} needs an analysis or an analysis index")
+        self.name = name
+        self.jacoco_port_number = jacoco_port_number
+        self.analysis = analysis
+        self.analysis_index = analysis_index
+        self.host = host
+        # Seconds to collect the coverage of this target in, the coordinator timeout if None
+        self.timeout = timeout
+
+    def get_analysis_index(self) -> AnalysisIndex:
+        if self.analysis_index is None:
+            self.analysis_index = AnalysisIndex.from_analysis(self.analysis)
+        return self.analysis_index
+
+
+class CoverageResult:
+    """
+    Coverage collected from one target. On failure the coverage is None and the error says at which step the
+    collection failed.
+    """
+
+    def __init__(self, name: str, reachability_coverage: Optional[dict] = None, app_coverage: Optional[dict] = None,
+                 error: Optional[str] = None, elapsed: float = 0.0):
+        self.name = name
+        self.reachability_coverage = reachability_coverage
+        self.app_coverage = app_coverage
+        self.error = error
+        self.elapsed = elapsed
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def _get_worker_index(index_path: str) -> AnalysisIndex:
+    """
+    Loads the analysis index of a target on its first join in the worker process
+    """
+    analysis_index = _worker_indexes.get(index_path)
+    if analysis_index is None:
+        analysis_index = AnalysisIndex.load(index_path)
+        if analysis_index is None:
+            raise ValueError(f"Cannot load the analysis index {index_path}")
+        _worker_indexes[index_path] = analysis_index
+    return analysis_index
+
+
+def _join_coverage(index_path: str, responses: dict, reachability_depth: int) -> Tuple[dict, dict]:
+    """
+    Computes the reachability and the application coverage of a target from a snapshot of its agent, in a join
+    worker process
+    """
+    emb_coverage = EMBCoverage.from_index(_get_worker_index(index_path), 0, reachability_depth=reachability_depth)
+    snapshot = CoverageSnapshot(responses)
+    return emb_coverage.get_reachability_coverage(snapshot), emb_coverage.get_app_coverage(snapshot)
+
+
+class CoverageCoordinator:
+    """
+    Collects the coverage of several running SUTs at once. Agent snapshots are captured on a bounded thread pool,
+    and the joins, which are CPU-bound, run on a process pool as soon as the snapshot of a target is available.
+    The analysis index of a target is built on the thread pool after its first capture and written to an index
+    file, which the join workers load on their first join of the target, so that no index is sent to the workers.
+    A target that fails or times out is reported without affecting the others. A join that times out is stopped by
+    terminating the process pool, and the other joins in progress are started again on a new one.
+    """
+
+    def __init__(self, targets: List[CoverageTarget], reachability_depth: int = 2, timeout: float = 60.0,
+                 max_io_workers: int = 16, max_join_workers: Optional[int] = None, agent_timeout: float = 10.0,
+                 agent_retries: int = 2, index_dir: Union[str, Path, None] = None):
+        names = [target.name for target in targets]
+        if len(set(names)) != len(names):
+            raise ValueError("Target names must be unique")
+        self.targets = targets
+        self.reachability_depth = reachability_depth
+        self.timeout = timeout
+        self.max_io_workers = max_io_workers
+        self.max_join_workers = max_join_workers
+        self.agent_timeout = agent_timeout
+        self.agent_retries = agent_retries
+        # Directory of the index files of the targets, a temporary directory if None
+        self.__temporary_dir: Optional[tempfile.TemporaryDirectory] = None
+        if index_dir is None:
+            self.__temporary_dir = tempfile.TemporaryDirectory()
+            index_dir = self.__temporary_dir.name
+        self.index_dir = Path(index_dir)
+        self.__index_paths: Dict[str, str] = {}
+        self.__join_pool: Optional[Pool] = None
+
+    def collect(self) -> Dict[str, CoverageResult]:
+        """
+        Captures a snapshot of every target and computes its reachability and application coverage
+        Returns:
+            Dict[str, CoverageResult]: result of each target, in the order of the targets
+        """
+        started_at = time.monotonic()
+        deadlines = {target.name: started_at + (target.timeout if target.timeout is not None else self.timeout)
+                     for target in self.targets}
+        targets = {target.name: target for target in self.targets}
+        results: Dict[str, CoverageResult] = {}
+        pending: Dict[Future, Tuple[str, str]] = {}
+        # Snapshot responses of the targets whose index is being built
+        captured_responses: Dict[str, dict] = {}
+        # Snapshot responses of the joins in progress, to start them again if the join pool is terminated
+        join_responses: Dict[Future, dict] = {}
+        self.__get_join_pool()
+        io_executor = ThreadPoolExecutor(max_workers=max(1, min(self.max_io_workers, len(self.targets))))
+        try:
+            for target in self.targets:
+                pending[io_executor.submit(self.__capture, target)] = (target.name, "capture")
+            while len(pending) > 0:
+                now = time.monotonic()
+                timed_out_join = False
+                for future, (name, step) in list(pending.items()):
+                    if deadlines[name] <= now:
+                        future.cancel()
+                        del pending[future]
+                        join_responses.pop(future, None)
+                        timed_out_join = timed_out_join or step == "join"
+                        results[name] = self.__get_failure(name, f"Timed out during {step}", started_at)
+                if timed_out_join:
+                    self.__restart_joins(pending, join_responses)
+                if len(pending) == 0:
+                    break
+                timeout = min(deadlines[name] for name, _ in pending.values()) - now
+                done, _ = wait(pending, timeout=max(0.0, timeout), return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, step = pending.pop(future)
+                    join_responses.pop(future, None)
+                    try:
+                        value = future.result()
+                    except Exception as e:
+                        results[name] = self.__get_failure(name, f"Failed during {step}: {e!r}", started_at)
+                        continue
+                    if step == "capture":
+                        error = self.__get_capture_error(value)
+                        if error is not None:
+                            results[name] = self.__get_failure(name, error, started_at)
+                            continue
+                        if name in self.__index_paths:
+                            self.__start_join(name, value.responses, pending, join_responses)
+                        else:
+                            captured_responses[name] = value.responses
+                            pending[io_executor.submit(self.__build_index, targets[name])] = (name, "index")
+                    elif step == "index":
+                        self.__start_join(name, captured_responses.pop(name), pending, join_responses)
+                    else:
+                        reachability_coverage, app_coverage = value
+                        results[name] = CoverageResult(name, reachability_coverage, app_coverage,
+                                                       elapsed=time.monotonic() - started_at)
+        finally:
+            # Captures still running are bounded by the agent timeout, do not wait for them
+            io_executor.shutdown(wait=False, cancel_futures=True)
+        return {target.name: results[target.name] for target in self.targets}
+
+    def close(self):
+        """
+        Stops the join worker processes and removes the temporary index directory
+        """
+        self.__terminate_join_pool()
+        if self.__temporary_dir is not None:
+            self.__temporary_dir.cleanup()
+            self.__temporary_dir = None
+
+    def __build_index(self, target: CoverageTarget):
+        """
+        Builds the analysis index of a target, unless it was given one, and writes it to the index file the join
+        workers load it from
+        """
+        index_path = self.index_dir.joinpath(f"{self.targets.index(target)}.index")
+        target.get_analysis_index().save(index_path)
+        self.__index_paths[target.name] = str(index_path)
+
+    def __get_join_pool(self) -> Pool:
+        """
+        Starts the join worker processes on first use
+        """
+        if self.__join_pool is None:
+            self.__join_pool = multiprocessing.Pool(processes=self.max_join_workers)
+        return self.__join_pool
+
+    def __start_join(self, name: str, responses: dict, pending: Dict[Future, Tuple[str, str]],
+                     join_responses: Dict[Future, dict]):
+        """
+        Starts the join of a target on the join pool, with a future for the reachability and application coverage
+        of the target
+        Args:
+            name: target name
+            responses: snapshot responses of the target
+            pending: steps in progress, updated with the join future
+            join_responses: snapshot responses of the joins in progress, updated likewise
+        """
+        future = Future()
+        future.set_running_or_notify_cancel()
+        self.__get_join_pool().apply_async(_join_coverage, (self.__index_paths[name], responses,
+                                                            self.reachability_depth),
+                                           callback=future.set_result, error_callback=future.set_exception)
+        pending[future] = (name, "join")
+        join_responses[future] = responses
+
+    def __restart_joins(self, pending: Dict[Future, Tuple[str, str]], join_responses: Dict[Future, dict]):
+        """
+        Terminates the join pool, which stops the timed out joins still running, and starts the joins in progress
+        again on a new pool
+        Args:
+            pending: steps in progress, updated with the new join futures
+            join_responses: snapshot responses of the joins in progress, updated likewise
+        """
+        self.__terminate_join_pool()
+        for future, responses in list(join_responses.items()):
+            name, _ = pending.pop(future)
+            del join_responses[future]
+            self.__start_join(name, responses, pending, join_responses)
+
+    def __terminate_join_pool(self):
+        if self.__join_pool is not None:
+            self.__join_pool.terminate()
+            self.__join_pool.join()
+            self.__join_pool = None
+
+    def __capture(self, target: CoverageTarget) -> CoverageSnapshot:
+        with AgentClient(target.jacoco_port_number, host=target.host, timeout=self.agent_timeout,
+                         retries=self.agent_retries) as agent_client:
+            return CoverageSnapshot.capture(agent_client)
+
+    @staticmethod
+    def __get_capture_error(snapshot: CoverageSnapshot) -> Optional[str]:
+        errors = [f"{path}: {response if status_code == -100 else status_code}"
+                  for path, (status_code, response) in snapshot.responses.items() if status_code != 200]
+        return "Agent request failed: " + ", ".join(errors) if len(errors) > 0 else None
+
+    @staticmethod
+    def __get_failure(name: str, error: str, started_at: float) -> CoverageResult:
+        print(f"Coverage collection of {name} failed: {error}")
+        return CoverageResult(name, error=error, elapsed=time.monotonic() - started_at)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
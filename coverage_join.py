@@ -0,0 +1,305 @@
+import json
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+from typing import Dict, List, Optional, Set, Tuple
+
+
+@lru_cache(maxsize=None)
+def get_method_key(qualified_class_name: str, method_signature: str) -> str:
+    """
+    Returns the key of a method in the uncovered database interaction lines of the overall coverage. Formatting the
+    typing expression is slow, and the same methods are reported in every evaluation.
+    """
+    return str(Tuple[qualified_class_name, method_signature])
+
+
+class MethodCoverageIndex:
+    """
+    Index over the /methodcoverage payload of the coverage monitoring agent. Entries are grouped by class and method
+    name with their start lines sorted, so that matching a method is an interval lookup.
+    """
+
+    def __init__(self, coverage_details: dict):
+        self.__start_lines: Dict[Tuple[str, str], List[int]] = {}
+        self.__entries: Dict[Tuple[str, str], List[Tuple[int, dict]]] = {}
+        grouped_entries: Dict[Tuple[str, str], List[Tuple[int, int, dict]]] = {}
+        for klazz in coverage_details:
+            for order, method_jacoco in enumerate(coverage_details[klazz]):
+                method_name, start_line = method_jacoco.split(':')[:2]
+                grouped_entries.setdefault((klazz, method_name), []).append(
+                    (int(start_line), order, coverage_details[klazz][method_jacoco]))
+        for key, entries in grouped_entries.items():
+            entries.sort(key=lambda entry: entry[0])
+            self.__start_lines[key] = [entry[0] for entry in entries]
+            self.__entries[key] = [(entry[1], entry[2]) for entry in entries]
+
+    def get_method_coverage(self, qualified_class_name: str, method_name: str, start_line: int,
+                            end_line: int) -> List[dict]:
+        """
+        Returns the coverage details of the agent entries with the given name whose line lies in the given range.
+        Since the line reported by JaCoCo may be off by one from the declaration, the whole method range is used.
+        Args:
+            qualified_class_name:
+            method_name:
+            start_line:
+            end_line:
+
+        Returns:
+            List[dict]: coverage details in the order of the agent payload
+        """
+        key = (qualified_class_name, method_name)
+        start_lines = self.__start_lines.get(key)
+        if start_lines is None:
+            return []
+        matches = self.__entries[key][bisect_left(start_lines, start_line):bisect_right(start_lines, end_line)]
+        if len(matches) > 1:
+            matches = sorted(matches, key=lambda match: match[0])
+        return [match[1] for match in matches]
+
+
+class DBCoverageIndex:
+    """
+    Index over the per-class database coverage, keyed by class and method signature
+    """
+
+    def __init__(self, db_coverage: dict):
+        self.__methods: Dict[Tuple[str, str], dict] = {}
+        for klazz in db_coverage:
+            for method_db in db_coverage[klazz]:
+                # When a method has several agent entries, the last one wins
+                self.__methods[(klazz, method_db["method_signature"])] = method_db
+
+    def get_db_coverage(self, qualified_class_name: str, method_signature: str) -> Optional[dict]:
+        """
+        Returns the database coverage of the given method
+        Args:
+            qualified_class_name:
+            method_signature:
+
+        Returns:
+            Optional[dict]: database coverage details, or None if the method has none
+        """
+        return self.__methods.get((qualified_class_name, method_signature))
+
+
+class CoverageLookup:
+    """
+    Looks up the coverage details of reachable methods in the method coverage and the database coverage
+    """
+
+    def __init__(self, method_coverage: MethodCoverageIndex, db_coverage: DBCoverageIndex):
+        self.method_coverage = method_coverage
+        self.db_coverage = db_coverage
+
+    def join_method(self, qualified_class_name: str, method_signature: str, start_line: int,
+                    end_line: int) -> List[Tuple[Tuple[int, ...], List[int]]]:
+        """
+        Looks up the coverage details of a method without adding them, so that methods can be joined apart, e.g. in
+        other processes, and added later with add_joined_method
+        Args:
+            qualified_class_name:
+            method_signature:
+            start_line:
+            end_line:
+
+        Returns:
+            List[Tuple[Tuple[int, ...], List[int]]]: for each agent entry of the method, the covered and total lines,
+            branches, instructions and database interaction lines, and the uncovered database interaction lines
+        """
+        joined_method = []
+        # Get database interaction coverage
+        method_db = self.db_coverage.get_db_coverage(qualified_class_name, method_signature)
+        for method_coverage_details in self.method_coverage.get_method_coverage(
+                qualified_class_name, method_signature.split('(')[0], start_line, end_line):
+            covered_db_interaction_lines_per_method = 0
+            total_db_interaction_lines_per_method = 0
+            db_uncovered_lines = []
+            if method_db is not None:
+                total_db_interaction_lines_per_method = method_db["total_db_line_count"]
+                covered_db_interaction_lines_per_method = (
+                        total_db_interaction_lines_per_method - len(method_db["db_uncovered_lines"]))
+                if total_db_interaction_lines_per_method > 0:
+                    db_uncovered_lines = method_db["db_uncovered_lines"]
+            method_counts = (method_coverage_details["coveredLines"], method_coverage_details["totalLines"],
+                             method_coverage_details["fullyCoveredBranches"], method_coverage_details["totalBranches"],
+                             method_coverage_details["coveredInsts"], method_coverage_details["totalInsts"],
+                             covered_db_interaction_lines_per_method, total_db_interaction_lines_per_method)
+            joined_method.append((method_counts, db_uncovered_lines))
+        return joined_method
+
+
+class ReachabilityCoverageJoin(CoverageLookup):
+    """
+    Joins reachable methods against the method coverage and the database coverage, accumulating the method-wise
+    and the overall reachability coverage. Each method is counted once, however many endpoints reach it.
+    """
+
+    def __init__(self, method_coverage: MethodCoverageIndex, db_coverage: DBCoverageIndex):
+        super().__init__(method_coverage, db_coverage)
+        self.processed_methods: Set[Tuple[str, str]] = set()
+        # Covered and total lines, branches, instructions and database interaction lines of each joined method
+        self.method_counts: Dict[Tuple[str, str], Tuple[int, ...]] = {}
+        self.coverage_dict: Dict[str, List[dict]] = {}
+        # Uncovered database interaction lines of the joined methods with database interactions
+        self.db_uncovered_lines_app: Dict[Tuple[str, str], List[int]] = {}
+        self.covered_db_interaction_lines = 0
+        self.total_db_interaction_lines = 0
+        self.total_lines = 0
+        self.total_branches = 0
+        self.total_inst = 0
+        self.covered_lines = 0
+        self.covered_branches = 0
+        self.covered_inst = 0
+
+    def add_method(self, qualified_class_name: str, method_signature: str, start_line: int,
+                   end_line: int) -> List[dict]:
+        """
+        Joins a reachable method with its coverage details
+        Args:
+            qualified_class_name:
+            method_signature:
+            start_line:
+            end_line:
+
+        Returns:
+            List: method-wise coverage entries added for the method, empty if it was already processed
+        """
+        if (qualified_class_name, method_signature) in self.processed_methods:
+            return []
+        return self.add_joined_method(qualified_class_name, method_signature,
+                                      self.join_method(qualified_class_name, method_signature, start_line, end_line))
+
+    def add_joined_method(self, qualified_class_name: str, method_signature: str,
+                          joined_method: List[Tuple[Tuple[int, ...], List[int]]]) -> List[dict]:
+        """
+        Adds the coverage details of a method looked up with join_method
+        Args:
+            qualified_class_name:
+            method_signature:
+            joined_method: counters and uncovered database interaction lines of each agent entry of the method
+
+        Returns:
+            List: method-wise coverage entries added for the method, empty if it was already processed
+        """
+        key = (qualified_class_name, method_signature)
+        if key in self.processed_methods:
+            return []
+        self.processed_methods.add(key)
+        added_coverage = []
+        for method_counts, db_uncovered_lines in joined_method:
+            (covered_lines, total_lines, covered_branches, total_branches, covered_inst, total_inst,
+             covered_db_interaction_lines, total_db_interaction_lines) = method_counts
+            if total_db_interaction_lines > 0:
+                self.db_uncovered_lines_app[key] = db_uncovered_lines
+            # Collect data for overall coverage
+            self.total_lines += total_lines
+            self.total_branches += total_branches
+            self.total_inst += total_inst
+            self.covered_lines += covered_lines
+            self.covered_branches += covered_branches
+            self.covered_inst += covered_inst
+            self.total_db_interaction_lines += total_db_interaction_lines
+            self.covered_db_interaction_lines += covered_db_interaction_lines
+            if key in self.method_counts:
+                self.method_counts[key] = tuple(map(sum, zip(self.method_counts[key], method_counts)))
+            else:
+                self.method_counts[key] = method_counts
+            added_coverage.append(self.add_method_coverage(qualified_class_name, method_signature, method_counts,
+                                                           db_uncovered_lines))
+        return added_coverage
+
+    def add_method_coverage(self, qualified_class_name: str, method_signature: str, method_counts: Tuple[int, ...],
+                            db_uncovered_lines: List[int]) -> dict:
+        """
+        Stores the method-wise coverage of one agent entry of a method
+        Args:
+            qualified_class_name:
+            method_signature:
+            method_counts: covered and total lines, branches, instructions and database interaction lines
+            db_uncovered_lines: uncovered database interaction lines
+
+        Returns:
+            dict: method-wise coverage entry
+        """
+        coverage = self.create_method_coverage(method_signature, method_counts, db_uncovered_lines)
+        if qualified_class_name not in self.coverage_dict:
+            self.coverage_dict[qualified_class_name] = [coverage]
+        else:
+            self.coverage_dict[qualified_class_name].append(coverage)
+        return coverage
+
+    @staticmethod
+    def create_method_coverage(method_signature: str, method_counts: Tuple[int, ...],
+                               db_uncovered_lines: List[int]) -> dict:
+        """
+        Creates the method-wise coverage entry of one agent entry of a method
+        Args:
+            method_signature:
+            method_counts: covered and total lines, branches, instructions and database interaction lines
+            db_uncovered_lines: uncovered database interaction lines
+
+        Returns:
+            dict: method-wise coverage entry
+        """
+        (covered_lines, total_lines, covered_branches, total_branches, covered_inst, total_inst,
+         covered_db_interaction_lines, total_db_interaction_lines) = method_counts
+        return {"method_signature": method_signature,
+                "line_coverage": (covered_lines / total_lines) * 100.0 if total_lines > 0 else -100.0,
+                "branch_coverage": (covered_branches / total_branches) * 100.0 if total_branches > 0 else -100.0,
+                "instruction_coverage": (covered_inst / total_inst) * 100.0 if total_inst > 0 else -100.0,
+                "database_interaction_coverage": (covered_db_interaction_lines /
+                                                  total_db_interaction_lines) * 100.0 if
+                total_db_interaction_lines > 0 else -100.0,
+                "database_uncovered_lines": db_uncovered_lines if len(db_uncovered_lines) > 0 else None,
+                }
+
+    def get_overall_coverage(self) -> dict:
+        """
+        Computes the overall coverage of all the methods joined so far
+        Returns:
+            dict: overall line, branch, instruction and database interaction coverage
+        """
+        return self.create_overall_coverage(
+            (self.covered_lines, self.total_lines, self.covered_branches, self.total_branches, self.covered_inst,
+             self.total_inst, self.covered_db_interaction_lines, self.total_db_interaction_lines),
+            self.db_uncovered_lines_app)
+
+    @staticmethod
+    def create_overall_coverage(counts: Tuple[int, ...], db_uncovered_lines: Dict[Tuple[str, str], List[int]]) -> dict:
+        """
+        Creates the overall coverage entry of the coverage report
+        Args:
+            counts: covered and total lines, branches, instructions and database interaction lines of all the methods
+            db_uncovered_lines: uncovered database interaction lines of the methods with database interactions
+
+        Returns:
+            dict: overall line, branch, instruction and database interaction coverage
+        """
+        (covered_lines, total_lines, covered_branches, total_branches, covered_inst, total_inst,
+         covered_db_interaction_lines, total_db_interaction_lines) = counts
+        return {"line_coverage": (covered_lines / total_lines) * 100.0 if total_lines > 0 else -100,
+                "branch_coverage": (covered_branches / total_branches) * 100.0 if total_branches > 0 else -100,
+                "instruction_coverage": (covered_inst / total_inst) * 100.0 if total_inst > 0 else -100,
+                "database_interaction_coverage": (covered_db_interaction_lines /
+                                                  total_db_interaction_lines) * 100.0 if
+                total_db_interaction_lines > 0 else -100,
+                "database_uncovered_lines": ReachabilityCoverageJoin.format_db_uncovered_lines(db_uncovered_lines)}
+
+    @staticmethod
+    def format_db_uncovered_lines(db_uncovered_lines: Dict[Tuple[str, str], List[int]]) -> str:
+        """
+        Formats the uncovered database interaction lines per method as the JSON string of the overall coverage
+        """
+        return json.dumps({get_method_key(qualified_class_name, method_signature): lines
+                           for (qualified_class_name, method_signature), lines in db_uncovered_lines.items()})
+
+    def get_coverage_dict(self) -> Dict[str, List[dict]]:
+        """
+        Returns the method-wise coverage per class together with the overall coverage
+        Returns:
+            Dict[str, List[dict]]: coverage report
+        """
+        coverage_dict = dict(self.coverage_dict)
+        # Add overall coverage
+        coverage_dict["overall_coverage"] = [self.get_overall_coverage()]
+        return coverage_dict
@@ -0,0 +1,91 @@
+import json
+import time
+from contextlib import contextmanager, nullcontext
+from typing import ContextManager, Dict, Iterator, Optional
+
+# Shared no-op context for phases timed while metrics are disabled
+_DISABLED_PHASE = nullcontext()
+
+
+class EvaluationMetrics:
+    """
+    Phase timers and counters of coverage evaluations. Components hold an Optional[EvaluationMetrics] and only
+    record when it is set, so that disabled metrics cost one attribute check per instrumented call.
+    """
+
+    def __init__(self):
+        self.counters: Dict[str, int] = {}
+        self.timers: Dict[str, float] = {}
+
+    def increment(self, name: str, value: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """
+        Adds the wall-clock time spent in the block to the timer of the given phase
+        Args:
+            name: phase name
+        """
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timers[name] = self.timers.get(name, 0.0) + time.perf_counter() - started_at
+
+    def to_dict(self) -> dict:
+        """
+        Returns:
+            dict: counters and the seconds spent in each phase
+        """
+        return {"counters": dict(self.counters), "phase_seconds": dict(self.timers)}
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict())
+
+    def to_prometheus(self, namespace: str = 'emb_coverage', labels: Optional[Dict[str, str]] = None) -> str:
+        """
+        Formats the metrics in the Prometheus text exposition format
+        Args:
+            namespace: prefix of the metric names
+            labels: labels added to every sample, e.g. the SUT name
+
+        Returns:
+            str: exposition text
+        """
+        labels = labels or {}
+        lines = []
+        for name, value in sorted(self.counters.items()):
+            metric = f"{namespace}_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric}{self.__format_labels(labels)} {value}")
+        if len(self.timers) > 0:
+            metric = f"{namespace}_phase_seconds_total"
+            lines.append(f"# HELP {metric} Wall-clock seconds spent in each evaluation phase")
+            lines.append(f"# TYPE {metric} counter")
+            for name, seconds in sorted(self.timers.items()):
+                lines.append(f"{metric}{self.__format_labels({**labels, 'phase': name})} {seconds!r}")
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def __format_labels(labels: Dict[str, str]) -> str:
+        if len(labels) == 0:
+            return ''
+        escaped_labels = []
+        for key, value in labels.items():
+            value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+            escaped_labels.append(f'{key}="{value}"')
+        return '{' + ','.join(escaped_labels) + '}'
+
+
+def timed(metrics: Optional[EvaluationMetrics], name: str) -> ContextManager:
+    """
+    Times a phase if metrics are enabled
+    Args:
+        metrics: metrics to record to, None if disabled
+        name: phase name
+
+    Returns:
+        ContextManager: context timing the block
+    """
+    return _DISABLED_PHASE if metrics is None else metrics.phase(name)
@@ -0,0 +1,260 @@
+import json
+import threading
+import time
+from json import JSONDecodeError
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple, Union
+
+from coverage_join import DBCoverageIndex, MethodCoverageIndex, ReachabilityCoverageJoin
+from coverage_snapshot import CoverageSnapshot
+from emb_coverage import EMBCoverage
+from line_coverage_store import LineCoverageStore
+
+# Number of counters per method: covered and total lines, branches, instructions and database interaction lines
+COUNTERS = 8
+
+
+class CoverageMonitor:
+    """
+    Polls the coverage monitoring agent during a test generation run and appends one time-stamped record per
+    sample to a JSON Lines timeline, or a record with "skipped" if the agent failed. Only the classes whose agent
+    data changed since the previous sample are joined again, and only the endpoints reaching those classes are
+    re-aggregated. The reachability and database
+    interaction totals are kept up to date by the difference of the changed classes' counts, and formatted like the
+    one-shot reports, so that a record equals EMBCoverage.get_reachability_coverage and get_app_coverage of the
+    same snapshot.
+    """
+
+    def __init__(self, emb_coverage: EMBCoverage, timeline_path: Union[str, Path], interval: float = 5.0,
+                 line_store_path: Union[str, Path, None] = None):
+        """
+        Args:
+            emb_coverage: coverage evaluator of the application
+            timeline_path: JSON Lines file to append the records to
+            interval: seconds between two samples
+            line_store_path: file to keep the LineCoverageStore of the latest sample in, if given, each record then
+                counts the lines and database interaction lines covered and lost since the previous sample
+        """
+        self.emb_coverage = emb_coverage
+        self.timeline_path = Path(timeline_path)
+        self.interval = interval
+        self.line_store_path = None if line_store_path is None else Path(line_store_path)
+        self.__line_store: Optional[LineCoverageStore] = None
+        index = emb_coverage.reachability.index
+        self.__endpoints = list(index.entrypoints)
+        self.__endpoint_names = ["{}.{}".format(*index.methods[endpoint]) for endpoint in self.__endpoints]
+        # Reachable methods of each class, and the endpoints reaching each method
+        self.__reachable_methods_by_class: Dict[str, List[int]] = {}
+        self.__endpoints_by_method: Dict[int, List[int]] = {}
+        self.__reachable_methods_by_endpoint: List[Tuple[int, ...]] = []
+        for position, endpoint in enumerate(self.__endpoints):
+            reachable_methods = index.reachable(endpoint, emb_coverage.reachability_depth)
+            self.__reachable_methods_by_endpoint.append(reachable_methods)
+            for method_id in reachable_methods:
+                if method_id not in self.__endpoints_by_method:
+                    self.__reachable_methods_by_class.setdefault(index.methods[method_id][0], []).append(method_id)
+                self.__endpoints_by_method.setdefault(method_id, []).append(position)
+        self.__method_coverage: Dict[str, dict] = {}
+        self.__uncovered_lines: Dict[str, dict] = {}
+        self.__method_counts: Dict[int, Tuple[int, ...]] = {}
+        self.__class_counts: Dict[str, List[int]] = {}
+        self.__class_db_counts: Dict[str, Tuple[int, int]] = {}
+        # Sums of the class counts above, updated by the difference of every changed class
+        self.__totals = [0] * COUNTERS
+        self.__db_totals = [0, 0]
+        self.__endpoint_line_coverage: Dict[int, Tuple[int, int]] = {}
+        self.__started_at: Optional[float] = None
+        # Number of samples skipped because the agent failed, and the start of the current outage, if any
+        self.skipped_samples = 0
+        self.__outage_started_at: Optional[float] = None
+
+    def sample(self) -> Optional[dict]:
+        """
+        Captures a new snapshot of the agent, updates the coverage of the changed classes and appends a record to
+        the timeline
+        Returns:
+            Optional[dict]: timeline record, or None if an agent request failed or its response could not be parsed,
+            in which case a record of the skipped sample is appended instead
+        """
+        if self.__started_at is None:
+            self.__started_at = time.time()
+        snapshot = self.emb_coverage.refresh_snapshot()
+        failed_paths = snapshot.get_failed_paths()
+        if len(failed_paths) > 0:
+            # Skip the sample and keep the coverage of the previous one, e.g. while the agent restarts
+            self.__skip_sample({"failed_paths": failed_paths})
+            return None
+        try:
+            method_coverage = snapshot.method_coverage
+            uncovered_lines = snapshot.uncovered_lines
+            app_coverage = snapshot.app_coverage
+        except JSONDecodeError as e:
+            self.__skip_sample({"error": f"JSON Error: {e}"})
+            return None
+        if self.__outage_started_at is not None:
+            print(f'Agent is back after {round(time.time() - self.__outage_started_at, 3)} seconds, '
+                  f'{self.skipped_samples} samples skipped so far')
+            self.__outage_started_at = None
+
+        changed_method_coverage = self.__get_changed_classes(self.__method_coverage, method_coverage)
+        changed_uncovered_lines = self.__get_changed_classes(self.__uncovered_lines, uncovered_lines)
+        self.__method_coverage = method_coverage
+        self.__uncovered_lines = uncovered_lines
+
+        db_coverage = {}
+        for klazz in changed_uncovered_lines:
+            db_coverage[klazz] = self.emb_coverage.db_line_index.get_db_coverage(
+                {klazz: uncovered_lines[klazz]} if klazz in uncovered_lines else {}).get(klazz, [])
+            class_db_counts = (
+                sum(method["total_db_line_count"] - len(method["db_uncovered_lines"]) for method in db_coverage[klazz]),
+                sum(method["total_db_line_count"] for method in db_coverage[klazz]))
+            previous_db_counts = self.__class_db_counts.get(klazz, (0, 0))
+            for counter in range(2):
+                self.__db_totals[counter] += class_db_counts[counter] - previous_db_counts[counter]
+            self.__class_db_counts[klazz] = class_db_counts
+
+        changed_classes = changed_method_coverage | changed_uncovered_lines
+        changed_endpoints = set()
+        for klazz in changed_classes:
+            changed_endpoints.update(self.__update_class(klazz, db_coverage.get(klazz)))
+
+        endpoint_coverage = {}
+        for position in sorted(changed_endpoints):
+            line_coverage = self.__get_endpoint_line_coverage(position)
+            if self.__endpoint_line_coverage.get(position) != line_coverage:
+                self.__endpoint_line_coverage[position] = line_coverage
+                endpoint_coverage[self.__endpoint_names[position]] = list(line_coverage)
+
+        record = {"time": round(time.time(), 3),
+                  "elapsed": round(time.time() - self.__started_at, 3),
+                  "changed_classes": len(changed_classes),
+                  "app": self.__get_app_coverage(app_coverage),
+                  "reachability": self.__get_reachability_coverage(),
+                  "endpoints": endpoint_coverage}
+        if self.line_store_path is not None:
+            record["lines"] = self.__update_line_store(snapshot)
+        self.__append(record)
+        return record
+
+    def run(self, duration: Optional[float] = None, max_samples: Optional[int] = None,
+            stop_event: Optional[threading.Event] = None):
+        """
+        Samples the agent every interval seconds until the duration elapses, max_samples samples were taken or the
+        stop event is set
+        Args:
+            duration: seconds to monitor for, unbounded if None
+            max_samples: number of samples to take, unbounded if None
+            stop_event: event that stops the monitor when set
+        """
+        stop_event = stop_event or threading.Event()
+        deadline = None if duration is None else time.monotonic() + duration
+        samples = 0
+        while not stop_event.is_set():
+            next_sample = time.monotonic() + self.interval
+            self.sample()
+            samples += 1
+            if max_samples is not None and samples >= max_samples:
+                return
+            if deadline is not None and next_sample > deadline:
+                return
+            stop_event.wait(max(0.0, next_sample - time.monotonic()))
+
+    def __skip_sample(self, reason: dict):
+        """
+        Records a skipped sample in the timeline, and prints the reason once per outage rather than on every sample
+        Args:
+            reason: failed agent paths with their status codes, or the parse error
+        """
+        self.skipped_samples += 1
+        if self.__outage_started_at is None:
+            self.__outage_started_at = time.time()
+            print(f'Agent unavailable, skipping samples until it answers again: {reason}')
+        self.__append({"time": round(time.time(), 3),
+                       "elapsed": round(time.time() - self.__started_at, 3),
+                       "skipped": reason})
+
+    def __append(self, record: dict):
+        with open(self.timeline_path, 'a') as f:
+            f.write(json.dumps(record, separators=(',', ':')) + '\n')
+
+    def __update_line_store(self, snapshot: CoverageSnapshot) -> dict:
+        """
+        Replaces the line coverage store with the one of the snapshot and saves it
+        Returns:
+            dict: number of lines and database interaction lines covered and lost since the previous sample, and of
+            classes reported for the first time
+        """
+        line_store = LineCoverageStore.from_snapshot(snapshot, self.emb_coverage.db_line_index)
+        diff = (self.__line_store or LineCoverageStore()).diff(line_store)
+        line_store.save(self.line_store_path)
+        self.__line_store = line_store
+        line_counts = {key: sum(map(len, diff[key].values()))
+                       for key in ("newly_covered_lines", "lost_lines", "newly_covered_db_lines", "lost_db_lines")}
+        # Lines are only compared for classes reported by both samples, the first sample only adds classes
+        line_counts["added_classes"] = len(diff["added_classes"])
+        return line_counts
+
+    @staticmethod
+    def __get_changed_classes(previous: dict, current: dict) -> Set[str]:
+        return {klazz for klazz in set(previous) | set(current) if previous.get(klazz) != current.get(klazz)}
+
+    def __update_class(self, klazz: str, db_coverage: Optional[List[dict]]) -> Set[int]:
+        """
+        Joins the reachable methods of a changed class again
+        Args:
+            klazz: changed class
+            db_coverage: new database coverage of the class, or None if its uncovered lines did not change
+
+        Returns:
+            Set[int]: positions of the endpoints whose reachable methods changed
+        """
+        reachable_methods = self.__reachable_methods_by_class.get(klazz)
+        if not reachable_methods:
+            return set()
+        if db_coverage is None:
+            db_coverage = self.emb_coverage.db_line_index.get_db_coverage(
+                {klazz: self.__uncovered_lines[klazz]} if klazz in self.__uncovered_lines else {}).get(klazz, [])
+        index = self.emb_coverage.reachability.index
+        coverage_join = ReachabilityCoverageJoin(
+            MethodCoverageIndex({klazz: self.__method_coverage[klazz]} if klazz in self.__method_coverage else {}),
+            DBCoverageIndex({klazz: db_coverage}))
+        changed_endpoints = set()
+        class_counts = [0] * COUNTERS
+        for method_id in reachable_methods:
+            coverage_join.add_method(klazz, index.methods[method_id][1], index.start_lines[method_id],
+                                     index.end_lines[method_id])
+            method_counts = coverage_join.method_counts.get(index.methods[method_id], (0,) * COUNTERS)
+            if self.__method_counts.get(method_id, (0,) * COUNTERS) != method_counts:
+                self.__method_counts[method_id] = method_counts
+                changed_endpoints.update(self.__endpoints_by_method[method_id])
+            for counter in range(COUNTERS):
+                class_counts[counter] += method_counts[counter]
+        previous_counts = self.__class_counts.get(klazz, [0] * COUNTERS)
+        for counter in range(COUNTERS):
+            self.__totals[counter] += class_counts[counter] - previous_counts[counter]
+        self.__class_counts[klazz] = class_counts
+        return changed_endpoints
+
+    def __get_endpoint_line_coverage(self, position: int) -> Tuple[int, int]:
+        covered_lines = 0
+        total_lines = 0
+        for method_id in self.__reachable_methods_by_endpoint[position]:
+            method_counts = self.__method_counts.get(method_id)
+            if method_counts is not None:
+                covered_lines += method_counts[0]
+                total_lines += method_counts[1]
+        return covered_lines, total_lines
+
+    def __get_reachability_coverage(self) -> dict:
+        overall_coverage = ReachabilityCoverageJoin.create_overall_coverage(tuple(self.__totals), {})
+        # The timeline leaves out the uncovered lines, which change with every sample
+        del overall_coverage["database_uncovered_lines"]
+        return overall_coverage
+
+    def __get_app_coverage(self, app_coverage: dict) -> dict:
+        current_coverage_details = app_coverage[list(app_coverage.keys())[0]]
+        return {"line_coverage": current_coverage_details["line"],
+                "branch_coverage": current_coverage_details["branch"],
+                "instruction_coverage": current_coverage_details["instruction"],
+                "database_interaction_line_coverage":
+                    self.__db_totals[0] / self.__db_totals[1] * 100.0 if self.__db_totals[1] > 0 else -100.0}
@@ -0,0 +1,187 @@
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from json import JSONDecodeError
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+from analysis_index import AnalysisIndex, AnalysisIndexCache
+from coverage_aggregation import APPLICATION_COVERAGE_FILE, REACHABILITY_COVERAGE_FILE, discover_runs
+from coverage_snapshot import CoverageSnapshot
+from emb_coverage import EMBCoverage
+from line_coverage_store import LINE_COVERAGE_FILE, LineCoverageStore
+
+# Directory of a run the raw agent responses are recorded to
+RECORDING_DIR = 'agent_responses'
+ANALYSIS_FILE = 'analysis.json'
+
+# Analysis indexes loaded by a replay worker process, by analysis hash
+_worker_indexes: Dict[str, AnalysisIndex] = {}
+
+
+def ensure_analysis_index(analysis_json_path: Path, cache_dir: Union[str, Path],
+                          build_missing: bool = False) -> Optional[str]:
+    """
+    Makes sure the analysis index of an analysis file is cached
+    Args:
+        analysis_json_path: analysis.json file
+        cache_dir: analysis index cache directory
+        build_missing: build a missing index from the symbol table and the dependency graph streamed from the
+            analysis file, which does not need CLDK and tolerates invalid UTF-8, a miss is an error if False
+
+    Returns:
+        Optional[str]: error, None if the index is cached
+    """
+    cache = AnalysisIndexCache(cache_dir)
+    try:
+        if not build_missing:
+            if not cache.get_index_path(cache.get_analysis_hash(analysis_json_path)).exists():
+                return f"No cached analysis index for {analysis_json_path}"
+        else:
+            cache.get_or_build(analysis_json_path)
+    except Exception as e:
+        return f"Building the analysis index of {analysis_json_path} failed: {e!r}"
+    return None
+
+
+def replay_run(run_dir: Union[str, Path], cache_dir: Union[str, Path], reachability_depth: int = 2,
+               output_dir: Union[str, Path, None] = None) -> Tuple[Optional[dict], Optional[dict]]:
+    """
+    Computes the reachability and the application coverage of an archived run from its recorded agent responses and
+    the cached analysis index of its analysis.json, without the agent or CLDK
+    Args:
+        run_dir: run directory with the analysis.json and the recorded responses
+        cache_dir: analysis index cache directory
+        reachability_depth: reachability depth
+        output_dir: directory to write the reports and the line coverage store of the run to, nothing is written if
+            None
+
+    Returns:
+        Tuple[Optional[dict], Optional[dict]]: reachability and application coverage
+    Raises:
+        FileNotFoundError: if the run has no recording or its analysis index is not cached
+    """
+    run_dir = Path(run_dir)
+    cache = AnalysisIndexCache(cache_dir)
+    analysis_hash = cache.get_analysis_hash(run_dir.joinpath(ANALYSIS_FILE))
+    analysis_index = _worker_indexes.get(analysis_hash)
+    if analysis_index is None:
+        analysis_index = AnalysisIndex.load(cache.get_index_path(analysis_hash))
+        if analysis_index is None:
+            raise FileNotFoundError(f"No cached analysis index for {run_dir.joinpath(ANALYSIS_FILE)}")
+        # The seeds of a SUT share the analysis, keep its index for the next runs of this worker
+        _worker_indexes[analysis_hash] = analysis_index
+
+    snapshot = CoverageSnapshot.load(run_dir.joinpath(RECORDING_DIR))
+    emb_coverage = EMBCoverage.from_index(analysis_index, 0, reachability_depth=reachability_depth)
+    reachability_coverage = emb_coverage.get_reachability_coverage(snapshot)
+    app_coverage = emb_coverage.get_app_coverage(snapshot)
+    if output_dir is not None:
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        with open(output_dir.joinpath(REACHABILITY_COVERAGE_FILE), 'w') as f:
+            json.dump(reachability_coverage, f)
+        with open(output_dir.joinpath(APPLICATION_COVERAGE_FILE), 'w') as f:
+            json.dump(app_coverage, f)
+        # Line-level coverage of the run, to diff seeds with LineCoverageStore.diff
+        try:
+            LineCoverageStore.from_snapshot(snapshot, emb_coverage.db_line_index).save(
+                output_dir.joinpath(LINE_COVERAGE_FILE))
+        except JSONDecodeError:
+            print('JSON Error')
+    return reachability_coverage, app_coverage
+
+
+def _replay_run(run_dir: Path, cache_dir: Union[str, Path], reachability_depth: int,
+                output_dir: Optional[Path]) -> Tuple[Optional[dict], Optional[dict], Optional[str]]:
+    try:
+        reachability_coverage, app_coverage = replay_run(run_dir, cache_dir, reachability_depth, output_dir)
+    except Exception as e:
+        return None, None, f"Replaying {run_dir.name} failed: {e!r}"
+    if output_dir is not None:
+        # The reports are on disk, do not send them back to the parent process
+        return None, None, None
+    return reachability_coverage, app_coverage, None
+
+
+def replay_runs(covs_dir: Union[str, Path], cache_dir: Union[str, Path], reachability_depth: int = 2,
+                output_dir: Union[str, Path, None] = None, max_workers: Optional[int] = None,
+                build_missing: bool = False) -> Dict[str, dict]:
+    """
+    Replays every archived run with a recording on a process pool. Missing analysis indexes are built first, once
+    per distinct analysis file, then the runs are evaluated; every worker loads an index at most once.
+    Args:
+        covs_dir: directory with one <sut>_<seed> directory per run
+        cache_dir: analysis index cache directory
+        reachability_depth: reachability depth
+        output_dir: directory to write the reports of every run to, in a directory named like the run, the reports
+            are returned instead if None
+        max_workers: number of worker processes, the number of CPUs if None
+        build_missing: build missing analysis indexes from the analysis files, runs without a cached index fail
+            if False
+
+    Returns:
+        Dict[str, dict]: per run name, the reachability and application coverage if not written, and the error if
+        the run could not be replayed
+    """
+    run_dirs: List[Path] = [run_dir for sut_runs in discover_runs(covs_dir).values() for _, run_dir in sut_runs
+                            if run_dir.joinpath(RECORDING_DIR).is_dir()]
+    results: Dict[str, dict] = {}
+    if len(run_dirs) == 0:
+        return results
+    analysis_files: Dict[str, Path] = {}
+    run_hashes: Dict[str, str] = {}
+    for run_dir in run_dirs:
+        try:
+            analysis_hash = AnalysisIndexCache.get_analysis_hash(run_dir.joinpath(ANALYSIS_FILE))
+        except OSError as e:
+            error = f"Reading the analysis file of {run_dir.name} failed: {e!r}"
+            print(f"Replaying {run_dir.name} failed: {error}")
+            results[run_dir.name] = {"reachability_coverage": None, "app_coverage": None, "error": error}
+            continue
+        analysis_files.setdefault(analysis_hash, run_dir.joinpath(ANALYSIS_FILE))
+        run_hashes[run_dir.name] = analysis_hash
+
+    with ProcessPoolExecutor(max_workers=min(max_workers or os.cpu_count() or 1, len(run_dirs))) as executor:
+        index_errors = dict(zip(analysis_files.keys(),
+                                executor.map(ensure_analysis_index, analysis_files.values(),
+                                             [cache_dir] * len(analysis_files),
+                                             [build_missing] * len(analysis_files))))
+        replayed_dirs = []
+        for run_dir in run_dirs:
+            if run_dir.name not in run_hashes:
+                continue
+            error = index_errors[run_hashes[run_dir.name]]
+            if error is not None:
+                print(f"Replaying {run_dir.name} failed: {error}")
+                results[run_dir.name] = {"reachability_coverage": None, "app_coverage": None, "error": error}
+            else:
+                replayed_dirs.append(run_dir)
+        run_output_dirs = [Path(output_dir).joinpath(run_dir.name) if output_dir is not None else None
+                           for run_dir in replayed_dirs]
+        for run_dir, (reachability_coverage, app_coverage, error) in zip(
+                replayed_dirs, executor.map(_replay_run, replayed_dirs, [cache_dir] * len(replayed_dirs),
+                                            [reachability_depth] * len(replayed_dirs), run_output_dirs)):
+            if error is not None:
+                print(error)
+            results[run_dir.name] = {"reachability_coverage": reachability_coverage, "app_coverage": app_coverage,
+                                     "error": error}
+    return {run_dir.name: results[run_dir.name] for run_dir in run_dirs}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Computes the coverage reports of archived runs from their recorded "
+                                                 "agent responses")
+    parser.add_argument('covs_dir', nargs='?', default='covs', help="directory with the <sut>_<seed> results")
+    parser.add_argument('--cache-dir', default='.analysis_index_cache', help="analysis index cache directory")
+    parser.add_argument('--output-dir', default='replayed', help="directory to write the replayed reports to")
+    parser.add_argument('--reachability-depth', type=int, default=2, help="reachability depth")
+    parser.add_argument('--workers', type=int, default=None, help="number of worker processes")
+    parser.add_argument('--build-missing', action='store_true',
+                        help="build missing analysis indexes from the analysis files instead of skipping the runs")
+    arguments = parser.parse_args()
+    replayed = replay_runs(arguments.covs_dir, arguments.cache_dir, arguments.reachability_depth,
+                           arguments.output_dir, arguments.workers, arguments.build_missing)
+    failed = [name for name, result in replayed.items() if result["error"] is not None]
+    print(f"Replayed {len(replayed) - len(failed)} of {len(replayed)} runs")
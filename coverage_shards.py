@@ -0,0 +1,259 @@
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, TypeVar, Union
+
+import numpy as np
+
+from analysis_index import AnalysisIndex
+from coverage_join import CoverageLookup, DBCoverageIndex, MethodCoverageIndex, ReachabilityCoverageJoin
+from coverage_table import ColumnarCoverageJoin
+from db_line_index import DBLineIndex
+
+T = TypeVar('T')
+
+# Shared index of a shard worker process, mapped once from the index directory
+_worker_index: Optional['SharedShardIndex'] = None
+
+
+def get_shards(items: List[T], shard_count: int) -> List[List[T]]:
+    """
+    Splits items into at most shard_count contiguous shards of nearly equal size, so that concatenating the shards
+    gives the items back in order
+    Args:
+        items:
+        shard_count:
+
+    Returns:
+        List[List[T]]: non-empty shards
+    """
+    shard_count = max(1, min(shard_count, len(items)))
+    shard_size, remainder = divmod(len(items), shard_count)
+    shards = []
+    start = 0
+    for shard in range(shard_count):
+        end = start + shard_size + (1 if shard < remainder else 0)
+        if end > start:
+            shards.append(items[start:end])
+        start = end
+    return shards
+
+
+class SharedShardIndex:
+    """
+    Read-only part of the analysis index the shard workers need: the class, signature and line range of every method
+    of the call graph, and the database interaction lines of every method. It is saved as flat .npy arrays that each
+    worker maps into memory, so that all the workers share one copy through the page cache instead of each
+    unpickling the whole analysis index.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        self.arrays = arrays
+
+    @staticmethod
+    def save(analysis_index: AnalysisIndex, index_dir: Union[str, Path]):
+        """
+        Writes the arrays of the shared index to the given directory
+        Args:
+            analysis_index: indexes derived from the analysis of the application
+            index_dir: directory to write one .npy file per array to
+        """
+        call_graph = analysis_index.call_graph
+        classes = sorted({qualified_class_name for qualified_class_name, _ in call_graph.methods})
+        class_ids = {qualified_class_name: class_id for class_id, qualified_class_name in enumerate(classes)}
+        db_classes = sorted(analysis_index.db_lines.methods_by_class)
+        db_methods = [method for qualified_class_name in db_classes
+                      for method in analysis_index.db_lines.methods_by_class[qualified_class_name]]
+        arrays = {"classes": np.array(classes, dtype=str),
+                  "method_class_ids": np.array([class_ids[qualified_class_name]
+                                                for qualified_class_name, _ in call_graph.methods], dtype=np.int64),
+                  "method_signatures": np.array([method_signature for _, method_signature in call_graph.methods],
+                                                dtype=str),
+                  "start_lines": np.array(call_graph.start_lines, dtype=np.int64),
+                  "end_lines": np.array(call_graph.end_lines, dtype=np.int64),
+                  # Methods of the i-th class are the rows db_class_offsets[i] to db_class_offsets[i + 1]
+                  "db_classes": np.array(db_classes, dtype=str),
+                  "db_class_offsets": np.cumsum([0] + [len(analysis_index.db_lines.methods_by_class[klazz])
+                                                       for klazz in db_classes], dtype=np.int64),
+                  "db_signatures": np.array([method[0] for method in db_methods], dtype=str),
+                  "db_start_lines": np.array([method[1] for method in db_methods], dtype=np.int64),
+                  "db_end_lines": np.array([method[2] for method in db_methods], dtype=np.int64),
+                  "db_line_offsets": np.cumsum([0] + [len(method[3]) for method in db_methods], dtype=np.int64),
+                  "db_lines": np.array([line for method in db_methods for line in method[3]], dtype=np.int64)}
+        index_dir = Path(index_dir)
+        index_dir.mkdir(parents=True, exist_ok=True)
+        for name, array in arrays.items():
+            np.save(index_dir.joinpath(f"{name}.npy"), array)
+
+    @classmethod
+    def load(cls, index_dir: Union[str, Path]) -> 'SharedShardIndex':
+        """
+        Maps the arrays of a shared index saved with save, read-only
+        Args:
+            index_dir: directory the arrays were written to
+
+        Returns:
+            SharedShardIndex: memory-mapped shared index
+        """
+        return cls({path.stem: np.load(path, mmap_mode='r') for path in Path(index_dir).glob('*.npy')})
+
+    def get_method(self, method_id: int) -> Tuple[str, str, int, int]:
+        """
+        Returns:
+            Tuple[str, str, int, int]: class, signature, start line and end line of the method
+        """
+        arrays = self.arrays
+        return (str(arrays["classes"][arrays["method_class_ids"][method_id]]),
+                str(arrays["method_signatures"][method_id]),
+                int(arrays["start_lines"][method_id]), int(arrays["end_lines"][method_id]))
+
+    def get_db_line_index(self, classes: List[str]) -> DBLineIndex:
+        """
+        Builds the database interaction line index of the given classes from the mapped arrays
+        Args:
+            classes: classes of a shard
+
+        Returns:
+            DBLineIndex: database interaction line index of the classes
+        """
+        arrays = self.arrays
+        db_classes = arrays["db_classes"]
+        db_class_offsets = arrays["db_class_offsets"]
+        db_line_offsets = arrays["db_line_offsets"]
+        methods_by_class = {}
+        for qualified_class_name in classes:
+            position = int(np.searchsorted(db_classes, qualified_class_name))
+            if position == len(db_classes) or db_classes[position] != qualified_class_name:
+                continue
+            methods_by_class[qualified_class_name] = [
+                (str(arrays["db_signatures"][row]), int(arrays["db_start_lines"][row]),
+                 int(arrays["db_end_lines"][row]),
+                 tuple(arrays["db_lines"][db_line_offsets[row]:db_line_offsets[row + 1]].tolist()))
+                for row in range(db_class_offsets[position], db_class_offsets[position + 1])]
+        return DBLineIndex(methods_by_class)
+
+
+def _init_shard_worker(index_dir: str):
+    global _worker_index
+    _worker_index = SharedShardIndex.load(index_dir)
+
+
+def _get_db_coverage_shard(uncovered_lines: Dict[str, dict]) -> Dict[str, List[dict]]:
+    """
+    Computes the database coverage of a shard of classes of the /uncovered response
+    Returns:
+        Dict[str, List[dict]]: database coverage of each method, per class
+    """
+    return _worker_index.get_db_line_index(list(uncovered_lines)).get_db_coverage(uncovered_lines)
+
+
+def _join_class_shard(coverage_details: Dict[str, dict], db_coverage: dict, method_ids: List[int]) -> list:
+    """
+    Joins the reachable methods of a shard of classes with the coverage of those classes
+    Returns:
+        list: joined coverage details of each method, in the order of the method IDs
+    """
+    coverage_lookup = CoverageLookup(MethodCoverageIndex(coverage_details), DBCoverageIndex(db_coverage))
+    return [coverage_lookup.join_method(*_worker_index.get_method(method_id)) for method_id in method_ids]
+
+
+class CoverageShardPool:
+    """
+    Process pool computing the database coverage and joining the reachable methods shard by shard of classes, so
+    that each worker only indexes and joins the coverage of its classes. The agent responses are parsed once by the
+    caller, and each shard is sent only the entries of its classes. The workers read the method line ranges and the
+    database interaction lines from a SharedShardIndex that every worker maps into memory when it starts, so that
+    neither the CLDK analysis nor the index is sent with the shards or copied per worker. Shard results are merged
+    in the serial order, which gives the same result as the serial evaluation.
+    """
+
+    def __init__(self, analysis_index: AnalysisIndex, max_workers: Optional[int] = None,
+                 index_dir: Union[str, Path, None] = None):
+        """
+        Args:
+            analysis_index: indexes derived from the analysis of the application
+            max_workers: number of worker processes, the number of CPUs if None
+            index_dir: directory to write the shared index to for the workers to map, a temporary directory if None
+        """
+        self.analysis_index = analysis_index
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.__temporary_dir: Optional[tempfile.TemporaryDirectory] = None
+        if index_dir is None:
+            self.__temporary_dir = tempfile.TemporaryDirectory()
+            index_dir = self.__temporary_dir.name
+        self.index_dir = Path(index_dir)
+        SharedShardIndex.save(analysis_index, self.index_dir)
+        self.__executor: Optional[ProcessPoolExecutor] = None
+
+    def get_db_coverage(self, uncovered_lines: Dict[str, dict]) -> Dict[str, List[dict]]:
+        """
+        Computes the database coverage like DBLineIndex.get_db_coverage, with the classes dealt out to the workers
+        Args:
+            uncovered_lines: parsed /uncovered response of the agent, each worker is sent the entries of its classes
+
+        Returns:
+            Dict[str, List[dict]]: database coverage of each method, per class
+        """
+        class_shards = get_shards(list(uncovered_lines), self.max_workers)
+        db_coverage = {}
+        for shard_db_coverage in self.__get_executor().map(
+                _get_db_coverage_shard, [{klazz: uncovered_lines[klazz] for klazz in shard}
+                                         for shard in class_shards]):
+            db_coverage.update(shard_db_coverage)
+        # Keep the classes in the order of the response, like the serial computation
+        return {klazz: db_coverage[klazz] for klazz in uncovered_lines if klazz in db_coverage}
+
+    def join_methods(self, coverage_join: Union[ReachabilityCoverageJoin, ColumnarCoverageJoin],
+                     coverage_details: Dict[str, dict], db_coverage: dict, method_ids: List[int]):
+        """
+        Joins methods with their coverage, one shard of classes per worker, and adds them to the join in the given
+        order, so that the join is the same as joining them one after another
+        Args:
+            coverage_join: coverage join to add the methods to
+            coverage_details: parsed /methodcoverage response of the agent, each worker is sent the entries of its
+                classes
+            db_coverage: database coverage of each method, per class
+            method_ids: IDs of the methods in the call graph index, in the order to add them in
+        """
+        methods = self.analysis_index.call_graph.methods
+        method_ids_by_class: Dict[str, List[int]] = {}
+        for method_id in method_ids:
+            method_ids_by_class.setdefault(methods[method_id][0], []).append(method_id)
+        class_shards = get_shards(list(method_ids_by_class), self.max_workers)
+        method_id_shards = [[method_id for klazz in shard for method_id in method_ids_by_class[klazz]]
+                            for shard in class_shards]
+        coverage_details_shards = [{klazz: coverage_details[klazz] for klazz in shard if klazz in coverage_details}
+                                   for shard in class_shards]
+        db_coverage_shards = [{klazz: db_coverage[klazz] for klazz in shard if klazz in db_coverage}
+                              for shard in class_shards]
+        joined_methods = {}
+        for shard_method_ids, shard_joined_methods in zip(method_id_shards, self.__get_executor().map(
+                _join_class_shard, coverage_details_shards, db_coverage_shards, method_id_shards)):
+            joined_methods.update(zip(shard_method_ids, shard_joined_methods))
+        for method_id in method_ids:
+            qualified_class_name, method_signature = methods[method_id]
+            coverage_join.add_joined_method(qualified_class_name, method_signature, joined_methods[method_id])
+
+    def close(self):
+        """
+        Shuts down the worker processes and removes the temporary index directory
+        """
+        if self.__executor is not None:
+            self.__executor.shutdown(cancel_futures=True)
+            self.__executor = None
+        if self.__temporary_dir is not None:
+            self.__temporary_dir.cleanup()
+            self.__temporary_dir = None
+
+    def __get_executor(self) -> ProcessPoolExecutor:
+        if self.__executor is None:
+            self.__executor = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_shard_worker,
+                                                  initargs=(str(self.index_dir),))
+        return self.__executor
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,163 @@
+import json
+import os
+import time
+from json import JSONDecodeError
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from agent_client import AgentClient
+
+METHOD_COVERAGE_PATH = "/methodcoverage"
+UNCOVERED_LINES_PATH = "/uncovered"
+APP_COVERAGE_PATH = "/appcoverage"
+AGENT_PATHS = [METHOD_COVERAGE_PATH, UNCOVERED_LINES_PATH, APP_COVERAGE_PATH]
+# Agent paths each report reads, the database coverage of both comes from the uncovered lines
+REACHABILITY_PATHS = [METHOD_COVERAGE_PATH, UNCOVERED_LINES_PATH]
+APPLICATION_PATHS = [APP_COVERAGE_PATH, UNCOVERED_LINES_PATH]
+# Index of a recorded snapshot, listing the status code and the response file of every agent path
+RECORDING_INDEX_FILE = 'responses.json'
+
+
+class AgentResponseError(JSONDecodeError):
+    """
+    Raised when the response of an agent path is used but the request failed or did not return 200. It is a
+    JSONDecodeError, so that an agent outage takes the same error path as an unparseable response.
+    """
+
+    def __init__(self, path: str, status_code: int, response: Any):
+        self.path = path
+        self.status_code = status_code
+        super().__init__(f"Agent request {path} failed with status {status_code}: {response}", '', 0)
+
+
+class CoverageSnapshot:
+    """
+    One capture of the coverage monitoring agent endpoints. The endpoints are fetched together, and each response
+    is parsed at most once, so that every report computed from the snapshot sees the same coverage.
+    """
+
+    def __init__(self, responses: Dict[str, Tuple[int, Any]], captured_at: Optional[float] = None):
+        self.responses = responses
+        self.captured_at = time.monotonic() if captured_at is None else captured_at
+        self.__parsed: Dict[str, Any] = {}
+
+    @classmethod
+    def capture(cls, agent_client: AgentClient, paths: Optional[List[str]] = None) -> 'CoverageSnapshot':
+        """
+        Fetches the agent endpoints concurrently
+        Args:
+            agent_client: client of the coverage monitoring agent
+            paths: agent paths to fetch, all of them if None
+
+        Returns:
+            CoverageSnapshot: snapshot of the agent endpoints
+        """
+        paths = AGENT_PATHS if paths is None else paths
+        return cls(dict(zip(paths, agent_client.fetch_all(paths))))
+
+    @property
+    def method_coverage(self) -> dict:
+        """
+        Method-level coverage, keyed by class and then by method name and line
+        Raises:
+            JSONDecodeError: if the agent response is not valid JSON
+        """
+        return self.__get_parsed(METHOD_COVERAGE_PATH)
+
+    @property
+    def uncovered_lines(self) -> dict:
+        """
+        Uncovered lines, keyed by class and then by method name and line
+        Raises:
+            JSONDecodeError: if the agent response is not valid JSON
+        """
+        return self.__get_parsed(UNCOVERED_LINES_PATH)
+
+    @property
+    def app_coverage(self) -> dict:
+        """
+        Application-level line, branch and instruction coverage
+        Raises:
+            JSONDecodeError: if the agent response is not valid JSON
+        """
+        return self.__get_parsed(APP_COVERAGE_PATH)
+
+    def get_response(self, path: str) -> str:
+        """
+        Returns the raw response of an agent path
+        Args:
+            path: agent path
+
+        Returns:
+            str: response body
+        Raises:
+            AgentResponseError: if the request failed, did not return 200 or the path was not captured
+        """
+        if path not in self.responses:
+            raise AgentResponseError(path, -100, 'Not captured in the snapshot')
+        status_code, response = self.responses[path]
+        if path in self.get_failed_paths():
+            raise AgentResponseError(path, status_code, response)
+        return response
+
+    def get_failed_paths(self) -> Dict[str, int]:
+        """
+        Returns:
+            Dict[str, int]: status code of every agent path whose request failed or did not return 200
+        """
+        return {path: status_code for path, (status_code, response) in self.responses.items()
+                if status_code != 200 or not isinstance(response, str)}
+
+    def save(self, recording_dir: Union[str, Path]):
+        """
+        Records the raw agent responses in the given directory, one file per agent path, so that the reports can be
+        computed again later without the agent. A failed request is recorded with its error message.
+        Args:
+            recording_dir: directory to write the responses to
+        """
+        recording_dir = Path(recording_dir)
+        recording_dir.mkdir(parents=True, exist_ok=True)
+        recording_index = {}
+        for path, (status_code, response) in self.responses.items():
+            file_name = path.strip('/').replace('/', '_') + '.json'
+            with open(recording_dir.joinpath(file_name), 'w', encoding='utf-8') as f:
+                f.write(response if isinstance(response, str) else str(response))
+            recording_index[path] = {"status_code": status_code, "file": file_name}
+        # Write the index last, so that a recording without one is known to be incomplete
+        temporary_path = recording_dir.joinpath(RECORDING_INDEX_FILE + '.tmp')
+        with open(temporary_path, 'w') as f:
+            json.dump(recording_index, f, indent=4)
+        os.replace(temporary_path, recording_dir.joinpath(RECORDING_INDEX_FILE))
+
+    @classmethod
+    def load(cls, recording_dir: Union[str, Path]) -> 'CoverageSnapshot':
+        """
+        Loads a snapshot recorded with save
+        Args:
+            recording_dir: directory the responses were written to
+
+        Returns:
+            CoverageSnapshot: recorded snapshot
+        Raises:
+            FileNotFoundError: if there is no complete recording in the directory
+        """
+        recording_dir = Path(recording_dir)
+        with open(recording_dir.joinpath(RECORDING_INDEX_FILE)) as f:
+            recording_index = json.load(f)
+        responses = {}
+        for path, response in recording_index.items():
+            with open(recording_dir.joinpath(response["file"]), encoding='utf-8', errors='replace') as f:
+                responses[path] = (response["status_code"], f.read())
+        return cls(responses)
+
+    def age(self) -> float:
+        """
+        Returns:
+            float: seconds elapsed since the snapshot was captured
+        """
+        return time.monotonic() - self.captured_at
+
+    def __get_parsed(self, path: str) -> Any:
+        if path not in self.__parsed:
+            self.__parsed[path] = json.loads(self.get_response(path))
+        return self.__parsed[path]
@@ -0,0 +1,78 @@
+import json
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterable, List, Optional, Tuple, Union
+
+from coverage_join import DBCoverageIndex, MethodCoverageIndex, ReachabilityCoverageJoin
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(value: Any) -> bytes:
+    """
+    Encodes a value as JSON, with orjson if it is installed
+    """
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value).encode('utf-8')
+
+
+class StreamingCoverageJoin(ReachabilityCoverageJoin):
+    """
+    Reachability coverage join that hands the method-wise entries to the caller instead of keeping them, so that
+    only the overall totals and the uncovered database interaction lines are held until the end
+    """
+
+    def __init__(self, method_coverage: MethodCoverageIndex, db_coverage: DBCoverageIndex, structured: bool = False):
+        super().__init__(method_coverage, db_coverage)
+        # Report the uncovered database interaction lines per class and method instead of as a JSON string
+        self.structured = structured
+
+    def add_method_coverage(self, qualified_class_name: str, method_signature: str, method_counts: Tuple[int, ...],
+                            db_uncovered_lines: List[int]) -> dict:
+        return self.create_method_coverage(method_signature, method_counts, db_uncovered_lines)
+
+    def get_overall_coverage(self, method_order: Optional[Iterable[Tuple[str, str]]] = None) -> dict:
+        """
+        Computes the overall coverage of all the methods joined so far
+        Args:
+            method_order: class and signature of the methods in the order of the reachability coverage report, if
+                they were joined in another order
+
+        Returns:
+            dict: overall line, branch, instruction and database interaction coverage
+        """
+        overall_coverage = super().get_overall_coverage()
+        db_uncovered_lines = self.db_uncovered_lines_app
+        if method_order is not None:
+            db_uncovered_lines = {method: db_uncovered_lines[method] for method in method_order
+                                  if method in db_uncovered_lines}
+        if self.structured:
+            structured_db_uncovered_lines: Dict[str, Dict[str, List[int]]] = {}
+            for (qualified_class_name, method_signature), lines in db_uncovered_lines.items():
+                structured_db_uncovered_lines.setdefault(qualified_class_name, {})[method_signature] = lines
+            overall_coverage["database_uncovered_lines"] = structured_db_uncovered_lines
+        else:
+            overall_coverage["database_uncovered_lines"] = self.format_db_uncovered_lines(db_uncovered_lines)
+        return overall_coverage
+
+
+def write_coverage_report(items: Iterable[Tuple[str, Any]], output: Union[str, Path, BinaryIO]):
+    """
+    Writes a coverage report as a JSON object, one member at a time as the items are produced
+    Args:
+        items: key and value of every member, e.g. from EMBCoverage.iter_reachability_coverage
+        output: file to write to, or a binary stream
+    """
+    if isinstance(output, (str, Path)):
+        with open(output, 'wb') as f:
+            write_coverage_report(items, f)
+        return
+    output.write(b'{')
+    separator = b''
+    for key, value in items:
+        output.write(separator + dumps(key) + b':' + dumps(value))
+        separator = b','
+    output.write(b'}')
@@ -0,0 +1,255 @@
+import csv
+import json
+from array import array
+from pathlib import Path
+from typing import Dict, List, Set, Tuple, Union
+
+import numpy as np
+
+from coverage_join import CoverageLookup, DBCoverageIndex, MethodCoverageIndex, ReachabilityCoverageJoin
+
+# Counter columns of a coverage table, in the order of the method counts of the coverage join
+COUNT_COLUMNS = ("covered_lines", "total_lines", "covered_branches", "total_branches", "covered_instructions",
+                 "total_instructions", "covered_db_lines", "total_db_lines")
+# Percentage columns, each computed from a pair of counter columns
+PERCENTAGE_COLUMNS = {"line_coverage": ("covered_lines", "total_lines"),
+                      "branch_coverage": ("covered_branches", "total_branches"),
+                      "instruction_coverage": ("covered_instructions", "total_instructions"),
+                      "database_interaction_coverage": ("covered_db_lines", "total_db_lines")}
+
+
+class CoverageTable:
+    """
+    Method-wise reachability coverage stored column by column. Each row is one agent entry of a reachable method,
+    in the order of the coverage report. Class names and method signatures are interned into integer IDs, and
+    percentages are computed from the counters on demand, masked where the total is zero.
+    """
+
+    def __init__(self, classes: List[str], signatures: List[str], class_ids: np.ndarray, signature_ids: np.ndarray,
+                 counts: Dict[str, np.ndarray], db_uncovered_lines: Dict[int, List[int]], overall_coverage: dict):
+        self.classes = classes
+        self.signatures = signatures
+        self.class_ids = class_ids
+        self.signature_ids = signature_ids
+        self.counts = counts
+        # Uncovered database interaction lines of the rows that have any
+        self.db_uncovered_lines = db_uncovered_lines
+        self.overall_coverage = overall_coverage
+
+    def __len__(self) -> int:
+        return len(self.class_ids)
+
+    def get_percentages(self) -> Dict[str, np.ma.MaskedArray]:
+        """
+        Computes all the percentage columns in one pass
+        Returns:
+            Dict[str, np.ma.MaskedArray]: line, branch, instruction and database interaction coverage of each row,
+                masked where there is nothing to cover
+        """
+        percentages = {}
+        for column, (covered_column, total_column) in PERCENTAGE_COLUMNS.items():
+            covered = self.counts[covered_column]
+            total = self.counts[total_column]
+            missing = total <= 0
+            percentages[column] = np.ma.masked_array(covered / np.where(missing, 1, total) * 100.0, mask=missing)
+        return percentages
+
+    def to_coverage_dict(self) -> Dict[str, List[dict]]:
+        """
+        Returns the table in the shape of the coverage report of EMBCoverage.get_reachability_coverage
+        Returns:
+            Dict[str, List[dict]]: coverage report
+        """
+        percentages = {column: values.filled(-100.0).tolist() for column, values in self.get_percentages().items()}
+        coverage_dict: Dict[str, List[dict]] = {}
+        for row, (class_id, signature_id) in enumerate(zip(self.class_ids.tolist(), self.signature_ids.tolist())):
+            coverage_dict.setdefault(self.classes[class_id], []).append(
+                {"method_signature": self.signatures[signature_id],
+                 "line_coverage": percentages["line_coverage"][row],
+                 "branch_coverage": percentages["branch_coverage"][row],
+                 "instruction_coverage": percentages["instruction_coverage"][row],
+                 "database_interaction_coverage": percentages["database_interaction_coverage"][row],
+                 "database_uncovered_lines": self.db_uncovered_lines.get(row)})
+        coverage_dict["overall_coverage"] = [self.overall_coverage]
+        return coverage_dict
+
+    def get_columns(self) -> Dict[str, list]:
+        """
+        Returns the table as flat columns with class names and method signatures resolved, and missing
+        percentages as None
+        Returns:
+            Dict[str, list]: values of each column
+        """
+        columns = {"qualified_class_name": [self.classes[class_id] for class_id in self.class_ids.tolist()],
+                   "method_signature": [self.signatures[signature_id]
+                                        for signature_id in self.signature_ids.tolist()]}
+        for column in COUNT_COLUMNS:
+            columns[column] = self.counts[column].tolist()
+        for column, values in self.get_percentages().items():
+            columns[column] = values.tolist()
+        columns["database_uncovered_lines"] = [self.db_uncovered_lines.get(row) for row in range(len(self))]
+        return columns
+
+    def to_parquet(self, path: Union[str, Path]):
+        """
+        Writes the table to a Parquet file, with class names and method signatures dictionary-encoded. Requires
+        pyarrow.
+        Args:
+            path: Parquet file
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        columns = {"qualified_class_name": pa.DictionaryArray.from_arrays(pa.array(self.class_ids, pa.int32()),
+                                                                          pa.array(self.classes, pa.string())),
+                   "method_signature": pa.DictionaryArray.from_arrays(pa.array(self.signature_ids, pa.int32()),
+                                                                      pa.array(self.signatures, pa.string()))}
+        for column in COUNT_COLUMNS:
+            columns[column] = pa.array(self.counts[column])
+        for column, values in self.get_percentages().items():
+            columns[column] = pa.array(values.data, mask=np.ma.getmaskarray(values))
+        columns["database_uncovered_lines"] = pa.array(
+            [self.db_uncovered_lines.get(row) for row in range(len(self))], pa.list_(pa.int32()))
+        table = pa.table(columns, metadata={"overall_coverage": json.dumps(self.overall_coverage)})
+        pq.write_table(table, path)
+
+    def to_csv(self, path: Union[str, Path]):
+        """
+        Writes the table to a CSV file, leaving missing percentages empty
+        Args:
+            path: CSV file
+        """
+        columns = self.get_columns()
+        columns["database_uncovered_lines"] = [' '.join(map(str, lines)) if lines else None
+                                               for lines in columns["database_uncovered_lines"]]
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(columns.keys())
+            writer.writerows(zip(*columns.values()))
+
+    def to_json(self, path: Union[str, Path]):
+        """
+        Writes the table to a JSON file in the shape of the coverage report
+        Args:
+            path: JSON file
+        """
+        with open(path, 'w') as f:
+            json.dump(self.to_coverage_dict(), f)
+
+
+class ColumnarCoverageJoin(CoverageLookup):
+    """
+    Coverage join that appends the method-wise coverage to typed columns instead of building a dict per entry.
+    The overall coverage is computed from the columns, so no per-method state is kept besides the interned IDs of
+    the methods joined so far. Each method is counted once, however many endpoints reach it.
+    """
+
+    def __init__(self, method_coverage: MethodCoverageIndex, db_coverage: DBCoverageIndex):
+        super().__init__(method_coverage, db_coverage)
+        self.classes: List[str] = []
+        self.signatures: List[str] = []
+        self.class_ids = array('i')
+        self.signature_ids = array('i')
+        self.counts = {column: array('q') for column in COUNT_COLUMNS}
+        self.db_uncovered_lines: Dict[int, List[int]] = {}
+        # Class and signature IDs of the methods joined so far
+        self.processed_methods: Set[Tuple[int, int]] = set()
+        self.__class_ids: Dict[str, int] = {}
+        self.__signature_ids: Dict[str, int] = {}
+
+    def add_method(self, qualified_class_name: str, method_signature: str, start_line: int,
+                   end_line: int) -> List[int]:
+        """
+        Joins a reachable method with its coverage details
+        Args:
+            qualified_class_name:
+            method_signature:
+            start_line:
+            end_line:
+
+        Returns:
+            List[int]: rows added for the method, empty if it was already processed
+        """
+        if self.__get_method_ids(qualified_class_name, method_signature) in self.processed_methods:
+            return []
+        return self.add_joined_method(qualified_class_name, method_signature,
+                                      self.join_method(qualified_class_name, method_signature, start_line, end_line))
+
+    def add_joined_method(self, qualified_class_name: str, method_signature: str,
+                          joined_method: List[Tuple[Tuple[int, ...], List[int]]]) -> List[int]:
+        """
+        Appends the coverage details of a method looked up with join_method, one row per agent entry
+        Args:
+            qualified_class_name:
+            method_signature:
+            joined_method: counters and uncovered database interaction lines of each agent entry of the method
+
+        Returns:
+            List[int]: rows added for the method, empty if it was already processed
+        """
+        method_ids = self.__get_method_ids(qualified_class_name, method_signature)
+        if method_ids in self.processed_methods:
+            return []
+        self.processed_methods.add(method_ids)
+        class_id, signature_id = method_ids
+        rows = []
+        for method_counts, db_uncovered_lines in joined_method:
+            row = len(self.class_ids)
+            self.class_ids.append(class_id)
+            self.signature_ids.append(signature_id)
+            for column, count in zip(COUNT_COLUMNS, method_counts):
+                self.counts[column].append(count)
+            if len(db_uncovered_lines) > 0:
+                self.db_uncovered_lines[row] = db_uncovered_lines
+            rows.append(row)
+        return rows
+
+    def get_overall_coverage(self) -> dict:
+        """
+        Computes the overall coverage of all the methods joined so far from the columns
+        Returns:
+            dict: overall line, branch, instruction and database interaction coverage
+        """
+        counts = tuple(sum(self.counts[column]) for column in COUNT_COLUMNS)
+        # Like the coverage report, the last agent entry with database interactions of each method wins
+        db_uncovered_lines: Dict[Tuple[str, str], List[int]] = {}
+        for row, total_db_lines in enumerate(self.counts["total_db_lines"]):
+            if total_db_lines > 0:
+                method = (self.classes[self.class_ids[row]], self.signatures[self.signature_ids[row]])
+                db_uncovered_lines[method] = self.db_uncovered_lines.get(row, [])
+        return ReachabilityCoverageJoin.create_overall_coverage(counts, db_uncovered_lines)
+
+    def __get_method_ids(self, qualified_class_name: str, method_signature: str) -> Tuple[int, int]:
+        """
+        Returns the class and signature IDs of a method, interning them if needed
+        """
+        class_id = self.__class_ids.get(qualified_class_name)
+        if class_id is None:
+            class_id = self.__class_ids[qualified_class_name] = len(self.classes)
+            self.classes.append(qualified_class_name)
+        signature_id = self.__signature_ids.get(method_signature)
+        if signature_id is None:
+            signature_id = self.__signature_ids[method_signature] = len(self.signatures)
+            self.signatures.append(method_signature)
+        return class_id, signature_id
+
+    def get_coverage_table(self) -> CoverageTable:
+        """
+        Returns the coverage table of all the methods joined so far. Rows are grouped by class in the order the
+        classes were first joined, like the coverage report.
+        Returns:
+            CoverageTable: coverage table
+        """
+        class_ids = np.frombuffer(self.class_ids, dtype=np.int32)
+        # A stable sort keeps the rows of each class in join order
+        rows = np.argsort(class_ids, kind='stable')
+        db_uncovered_lines = {}
+        if len(self.db_uncovered_lines) > 0:
+            new_rows = np.empty_like(rows)
+            new_rows[rows] = np.arange(len(rows))
+            db_uncovered_lines = {int(new_rows[row]): lines for row, lines in self.db_uncovered_lines.items()}
+        return CoverageTable(list(self.classes), list(self.signatures), class_ids[rows],
+                             np.frombuffer(self.signature_ids, dtype=np.int32)[rows],
+                             {column: np.frombuffer(values, dtype=np.int64)[rows]
+                              for column, values in self.counts.items()},
+                             db_uncovered_lines, self.get_overall_coverage())
@@ -0,0 +1,144 @@
+from typing import TYPE_CHECKING, Dict, List, Tuple
+
+from call_graph_index import CallGraphIndex
+
+if TYPE_CHECKING:
+    from cldk.analysis.java import JavaAnalysis
+
+# Signature, start line, end line and database interaction lines of a method
+MethodDBLines = Tuple[str, int, int, Tuple[int, ...]]
+
+
+class DBLineIndex:
+    """
+    Static index of the database interaction lines of every method: CRUD operations, calls on @Entity objects and
+    calls to @Transactional methods. None of it depends on runtime coverage, so it is built once per analysis and
+    each coverage evaluation only intersects it with the uncovered lines.
+    """
+
+    def __init__(self, methods_by_class: Dict[str, List[MethodDBLines]]):
+        self.methods_by_class = methods_by_class
+        self.__methods_at_line: Dict[Tuple[str, int], List[MethodDBLines]] = {}
+        self.__test_classes: Dict[str, bool] = {}
+
+    @classmethod
+    def from_analysis(cls, analysis: 'JavaAnalysis') -> 'DBLineIndex':
+        """
+        Builds the index from the symbol table of the analysis
+        Args:
+            analysis: CLDK analysis of the application
+
+        Returns:
+            DBLineIndex: database interaction line index
+        """
+        all_classes = analysis.get_classes()
+        entity_classes = {klazz for klazz in all_classes if all_classes[klazz] is not None and
+                          any(annotation in ['@Entity'] for annotation in all_classes[klazz].annotations)}
+        methods_by_class = {}
+        for klazz in all_classes:
+            class_details = all_classes[klazz]
+            if class_details is None:
+                continue
+            methods_in_class = []
+            for method_signature, method_details in class_details.callable_declarations.items():
+                if method_details.is_constructor:
+                    continue
+                db_lines_per_method = [crud_operation.line_number
+                                       for crud_operation in method_details.crud_operations]
+                # Add all the method call on Entity objects
+                for call_site in method_details.call_sites:
+                    if call_site.receiver_type is not None and call_site.receiver_type in entity_classes:
+                        db_lines_per_method.append(call_site.start_line)
+
+                # Add method calls where the callee method has annotation @Transactional (applicable for mybatis)
+                for call_site in method_details.call_sites:
+                    receiver_class = all_classes.get(call_site.receiver_type) if call_site.receiver_type else None
+                    if receiver_class is None:
+                        continue
+                    callee_method = receiver_class.callable_declarations.get(
+                        CallGraphIndex.process_callee_signature(call_site.callee_signature))
+                    if callee_method:
+                        if any(annotation in ['@Transactional'] for annotation in callee_method.annotations):
+                            db_lines_per_method.append(call_site.start_line)
+
+                methods_in_class.append((method_signature, method_details.start_line, method_details.end_line,
+                                         tuple(set(db_lines_per_method))))
+            methods_by_class[klazz] = methods_in_class
+        return cls(methods_by_class)
+
+    def get_methods_at_line(self, qualified_class_name: str, line_number: int) -> List[MethodDBLines]:
+        """
+        Returns the methods of the class whose line range contains the given line
+        Args:
+            qualified_class_name:
+            line_number:
+
+        Returns:
+            List[MethodDBLines]: methods containing the line, in declaration order
+        """
+        key = (qualified_class_name, line_number)
+        if key not in self.__methods_at_line:
+            self.__methods_at_line[key] = [method for method in self.methods_by_class.get(qualified_class_name, [])
+                                           if method[1] <= line_number <= method[2]]
+        return self.__methods_at_line[key]
+
+    def is_test_class(self, qualified_class_name: str) -> bool:
+        """
+        Checks whether the class is a test class, which is left out of the database coverage
+        Args:
+            qualified_class_name:
+
+        Returns:
+            bool: True if the class is a test class
+        """
+        if qualified_class_name not in self.__test_classes:
+            class_name = qualified_class_name.split('.')[-1]
+            self.__test_classes[qualified_class_name] = (class_name.startswith('Test') or
+                                                         class_name.startswith('Tests') or
+                                                         class_name.endswith('Test') or
+                                                         qualified_class_name.endswith('Tests'))
+        return self.__test_classes[qualified_class_name]
+
+    def get_db_coverage(self, uncovered_lines: dict) -> Dict[str, List[dict]]:
+        """
+        Computes the database coverage of every method from the uncovered lines reported by the agent
+        Args:
+            uncovered_lines: /uncovered payload, keyed by class and then by method name and line
+
+        Returns:
+            Dict[str, List[dict]]: database coverage of each method, per class
+        """
+        processed_uncovered_lines = {}
+        # Go through each of the class
+        for klazz in uncovered_lines:
+            # Remove Test classes
+            if self.is_test_class(klazz):
+                continue
+            # Get uncovered line details
+            for method in uncovered_lines[klazz]:
+                line_number = int(method.split(':')[-1])
+                # JaCoCo returns the covered line, which may not be start line of the method
+                for method_signature, _, _, db_lines_per_method in self.get_methods_at_line(klazz, line_number):
+                    # Capture database uncovered lines
+                    db_uncovered_lines = []
+                    db_line_coverage = 0
+                    if db_lines_per_method:
+                        uncovered_lines_per_method = set(uncovered_lines[klazz][method])
+                        # Go through each database interaction point
+                        for line in db_lines_per_method:
+                            if line not in uncovered_lines_per_method:
+                                db_line_coverage += 1
+                            else:
+                                db_uncovered_lines.append(line)
+                    method_dict = {
+                        "method_signature": method_signature,
+                        "total_db_line_count": len(db_lines_per_method),
+                        "db_line_coverage": db_line_coverage / len(db_lines_per_method) * 100.0 if
+                        len(db_lines_per_method) > 0 else -100.0,
+                        "db_uncovered_lines": db_uncovered_lines
+                    }
+                    if klazz not in processed_uncovered_lines:
+                        processed_uncovered_lines[klazz] = [method_dict]
+                    else:
+                        processed_uncovered_lines[klazz].append(method_dict)
+        return processed_uncovered_lines
@@ -1,149 +1,370 @@
-import json
-import subprocess
 from json import JSONDecodeError
-from typing import List, Tuple, Any
-
-from cldk.analysis.java import JavaAnalysis
-
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
+
+from agent_client import AgentClient
+from analysis_index import AnalysisIndex
+from coverage_join import DBCoverageIndex, MethodCoverageIndex, ReachabilityCoverageJoin
+from coverage_metrics import EvaluationMetrics, timed
+from coverage_shards import CoverageShardPool
+from coverage_snapshot import AGENT_PATHS, APPLICATION_PATHS, REACHABILITY_PATHS, CoverageSnapshot
+from coverage_stream import StreamingCoverageJoin, write_coverage_report
+from coverage_table import ColumnarCoverageJoin, CoverageTable
+from db_line_index import DBLineIndex
+from endpoint_coverage import EndpointCoverage
 from reachability_emb import EMBReachability
 
+if TYPE_CHECKING:
+    from cldk.analysis.java import JavaAnalysis
+
 
 class EMBCoverage:
-    def __init__(self, analysis: JavaAnalysis, jacoco_port_number: int):
+    def __init__(self, analysis: Optional['JavaAnalysis'], jacoco_port_number: int, reachability_depth: int = 2,
+                 agent_timeout: float = 10.0, agent_retries: int = 2, snapshot_ttl: Optional[float] = None,
+                 analysis_index: Optional[AnalysisIndex] = None, collect_metrics: bool = False,
+                 recording_dir: Union[str, Path, None] = None, shard_workers: Optional[int] = None,
+                 agent_host: str = 'localhost'):
         self.analysis = analysis
         self.jacoco_port_number = jacoco_port_number
+        self.reachability_depth = reachability_depth
+        if analysis_index is None:
+            self.reachability = EMBReachability(analysis)
+            self.__db_line_index: Optional[DBLineIndex] = None
+        else:
+            self.reachability = EMBReachability(analysis, analysis_index.type_hierarchy, analysis_index.call_graph)
+            self.__db_line_index = analysis_index.db_lines
+        self.agent_client = AgentClient(jacoco_port_number, host=agent_host, timeout=agent_timeout,
+                                        retries=agent_retries)
+        # Seconds a snapshot of the agent is reused for, None to capture a new one for every report
+        self.snapshot_ttl = snapshot_ttl
+        self.__snapshot: Optional[CoverageSnapshot] = None
+        # Directory every captured snapshot is recorded to, so that the reports can be replayed offline
+        self.recording_dir = recording_dir
+        # Phase timers and counters of the current evaluation, None if metrics are not collected
+        self.collect_metrics = collect_metrics
+        self.metrics: Optional[EvaluationMetrics] = EvaluationMetrics() if collect_metrics else None
+        self.reachability.metrics = self.metrics
+        self.__db_coverage: Optional[Tuple[CoverageSnapshot, Any]] = None
+        self.__endpoint_coverage: Optional[EndpointCoverage] = None
+        # Number of processes to shard the database coverage and the reachability join over, serial if None
+        self.shard_workers = shard_workers
+        self.__analysis_index = analysis_index
+        self.__shard_pool: Optional[CoverageShardPool] = None
+
+    @classmethod
+    def from_index(cls, analysis_index: AnalysisIndex, jacoco_port_number: int, **kwargs) -> 'EMBCoverage':
+        """
+        Creates the coverage evaluator from cached analysis indexes, without a CLDK analysis
+        Args:
+            analysis_index: indexes derived from the analysis of the application
+            jacoco_port_number: port of the coverage monitoring agent
+            **kwargs: further arguments of the constructor
+
+        Returns:
+            EMBCoverage: coverage evaluator
+        """
+        return cls(None, jacoco_port_number, analysis_index=analysis_index, **kwargs)
+
+    @property
+    def db_line_index(self) -> DBLineIndex:
+        """
+        Database interaction line index of the application, built on first use
+        Returns:
+            DBLineIndex: database interaction line index
+        """
+        if self.__db_line_index is None:
+            with timed(self.metrics, "index_build"):
+                self.__db_line_index = DBLineIndex.from_analysis(self.analysis)
+        return self.__db_line_index
+
+    def reset_metrics(self) -> Optional[EvaluationMetrics]:
+        """
+        Starts recording the metrics of a new evaluation
+        Returns:
+            Optional[EvaluationMetrics]: metrics recorded since the last reset, None if metrics are not collected
+        """
+        metrics = self.metrics
+        self.metrics = EvaluationMetrics() if self.collect_metrics else None
+        self.reachability.metrics = self.metrics
+        return metrics
+
+    def get_snapshot(self, paths: Optional[List[str]] = None) -> CoverageSnapshot:
+        """
+        Returns the current snapshot of the coverage monitoring agent, capturing a new one unless a snapshot TTL is
+        set and the current snapshot is younger than it and has the given paths. Without a TTL, only the given paths
+        are fetched, so that a report computed on its own sends the requests it needs and no more. Use evaluate to
+        compute both reports from one capture.
+        Args:
+            paths: agent paths the caller reads, all of them if None
+
+        Returns:
+            CoverageSnapshot: snapshot of the agent endpoints
+        """
+        paths = AGENT_PATHS if paths is None else paths
+        if self.snapshot_ttl is None:
+            return self.refresh_snapshot(paths)
+        if (self.__snapshot is None or self.__snapshot.age() >= self.snapshot_ttl or
+                any(path not in self.__snapshot.responses for path in paths)):
+            # Capture every path, so that the other reports can reuse the snapshot
+            return self.refresh_snapshot()
+        return self.__snapshot
+
+    def refresh_snapshot(self, paths: Optional[List[str]] = None) -> CoverageSnapshot:
+        """
+        Captures a new snapshot of the coverage monitoring agent
+        Args:
+            paths: agent paths to fetch, all of them if None or if snapshots are recorded, so that every recording
+                can be replayed
+
+        Returns:
+            CoverageSnapshot: snapshot of the agent endpoints
+        """
+        if self.recording_dir is not None:
+            paths = None
+        received_bytes = self.agent_client.received_bytes
+        with timed(self.metrics, "capture"):
+            self.__snapshot = CoverageSnapshot.capture(self.agent_client, paths)
+        if self.recording_dir is not None:
+            self.__snapshot.save(self.recording_dir)
+        if self.metrics is not None:
+            for status_code, response in self.__snapshot.responses.values():
+                self.metrics.increment("agent_requests")
+                if status_code != 200:
+                    self.metrics.increment("agent_errors")
+            self.metrics.increment("agent_response_bytes", self.agent_client.received_bytes - received_bytes)
+        return self.__snapshot
+
+    def evaluate(self) -> Tuple[dict, dict]:
+        """
+        Captures a new snapshot and computes both the reachability and the application coverage from it. If metrics
+        are collected, they are reset first, so that self.metrics covers exactly this evaluation.
+        Returns:
+            Tuple[dict, dict]: reachability coverage and application coverage
+        """
+        self.reset_metrics()
+        snapshot = self.refresh_snapshot()
+        return self.get_reachability_coverage(snapshot), self.get_app_coverage(snapshot)
 
-    def get_reachability_coverage(self) -> List[dict]:
+    def get_reachability_coverage(self, snapshot: Optional[CoverageSnapshot] = None) -> List[dict]:
         """
         Computes and returns the reachable coverage using coverage monitoring agent
         Args:
+            snapshot: snapshot of the agent to compute the coverage from, the current snapshot if not given
         Returns:
             List[dict]: List of dictionaries with coverage information
         """
         # Get coverage details from the coverage monitor
-        coverage_details = self.__get_method_coverage()
-        db_coverage = self.__get_db_coverage(self.jacoco_port_number)
-        covered_db_interaction_lines = 0
-        total_db_interaction_lines = 0
-        total_lines = 0
-        total_branches = 0
-        total_inst = 0
-        covered_lines = 0
-        covered_branches = 0
-        covered_inst = 0
-        processed_methods = []
-        coverage_dict = {}
-        db_uncovered_lines_app = {}
-        class_method_pairs = []
-        reachability = EMBReachability(self.analysis)
-        # gather all endpoints
-        for cls in self.analysis.get_classes():
-            all_method = self.analysis.get_methods_in_class(cls)
-            # Get lines that are uncovered
-            endpoint_methods = [method for method in all_method if all_method[method].is_entrypoint]
-
-            for endpoint_method in endpoint_methods:
-                class_method_pairs.append([cls, endpoint_method])
-
-        # Go through each endpoint class and method
-        for class_method_pair in class_method_pairs:
-            qualified_class_name = class_method_pair[0]
-            method_signature = class_method_pair[1]
-            # Get all the reachable methods
-            all_reachable_methods = reachability.get_reachable_methods(qualified_class_name, method_signature)
-
-            # Go through each reachable method
-            for method in all_reachable_methods:
-                if method not in processed_methods:
-                    # class name is present
-                    if method["qualified_class_name"] in coverage_details:
-                        # Go through each method from the jacoco agent report
-                        for method_jacoco in coverage_details[method["qualified_class_name"]]:
-                            method_name = method_jacoco.split(':')[0]
-                            start_line = int(method_jacoco.split(':')[1])
-                            # Match name and the start line. Since start line is off by 1, we used the range
-                            if (method_name == method["method_signature"].split('(')[0] and
-                                    method["end_line"] >= start_line >= method["start_line"]):
-                                method_coverage_details = coverage_details[method["qualified_class_name"]][
-                                    method_jacoco]
-                                covered_db_interaction_lines_per_method = 0
-                                total_db_interaction_lines_per_method = 0
-                                db_uncovered_lines = []
-                                # Get database interaction coverage
-                                if method["qualified_class_name"] in db_coverage:
-                                    for method_db in db_coverage[method["qualified_class_name"]]:
-                                        if method["method_signature"] == method_db["method_signature"]:
-                                            total_db_interaction_lines_per_method = method_db["total_db_line_count"]
-                                            covered_db_interaction_lines_per_method = (
-                                                    total_db_interaction_lines_per_method - len(
-                                                method_db["db_uncovered_lines"]))
-                                            if total_db_interaction_lines_per_method > 0:
-                                                db_uncovered_lines = method_db["db_uncovered_lines"]
-                                                db_uncovered_lines_app[str(Tuple[method["qualified_class_name"],
-                                                method["method_signature"]])] = (
-                                                    method_db)["db_uncovered_lines"]
-                                # Collect data for overall coverage
-                                total_lines += method_coverage_details["totalLines"]
-                                total_branches += method_coverage_details["totalBranches"]
-                                total_inst += method_coverage_details["totalInsts"]
-                                covered_lines += method_coverage_details["coveredLines"]
-                                covered_branches += method_coverage_details["fullyCoveredBranches"]
-                                covered_inst += method_coverage_details["coveredInsts"]
-                                total_db_interaction_lines += total_db_interaction_lines_per_method
-                                covered_db_interaction_lines += covered_db_interaction_lines_per_method
-
-                                # Store method wise coverage
-                                coverage = {"method_signature": method["method_signature"],
-                                            "line_coverage": (method_coverage_details["coveredLines"] /
-                                                              method_coverage_details["totalLines"]) * 100.0 if
-                                            method_coverage_details["totalLines"] > 0 else -100.0,
-                                            "branch_coverage": (method_coverage_details["fullyCoveredBranches"] /
-                                                                method_coverage_details["totalBranches"]) * 100.0 if
-                                            method_coverage_details["totalBranches"] > 0 else -100.0,
-                                            "instruction_coverage": (method_coverage_details["coveredInsts"] /
-                                                                     method_coverage_details["totalInsts"]) * 100.0 if
-                                            method_coverage_details["totalInsts"] > 0 else -100.0,
-                                            "database_interaction_coverage": (covered_db_interaction_lines_per_method /
-                                                                              total_db_interaction_lines_per_method) * 100.0 if
-                                            total_db_interaction_lines_per_method > 0 else -100.0,
-                                            "database_uncovered_lines": db_uncovered_lines if
-                                            len(db_uncovered_lines) > 0 else None,
-                                            }
-                                if method["qualified_class_name"] not in coverage_dict:
-                                    coverage_dict[method["qualified_class_name"]] = [coverage]
-                                else:
-                                    coverage_dict[method["qualified_class_name"]].append(coverage)
-                processed_methods.append(method)
-
-        # Add overall coverage
-        coverage_dict["overall_coverage"] = [
-            {"line_coverage": (covered_lines / total_lines) * 100.0 if total_lines > 0 else -100,
-             "branch_coverage": (covered_branches / total_branches) * 100.0 if total_branches > 0 else -100,
-             "instruction_coverage": (covered_inst / total_inst) * 100.0 if total_inst > 0 else -100,
-             "database_interaction_coverage": (covered_db_interaction_lines / total_db_interaction_lines)
-                                              * 100.0 if total_db_interaction_lines > 0 else -100,
-             "database_uncovered_lines": json.dumps(db_uncovered_lines_app)}, ]
-        return coverage_dict
-
-    def get_app_coverage(self) -> dict:
+        snapshot = snapshot or self.get_snapshot(REACHABILITY_PATHS)
+        coverage_join = self.__create_coverage_join(ReachabilityCoverageJoin, snapshot)
+        self.__join_reachable_methods(coverage_join, snapshot)
+        return coverage_join.get_coverage_dict()
+
+    def get_reachability_coverage_table(self, snapshot: Optional[CoverageSnapshot] = None) -> CoverageTable:
+        """
+        Computes the reachable coverage like get_reachability_coverage, stored column by column
+        Args:
+            snapshot: snapshot of the agent to compute the coverage from, the current snapshot if not given
+        Returns:
+            CoverageTable: method-wise coverage table with the overall coverage
+        """
+        snapshot = snapshot or self.get_snapshot(REACHABILITY_PATHS)
+        coverage_join = self.__create_coverage_join(ColumnarCoverageJoin, snapshot)
+        self.__join_reachable_methods(coverage_join, snapshot)
+        return coverage_join.get_coverage_table()
+
+    def iter_reachability_coverage(self, snapshot: Optional[CoverageSnapshot] = None, group_by: str = 'endpoint',
+                                   structured: bool = False) -> Iterator[Tuple[str, Any]]:
+        """
+        Computes the reachable coverage like get_reachability_coverage, yielding the method-wise coverage as it is
+        joined instead of building the whole report. The overall coverage is yielded last, under "overall_coverage".
+        Args:
+            snapshot: snapshot of the agent to compute the coverage from, the current snapshot if not given
+            group_by: 'endpoint' to yield, per endpoint and as soon as it is joined, the methods it reaches first
+                grouped by class, or 'class' to yield the method-wise coverage of each class, in the order and with
+                the content of the report. A class can be reached from any endpoint, so 'class' computes the
+                reachable methods of every endpoint and buffers their list before yielding the first class
+            structured: report the uncovered database interaction lines of the overall coverage per class and method
+                instead of as a JSON string
+        Returns:
+            Iterator[Tuple[str, Any]]: class name and method-wise coverage, or qualified endpoint signature and
+            method-wise coverage per class, then "overall_coverage" and the overall coverage
+        """
+        if group_by not in ('class', 'endpoint'):
+            raise ValueError(f"Unknown grouping {group_by}")
+        snapshot = snapshot or self.get_snapshot(REACHABILITY_PATHS)
+        with timed(self.metrics, "parse"):
+            coverage_details = snapshot.method_coverage
+        method_coverage = MethodCoverageIndex(coverage_details)
+        coverage_join = StreamingCoverageJoin(method_coverage, DBCoverageIndex(self.__get_db_coverage(snapshot)),
+                                              structured)
+        index = self.reachability.index
+        index.metrics = self.metrics
+
+        if group_by == 'endpoint':
+            for endpoint in index.entrypoints:
+                with timed(self.metrics, "reachability"):
+                    endpoint_methods = index.reachable(endpoint, self.reachability_depth)
+                endpoint_coverage: Dict[str, List[dict]] = {}
+                with timed(self.metrics, "join"):
+                    for method_id in endpoint_methods:
+                        qualified_class_name, method_signature = index.methods[method_id]
+                        method_coverage_list = coverage_join.add_method(qualified_class_name, method_signature,
+                                                                        index.start_lines[method_id],
+                                                                        index.end_lines[method_id])
+                        if len(method_coverage_list) > 0:
+                            endpoint_coverage.setdefault(qualified_class_name, []).extend(method_coverage_list)
+                qualified_class_name, method_signature = index.methods[endpoint]
+                yield f"{qualified_class_name}.{method_signature}", endpoint_coverage
+            yield "overall_coverage", [coverage_join.get_overall_coverage()]
+            return
+
+        with timed(self.metrics, "reachability"):
+            reachable_methods = [index.reachable(endpoint, self.reachability_depth) for endpoint in index.entrypoints]
+        # Group the methods with agent entries by class, keeping the classes and the methods of each class in the
+        # order the report adds them in
+        methods_by_class: Dict[str, List[int]] = {}
+        method_order: List[Tuple[str, str]] = []
+        with timed(self.metrics, "join"):
+            for method_id in dict.fromkeys(method_id for endpoint_methods in reachable_methods
+                                           for method_id in endpoint_methods):
+                qualified_class_name, method_signature = index.methods[method_id]
+                if len(method_coverage.get_method_coverage(qualified_class_name, method_signature.split('(')[0],
+                                                           index.start_lines[method_id],
+                                                           index.end_lines[method_id])) > 0:
+                    methods_by_class.setdefault(qualified_class_name, []).append(method_id)
+                    method_order.append((qualified_class_name, method_signature))
+        for qualified_class_name, method_ids in methods_by_class.items():
+            class_coverage = []
+            with timed(self.metrics, "join"):
+                for method_id in method_ids:
+                    class_coverage.extend(coverage_join.add_method(qualified_class_name, index.methods[method_id][1],
+                                                                   index.start_lines[method_id],
+                                                                   index.end_lines[method_id]))
+            yield qualified_class_name, class_coverage
+        yield "overall_coverage", [coverage_join.get_overall_coverage(method_order)]
+
+    def write_reachability_coverage(self, output: Union[str, Path, BinaryIO],
+                                    snapshot: Optional[CoverageSnapshot] = None, group_by: str = 'endpoint',
+                                    structured: bool = False):
+        """
+        Computes the reachable coverage and writes it as JSON while it is joined, see iter_reachability_coverage
+        Args:
+            output: file to write to, or a binary stream
+            snapshot: snapshot of the agent to compute the coverage from, the current snapshot if not given
+            group_by: 'endpoint' or 'class', 'class' writes the layout of get_reachability_coverage
+            structured: report the uncovered database interaction lines of the overall coverage per class and method
+                instead of as a JSON string
+        """
+        write_coverage_report(self.iter_reachability_coverage(snapshot, group_by, structured), output)
+
+    def get_endpoint_coverage(self, snapshot: Optional[CoverageSnapshot] = None) -> Dict[str, List[dict]]:
+        """
+        Computes the coverage of the methods reachable from each endpoint, with every method counted towards all
+        the endpoints that reach it
+        Args:
+            snapshot: snapshot of the agent to compute the coverage from, the current snapshot if not given
+        Returns:
+            Dict[str, List[dict]]: endpoint-wise coverage per endpoint class, with the overall coverage
+        """
+        snapshot = snapshot or self.get_snapshot(REACHABILITY_PATHS)
+        coverage_join = self.__create_coverage_join(ReachabilityCoverageJoin, snapshot)
+        self.__join_reachable_methods(coverage_join, snapshot)
+        if (self.__endpoint_coverage is None or
+                self.__endpoint_coverage.reachability_depth != self.reachability_depth):
+            self.__endpoint_coverage = EndpointCoverage(self.reachability.index, self.reachability_depth)
+        with timed(self.metrics, "endpoint_attribution"):
+            return self.__endpoint_coverage.get_coverage_dict(coverage_join.method_counts)
+
+    def __create_coverage_join(self, join_class: type,
+                               snapshot: CoverageSnapshot) -> Union[ReachabilityCoverageJoin, ColumnarCoverageJoin]:
+        """
+        Creates a coverage join over the method coverage and the database coverage of the snapshot
+        Args:
+            join_class: ReachabilityCoverageJoin, a subclass of it or ColumnarCoverageJoin
+            snapshot: snapshot of the agent
+        Returns:
+            Union[ReachabilityCoverageJoin, ColumnarCoverageJoin]: empty coverage join
+        """
+        with timed(self.metrics, "parse"):
+            coverage_details = snapshot.method_coverage
+        if self.shard_workers is not None:
+            # The shard workers index the method coverage of their classes themselves
+            coverage_details = {}
+        return join_class(MethodCoverageIndex(coverage_details), DBCoverageIndex(self.__get_db_coverage(snapshot)))
+
+    def __join_reachable_methods(self, coverage_join: Union[ReachabilityCoverageJoin, ColumnarCoverageJoin],
+                                 snapshot: CoverageSnapshot):
+        """
+        Joins the methods reachable from every endpoint with their coverage
+        Args:
+            coverage_join: coverage join to add the methods to
+            snapshot: snapshot of the agent the join was created from
+        """
+        index = self.reachability.index
+        index.metrics = self.metrics
+
+        # Get all the methods reachable from each endpoint
+        with timed(self.metrics, "reachability"):
+            reachable_methods = [index.reachable(endpoint, self.reachability_depth) for endpoint in index.entrypoints]
+
+        with timed(self.metrics, "join"):
+            if self.shard_workers is not None:
+                # Join each method once, in the order the endpoints first reach it
+                method_ids = list(dict.fromkeys(method_id for endpoint_methods in reachable_methods
+                                                for method_id in endpoint_methods))
+                self.__get_shard_pool().join_methods(coverage_join, snapshot.method_coverage,
+                                                     self.__get_db_coverage(snapshot), method_ids)
+            else:
+                for endpoint_methods in reachable_methods:
+                    for method_id in endpoint_methods:
+                        qualified_class_name, method_signature = index.methods[method_id]
+                        coverage_join.add_method(qualified_class_name, method_signature,
+                                                 index.start_lines[method_id], index.end_lines[method_id])
+        if self.metrics is not None:
+            self.metrics.increment("endpoints", len(index.entrypoints))
+            self.metrics.increment("methods_reached", sum(map(len, reachable_methods)))
+            self.metrics.increment("methods_joined", len(coverage_join.processed_methods))
+
+    def __get_shard_pool(self) -> CoverageShardPool:
+        """
+        Starts the shard worker processes on first use
+        """
+        if self.__shard_pool is None:
+            analysis_index = self.__analysis_index
+            if analysis_index is None:
+                analysis_index = AnalysisIndex(self.reachability.index, self.reachability.type_hierarchy,
+                                               self.db_line_index)
+            self.__shard_pool = CoverageShardPool(analysis_index, self.shard_workers)
+        return self.__shard_pool
+
+    def close(self):
+        """
+        Shuts down the shard worker processes, if any, and closes the connection to the agent
+        """
+        if self.__shard_pool is not None:
+            self.__shard_pool.close()
+            self.__shard_pool = None
+        self.agent_client.close()
+
+    def get_app_coverage(self, snapshot: Optional[CoverageSnapshot] = None) -> dict:
         """
         Computes and returns the application coverage using coverage monitoring agent
         Args:
+            snapshot: snapshot of the agent to compute the coverage from, the current snapshot if not given
 
         Returns:
             CoverageEvaluation: application coverage
         """
-        uncovered_lines = self.__execute_http_requests(
-            [f"curl -X GET http://localhost:{self.jacoco_port_number}/appcoverage"]
-        )[0]
+        snapshot = snapshot or self.get_snapshot(APPLICATION_PATHS)
 
         try:
             total_db_line = 0
             total_covered_db_line = 0
-            current_coverage_details = json.loads(uncovered_lines[1])
+            with timed(self.metrics, "parse"):
+                current_coverage_details = snapshot.app_coverage
             keys = list(current_coverage_details.keys())
             current_coverage_details = current_coverage_details[keys[0]]
-            db_coverage = self.__get_db_coverage(self.jacoco_port_number)
+            db_coverage = self.__get_db_coverage(snapshot)
             for klazz in db_coverage:
                 for method in db_coverage[klazz]:
                     total_db_line += method["total_db_line_count"]
@@ -158,154 +379,38 @@ class EMBCoverage:
         except JSONDecodeError:
             return print('JSON Error')
 
-    @staticmethod
-    def __execute_http_requests(http_commands: List[str]) -> List[Tuple[int, Any]]:
+    def __get_db_coverage(self, snapshot: CoverageSnapshot):
         """
-        Execute a list of curl commands and return their responses with status codes.
-
+        Computes the database coverage for the entire app, once per snapshot
         Args:
-            http_commands (List[str]): List of curl commands to execute
-
-        Returns:
-            List[Tuple[int, Any]]: List of tuples containing (status_code, response)
-        """
-        responses = []
-
-        for cmd in http_commands:
-            # Append --write-out for status code and separate response
-            cmd_with_status = f"{cmd} --silent --write-out 'STATUS:%{{http_code}}'"
-
-            # Execute the command
-            process = subprocess.Popen(
-                cmd_with_status,
-                shell=True,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
-            )
-            try:
-                stdout, stderr = process.communicate(timeout=10)
-                # Split response and status code using a unique delimiter
-                if "STATUS:" in stdout:
-                    response_text, status_code = stdout.rsplit("STATUS:", 1)
-                    response_text = response_text.strip()
-                    status_code = int(status_code.strip())
-                else:
-                    # Handle cases where "STATUS:" is missing
-                    response_text = stdout.strip() or stderr.strip()
-                    status_code = 0  # Default to 0 if no status code is captured
-
-                responses.append((status_code, response_text))
-            except Exception as e:
-                print(f"Error executing http request: {cmd}: {e}")
-                responses.append((-100, e))
-                continue
-
-        return responses
-
-    def __get_db_coverage(self, jacoco_port_number: int):
-        """
-        Computes the database coverage for the entire app
+            snapshot: snapshot of the agent
         Returns:
 
         """
-        processed_uncovered_lines = {}
-        crud_operations = self.analysis.get_all_crud_operations()
-        # Get all the uncovered lines
-        uncovered_lines = self.__execute_http_requests(
-            [f"curl -X GET http://localhost:{jacoco_port_number}/uncovered"]
-        )[0]
-        try:
-            coverage_details = json.loads(uncovered_lines[1])
-
-            # Go through each of the class
-            for klazz in coverage_details:
-                # Remove Test classes
-                class_name = klazz.split('.')[-1]
-                if (not class_name.startswith('Test') and
-                        not class_name.startswith('Tests') and
-                        not class_name.endswith('Test') and
-                        not klazz.endswith('Tests')):
-                    methods_in_class = {}
-
-                    # Get all the methods in the class
-                    methods = self.analysis.get_methods_in_class(qualified_class_name=klazz)
-
-                    # Store the method details
-                    for method in methods:
-                        db_lines_per_method = [crud_operation.line_number
-                                               for crud_operation in methods[method].crud_operations]
-                        # Add all the method call on Entity objects
-                        for call_site in methods[method].call_sites:
-                            if call_site.receiver_type is not None:
-                                receiver_class = self.analysis.get_class(call_site.receiver_type)
-                                if receiver_class:
-                                    if any(annotation in ['@Entity']
-                                           for annotation in receiver_class.annotations):
-                                        db_lines_per_method.append(call_site.start_line)
-
-                        # Add method calls where the callee method has annotation @Transactional (applicable for mybatis)
-                        for call_site in methods[method].call_sites:
-                            callee_method = self.analysis.get_method(
-                                qualified_class_name=call_site.receiver_type,
-                                qualified_method_name=EMBReachability.process_callee_signature(
-                                    call_site.callee_signature))
-                            if callee_method:
-                                if any(annotation in ['@Transactional']
-                                       for annotation in callee_method.annotations):
-                                    db_lines_per_method.append(call_site.start_line)
-
-                        db_lines_per_method = list(set(db_lines_per_method))
-                        methods_in_class[method] = [methods[method].start_line,
-                                                    methods[method].end_line,
-                                                    db_lines_per_method]
-                    # Get uncovered line details
-                    for method in coverage_details[klazz]:
-                        method_name = method.split(':')[0]
-                        line_number = method.split(':')[-1]
-                        for existing_methods in methods_in_class:
-                            # JaCoCo returns the covered line, which may not be start line of the method
-                            if methods_in_class[existing_methods][0] <= int(line_number) <= \
-                                    methods_in_class[existing_methods][1]:
-                                uncovered_lines = coverage_details[klazz][method]
-
-                                # Capture database uncovered lines
-                                db_uncovered_lines = []
-                                db_lines_per_method = methods_in_class[existing_methods][2]
-                                db_line_coverage = 0
-
-                                # Go through each database interaction point
-                                for line in db_lines_per_method:
-                                    if line not in uncovered_lines:
-                                        db_line_coverage += 1
-                                    else:
-                                        db_uncovered_lines.append(line)
-                                method_dict = {
-                                    "method_signature": existing_methods,
-                                    "total_db_line_count": len(db_lines_per_method),
-                                    "db_line_coverage": db_line_coverage / len(db_lines_per_method) * 100.0 if
-                                    len(db_lines_per_method) > 0 else -100.0,
-                                    "db_uncovered_lines": db_uncovered_lines
-                                }
-                                if klazz not in processed_uncovered_lines:
-                                    processed_uncovered_lines[klazz] = [method_dict]
-                                else:
-                                    processed_uncovered_lines[klazz].append(method_dict)
-            return processed_uncovered_lines
-        except JSONDecodeError:
-            return []
+        if self.__db_coverage is None or self.__db_coverage[0] is not snapshot:
+            self.__db_coverage = (snapshot, self.__compute_db_coverage(snapshot))
+        return self.__db_coverage[1]
 
-    def __get_method_coverage(self) -> str:
+    def __compute_db_coverage(self, snapshot: CoverageSnapshot):
         """
-        Computes and returns the method-level coverage using coverage monitoring agent
+        Computes the database coverage for the entire app from the uncovered lines of the snapshot
         Args:
-
+            snapshot: snapshot of the agent
         Returns:
-            str: string representation of the json format response
+
         """
-        uncovered_lines = self.__execute_http_requests(
-            [f"curl -X GET http://localhost:{self.jacoco_port_number}/methodcoverage"]
-        )[0]
+        try:
+            with timed(self.metrics, "parse"):
+                uncovered_lines = snapshot.uncovered_lines
+        except JSONDecodeError:
+            return []
+        with timed(self.metrics, "db_coverage"):
+            if self.shard_workers is not None:
+                return self.__get_shard_pool().get_db_coverage(uncovered_lines)
+            return self.db_line_index.get_db_coverage(uncovered_lines)
+
+    def __enter__(self):
+        return self
 
-        coverage_details = json.loads(uncovered_lines[1])
-        return coverage_details
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
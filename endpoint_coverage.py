@@ -0,0 +1,148 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from call_graph_index import CallGraphIndex
+
+# Counters per method: covered and total lines, branches, instructions and database interaction lines
+COUNTERS = 8
+
+
+class EndpointCoverage:
+    """
+    Attributes the reachability coverage to every endpoint at once. The reachable set of each endpoint is turned
+    into a bitset over method IDs, so that the methods shared by several endpoints and those exclusive to one are
+    found with bitwise operations, and the coverage of every endpoint is a masked sum over one array of method
+    counters. The bitsets are derived from the reachable sets the call graph index memoizes for the reachability
+    join, and the method IDs of each endpoint are unpacked from its bitset once. Unlike the reachability coverage
+    report, a method counts towards every endpoint reaching it.
+    """
+
+    def __init__(self, index: CallGraphIndex, reachability_depth: int):
+        self.index = index
+        self.reachability_depth = reachability_depth
+        self.endpoints = list(index.entrypoints)
+        self.reachable_methods = [self.get_bitset(index.reachable(endpoint, reachability_depth))
+                                  for endpoint in self.endpoints]
+        # Methods reached by at least one endpoint, and by at least two
+        reached_once = 0
+        reached_twice = 0
+        for reachable_methods in self.reachable_methods:
+            reached_twice |= reached_once & reachable_methods
+            reached_once |= reachable_methods
+        self.reached_methods = reached_once
+        self.shared_methods = reached_twice
+        self.exclusive_methods = reached_once & ~reached_twice
+        # IDs of the methods reached by each endpoint, unpacked from the bitsets when first needed
+        self.__endpoint_method_ids: List[Optional[np.ndarray]] = [None] * len(self.endpoints)
+        self.__reached_method_ids: Optional[np.ndarray] = None
+
+    def get_bitset(self, method_ids: Iterable[int]) -> int:
+        """
+        Returns the bitset of the given methods, where bit i is set if method i is one of them
+        Args:
+            method_ids:
+
+        Returns:
+            int: bitset of the method IDs
+        """
+        bits = np.zeros(len(self.index.methods), dtype=np.uint8)
+        bits[list(method_ids)] = 1
+        return int.from_bytes(np.packbits(bits, bitorder='little').tobytes(), 'little')
+
+    def get_method_ids(self, bitset: int) -> np.ndarray:
+        """
+        Returns the IDs of the methods in a bitset
+        Args:
+            bitset:
+
+        Returns:
+            np.ndarray: method IDs in ascending order
+        """
+        # Only the non-zero bytes are unpacked, reachable sets are sparse over the methods of the application
+        bitset_bytes = np.frombuffer(bitset.to_bytes((bitset.bit_length() + 7) // 8, 'little'), dtype=np.uint8)
+        byte_positions = np.flatnonzero(bitset_bytes)
+        bit_positions = np.flatnonzero(np.unpackbits(bitset_bytes[byte_positions], bitorder='little'))
+        return byte_positions[bit_positions >> 3] * 8 + (bit_positions & 7)
+
+    def get_endpoint_method_ids(self, endpoint_position: int) -> np.ndarray:
+        """
+        Returns the IDs of the methods the given endpoint reaches, unpacked once per endpoint
+        Args:
+            endpoint_position: position of the endpoint in self.endpoints
+
+        Returns:
+            np.ndarray: method IDs in ascending order
+        """
+        method_ids = self.__endpoint_method_ids[endpoint_position]
+        if method_ids is None:
+            method_ids = self.get_method_ids(self.reachable_methods[endpoint_position])
+            self.__endpoint_method_ids[endpoint_position] = method_ids
+        return method_ids
+
+    def get_method_signatures(self, bitset: int) -> List[Tuple[str, str]]:
+        """
+        Returns:
+            List[Tuple[str, str]]: class name and method signature of the methods in a bitset
+        """
+        return [self.index.methods[method_id] for method_id in self.get_method_ids(bitset).tolist()]
+
+    def get_exclusive_methods(self, endpoint_position: int) -> List[Tuple[str, str]]:
+        """
+        Returns the methods that only the given endpoint reaches
+        Args:
+            endpoint_position: position of the endpoint in self.endpoints
+
+        Returns:
+            List[Tuple[str, str]]: class name and method signature of the exclusive methods
+        """
+        return self.get_method_signatures(self.reachable_methods[endpoint_position] & self.exclusive_methods)
+
+    def get_coverage_dict(self, method_counts: Dict[Tuple[str, str], Tuple[int, ...]]) -> Dict[str, List[dict]]:
+        """
+        Computes the coverage of every endpoint's reachable set
+        Args:
+            method_counts: covered and total lines, branches, instructions and database interaction lines of each
+                joined method, as collected by ReachabilityCoverageJoin
+
+        Returns:
+            Dict[str, List[dict]]: endpoint-wise coverage per endpoint class, with the number of reachable, shared
+            and exclusive methods, and an overall entry with the totals over all endpoints
+        """
+        counts = np.zeros((len(self.index.methods), COUNTERS), dtype=np.int64)
+        for method, method_count in method_counts.items():
+            method_id = self.index.method_ids.get(method)
+            if method_id is not None:
+                counts[method_id] = method_count
+
+        coverage_dict: Dict[str, List[dict]] = {}
+        for endpoint_position, (endpoint, reachable_methods) in enumerate(zip(self.endpoints,
+                                                                             self.reachable_methods)):
+            qualified_class_name, method_signature = self.index.methods[endpoint]
+            coverage = {"method_signature": method_signature}
+            coverage.update(self.__get_coverage(counts[self.get_endpoint_method_ids(endpoint_position)].sum(axis=0)))
+            coverage.update({"reachable_methods": reachable_methods.bit_count(),
+                             "shared_methods": (reachable_methods & self.shared_methods).bit_count(),
+                             "exclusive_methods": (reachable_methods & self.exclusive_methods).bit_count()})
+            coverage_dict.setdefault(qualified_class_name, []).append(coverage)
+
+        if self.__reached_method_ids is None:
+            self.__reached_method_ids = self.get_method_ids(self.reached_methods)
+        overall_coverage = self.__get_coverage(counts[self.__reached_method_ids].sum(axis=0))
+        overall_coverage.update({"endpoints": len(self.endpoints),
+                                 "reachable_methods": self.reached_methods.bit_count(),
+                                 "shared_methods": self.shared_methods.bit_count(),
+                                 "exclusive_methods": self.exclusive_methods.bit_count()})
+        coverage_dict["overall_coverage"] = [overall_coverage]
+        return coverage_dict
+
+    @staticmethod
+    def __get_coverage(totals: np.ndarray) -> dict:
+        (covered_lines, total_lines, covered_branches, total_branches, covered_inst, total_inst,
+         covered_db_interaction_lines, total_db_interaction_lines) = totals.tolist()
+        return {"line_coverage": (covered_lines / total_lines) * 100.0 if total_lines > 0 else -100.0,
+                "branch_coverage": (covered_branches / total_branches) * 100.0 if total_branches > 0 else -100.0,
+                "instruction_coverage": (covered_inst / total_inst) * 100.0 if total_inst > 0 else -100.0,
+                "database_interaction_coverage": (covered_db_interaction_lines /
+                                                  total_db_interaction_lines) * 100.0 if
+                total_db_interaction_lines > 0 else -100.0}
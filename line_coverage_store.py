@@ -0,0 +1,280 @@
+import os
+import tempfile
+import zipfile
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Union
+
+import numpy as np
+
+from coverage_snapshot import CoverageSnapshot
+from db_line_index import DBLineIndex
+
+# Bump whenever the layout of a persisted store changes
+STORE_FORMAT_VERSION = 2
+# Line coverage store of a run, next to its coverage reports
+LINE_COVERAGE_FILE = 'line_coverage.npz'
+
+
+def to_bitmap(lines: Iterable[int]) -> bytes:
+    """
+    Converts line numbers to a bitmap, where bit i of byte i // 8 is set if line i is in the set
+    """
+    lines = list(lines)
+    if len(lines) == 0:
+        return b''
+    bitmap = bytearray(max(lines) // 8 + 1)
+    for line in lines:
+        bitmap[line >> 3] |= 1 << (line & 7)
+    return bytes(bitmap)
+
+
+def to_lines(bitmap: bytes) -> List[int]:
+    """
+    Converts a bitmap back to line numbers in ascending order
+    """
+    return np.flatnonzero(np.unpackbits(np.frombuffer(bitmap, dtype=np.uint8), bitorder='little')).tolist()
+
+
+def contains(bitmap: Optional[bytes], line: int) -> bool:
+    return bitmap is not None and (line >> 3) < len(bitmap) and bool(bitmap[line >> 3] & (1 << (line & 7)))
+
+
+def difference(bitmap: Optional[bytes], other: Optional[bytes]) -> List[int]:
+    """
+    Returns the lines set in the first bitmap and not in the second one
+    """
+    if not bitmap:
+        return []
+    bits = int.from_bytes(bitmap, 'little') & ~int.from_bytes(other or b'', 'little')
+    return to_lines(bits.to_bytes(len(bitmap), 'little'))
+
+
+def intersection(bitmap: Optional[bytes], other: Optional[bytes]) -> List[int]:
+    """
+    Returns the lines set in both bitmaps
+    """
+    if not bitmap or not other:
+        return []
+    length = min(len(bitmap), len(other))
+    bits = int.from_bytes(bitmap[:length], 'little') & int.from_bytes(other[:length], 'little')
+    return to_lines(bits.to_bytes(length, 'little'))
+
+
+class LineCoverageStore:
+    """
+    Line-level coverage of one snapshot, stored as bitmaps keyed by class ID: the uncovered lines, the agent lines of
+    the covered methods, and the covered and uncovered database interaction lines. Membership tests index one byte,
+    and diffs between two stores are bitwise operations on whole classes. Bitmaps are compressed when persisted.
+    """
+
+    def __init__(self):
+        self.classes: List[str] = []
+        self.class_ids: Dict[str, int] = {}
+        self.uncovered_lines: Dict[int, bytes] = {}
+        self.covered_methods: Dict[int, bytes] = {}
+        self.uncovered_methods: Dict[int, bytes] = {}
+        self.covered_db_lines: Dict[int, bytes] = {}
+        self.uncovered_db_lines: Dict[int, bytes] = {}
+        # Agent method names by agent line, to report methods as name:line
+        self.method_names: Dict[int, Dict[int, str]] = {}
+
+    @classmethod
+    def from_snapshot(cls, snapshot: CoverageSnapshot,
+                      db_line_index: Optional[DBLineIndex] = None) -> 'LineCoverageStore':
+        """
+        Builds the store from a snapshot of the agent
+        Args:
+            snapshot: snapshot of the agent
+            db_line_index: database interaction lines of the application, the database lines are left empty if None
+
+        Returns:
+            LineCoverageStore: line coverage store
+        """
+        store = cls()
+        for klazz, methods in snapshot.uncovered_lines.items():
+            class_id = store.get_class_id(klazz)
+            store.uncovered_lines[class_id] = to_bitmap(line for lines in methods.values() for line in lines)
+        for klazz, methods in snapshot.method_coverage.items():
+            class_id = store.get_class_id(klazz)
+            method_names = store.method_names.setdefault(class_id, {})
+            covered_methods = []
+            uncovered_methods = []
+            for method, method_coverage_details in methods.items():
+                method_name, line = method.split(':')[:2]
+                method_names[int(line)] = method_name
+                if method_coverage_details["coveredLines"] > 0:
+                    covered_methods.append(int(line))
+                else:
+                    uncovered_methods.append(int(line))
+            store.covered_methods[class_id] = to_bitmap(covered_methods)
+            store.uncovered_methods[class_id] = to_bitmap(uncovered_methods)
+        if db_line_index is not None:
+            for klazz, methods in snapshot.uncovered_lines.items():
+                if db_line_index.is_test_class(klazz):
+                    continue
+                class_id = store.class_ids[klazz]
+                covered_db_lines = set()
+                uncovered_db_lines = set()
+                for method in methods:
+                    uncovered_lines_per_method = set(methods[method])
+                    for _, _, _, db_lines_per_method in db_line_index.get_methods_at_line(
+                            klazz, int(method.split(':')[-1])):
+                        for line in db_lines_per_method:
+                            if line in uncovered_lines_per_method:
+                                uncovered_db_lines.add(line)
+                            else:
+                                covered_db_lines.add(line)
+                # A line of overlapping agent entries counts as uncovered if any of them reports it
+                store.covered_db_lines[class_id] = to_bitmap(covered_db_lines - uncovered_db_lines)
+                store.uncovered_db_lines[class_id] = to_bitmap(uncovered_db_lines)
+        return store
+
+    def get_class_id(self, qualified_class_name: str) -> int:
+        """
+        Returns the ID of the given class, adding it to the store if needed
+        """
+        class_id = self.class_ids.get(qualified_class_name)
+        if class_id is None:
+            class_id = self.class_ids[qualified_class_name] = len(self.classes)
+            self.classes.append(qualified_class_name)
+        return class_id
+
+    def is_uncovered(self, qualified_class_name: str, line: int) -> bool:
+        class_id = self.class_ids.get(qualified_class_name)
+        return class_id is not None and contains(self.uncovered_lines.get(class_id), line)
+
+    def is_method_covered(self, qualified_class_name: str, line: int) -> bool:
+        """
+        Checks whether the method reported by the agent at the given line has any covered line
+        """
+        class_id = self.class_ids.get(qualified_class_name)
+        return class_id is not None and contains(self.covered_methods.get(class_id), line)
+
+    def is_db_line_covered(self, qualified_class_name: str, line: int) -> bool:
+        class_id = self.class_ids.get(qualified_class_name)
+        return class_id is not None and contains(self.covered_db_lines.get(class_id), line)
+
+    def get_uncovered_lines(self, qualified_class_name: str) -> List[int]:
+        class_id = self.class_ids.get(qualified_class_name)
+        return to_lines(self.uncovered_lines.get(class_id, b'')) if class_id is not None else []
+
+    def diff(self, other: 'LineCoverageStore') -> dict:
+        """
+        Compares this store, the earlier snapshot or seed, with another one. Lines are only compared for classes
+        reported in both stores.
+        Args:
+            other: later snapshot or other seed
+
+        Returns:
+            dict: per class, the newly covered and the lost lines, methods (as name:line) and database interaction
+            lines, and the classes only reported by one of the stores
+        """
+        diff = {"newly_covered_lines": {}, "lost_lines": {},
+                "newly_covered_methods": {}, "lost_methods": {},
+                "newly_covered_db_lines": {}, "lost_db_lines": {},
+                "added_classes": [klazz for klazz in other.classes if klazz not in self.class_ids],
+                "removed_classes": [klazz for klazz in self.classes if klazz not in other.class_ids]}
+        for klazz, class_id in self.class_ids.items():
+            other_class_id = other.class_ids.get(klazz)
+            if other_class_id is None:
+                continue
+            # A line uncovered before and not anymore was covered, and the other way around
+            self.__add_diff(diff["newly_covered_lines"], klazz, self.uncovered_lines.get(class_id),
+                            other.uncovered_lines.get(other_class_id))
+            self.__add_diff(diff["lost_lines"], klazz, other.uncovered_lines.get(other_class_id),
+                            self.uncovered_lines.get(class_id))
+            self.__add_diff(diff["newly_covered_db_lines"], klazz, self.uncovered_db_lines.get(class_id),
+                            other.uncovered_db_lines.get(other_class_id))
+            self.__add_diff(diff["lost_db_lines"], klazz, other.uncovered_db_lines.get(other_class_id),
+                            self.uncovered_db_lines.get(class_id))
+            method_names = {**self.method_names.get(class_id, {}), **other.method_names.get(other_class_id, {})}
+            # A method reported without covered lines before and with covered lines now was covered, and the other
+            # way around
+            self.__add_method_diff(diff["newly_covered_methods"], klazz, method_names,
+                                   self.uncovered_methods.get(class_id), other.covered_methods.get(other_class_id))
+            self.__add_method_diff(diff["lost_methods"], klazz, method_names,
+                                   self.covered_methods.get(class_id), other.uncovered_methods.get(other_class_id))
+        return diff
+
+    def save(self, path: Union[str, Path]):
+        """
+        Writes the store to the given file as a compressed npz archive of plain arrays: the class names, and per kind
+        of bitmap the class IDs, the offsets of their bitmaps and the concatenated bitmap bytes. The file is replaced
+        atomically.
+        Args:
+            path: store file
+        """
+        arrays = {"version": np.array([STORE_FORMAT_VERSION], dtype=np.int64),
+                  "classes": np.array(self.classes, dtype=str)}
+        for name, bitmaps in self.__get_bitmaps().items():
+            class_ids = sorted(bitmaps)
+            arrays[f"{name}_class_ids"] = np.array(class_ids, dtype=np.int64)
+            arrays[f"{name}_offsets"] = np.cumsum([0] + [len(bitmaps[class_id]) for class_id in class_ids],
+                                                  dtype=np.int64)
+            arrays[f"{name}_bitmaps"] = np.frombuffer(b''.join(bitmaps[class_id] for class_id in class_ids),
+                                                      dtype=np.uint8)
+        method_names = [(class_id, line, method_name) for class_id, names in sorted(self.method_names.items())
+                        for line, method_name in sorted(names.items())]
+        arrays["method_name_class_ids"] = np.array([entry[0] for entry in method_names], dtype=np.int64)
+        arrays["method_name_lines"] = np.array([entry[1] for entry in method_names], dtype=np.int64)
+        arrays["method_names"] = np.array([entry[2] for entry in method_names], dtype=str)
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        try:
+            with os.fdopen(file_descriptor, 'wb') as f:
+                np.savez_compressed(f, **arrays)
+            os.replace(temporary_path, path)
+        except BaseException:
+            os.unlink(temporary_path)
+            raise
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> Optional['LineCoverageStore']:
+        """
+        Reads a store from the given file. Only plain arrays are read, never pickled objects.
+        Args:
+            path: store file
+
+        Returns:
+            Optional[LineCoverageStore]: line coverage store, or None if the file is missing, is not a store or has
+            another format version
+        """
+        try:
+            with np.load(path, allow_pickle=False) as arrays:
+                if "version" not in arrays or arrays["version"].tolist() != [STORE_FORMAT_VERSION]:
+                    return None
+                store = cls()
+                for klazz in arrays["classes"].tolist():
+                    store.get_class_id(klazz)
+                for name, bitmaps in store.__get_bitmaps().items():
+                    data = arrays[f"{name}_bitmaps"].tobytes()
+                    offsets = arrays[f"{name}_offsets"].tolist()
+                    for position, class_id in enumerate(arrays[f"{name}_class_ids"].tolist()):
+                        bitmaps[class_id] = data[offsets[position]:offsets[position + 1]]
+                for class_id, line, method_name in zip(arrays["method_name_class_ids"].tolist(),
+                                                       arrays["method_name_lines"].tolist(),
+                                                       arrays["method_names"].tolist()):
+                    store.method_names.setdefault(class_id, {})[line] = method_name
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            return None
+        return store
+
+    def __get_bitmaps(self) -> Dict[str, Dict[int, bytes]]:
+        return {"uncovered_lines": self.uncovered_lines, "covered_methods": self.covered_methods,
+                "uncovered_methods": self.uncovered_methods, "covered_db_lines": self.covered_db_lines,
+                "uncovered_db_lines": self.uncovered_db_lines}
+
+    @staticmethod
+    def __add_method_diff(diff: Dict[str, List[str]], qualified_class_name: str, method_names: Dict[int, str],
+                          bitmap: Optional[bytes], other: Optional[bytes]):
+        lines = intersection(bitmap, other)
+        if len(lines) > 0:
+            diff[qualified_class_name] = [f"{method_names[line]}:{line}" for line in lines]
+
+    @staticmethod
+    def __add_diff(diff: Dict[str, List[int]], qualified_class_name: str, bitmap: Optional[bytes],
+                   other: Optional[bytes]):
+        lines = difference(bitmap, other)
+        if len(lines) > 0:
+            diff[qualified_class_name] = lines
@@ -11,6 +11,5 @@ from test_emb_coverage import TestEMBCoverage
 if __name__ == '__main__':
     t=TestEMBCoverage()
     t.setUp()
-    t.test_get_reachability_coverage()
-    t.test_get_app_coverage()
+    t.test_evaluate()
     
\ No newline at end of file
@@ -0,0 +1,54 @@
+import asyncio
+import contextlib
+import io
+import json
+import socket
+from unittest import TestCase
+
+from agent_client import AgentClient, AsyncAgentClient
+from benchmark_coverage import StandInAgentServer
+from test_support import AGENT_PAYLOADS
+
+
+class TestAgentClient(TestCase):
+    def setUp(self):
+        self.agent = StandInAgentServer(dict(AGENT_PAYLOADS))
+        self.client = AgentClient(self.agent.port, host=self.agent.host, timeout=2.0)
+
+    def tearDown(self):
+        self.client.close()
+        self.agent.close()
+
+    def test_get_json_reuses_connection(self):
+        for _ in range(3):
+            self.assertEqual(self.client.get_json('/uncovered'), AGENT_PAYLOADS['/uncovered'])
+        self.assertEqual(len(self.agent.connections), 1)
+
+    def test_get_missing_path(self):
+        status_code, _ = self.client.get('/missing')
+        self.assertEqual(status_code, 404)
+
+    def test_stream(self):
+        with self.client.stream('/appcoverage') as response:
+            body = b''.join(response.iter_chunks(chunk_size=8))
+        self.assertEqual(json.loads(body), AGENT_PAYLOADS['/appcoverage'])
+
+    def test_get_many(self):
+        responses = asyncio.run(AsyncAgentClient(self.client).get_many(['/appcoverage', '/uncovered']))
+        self.assertEqual([status_code for status_code, _ in responses], [200, 200])
+        self.assertEqual(json.loads(responses[1][1]), AGENT_PAYLOADS['/uncovered'])
+
+    def test_connection_refused(self):
+        with socket.socket() as unused_socket:
+            unused_socket.bind(('127.0.0.1', 0))
+            port = unused_socket.getsockname()[1]
+        client = AgentClient(port, host='127.0.0.1', timeout=0.5, retries=1, backoff=0.0)
+        responses = asyncio.run(AsyncAgentClient(client).get_many(['/appcoverage']))
+        self.assertEqual(responses[0][0], -100)
+        self.assertIsInstance(responses[0][1], ConnectionError)
+        # Polling the unavailable agent prints the error once
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            client.fetch_all(['/appcoverage'])
+            client.fetch_all(['/appcoverage'])
+        self.assertEqual(len(output.getvalue().splitlines()), 1)
@@ -0,0 +1,89 @@
+import json
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+from analysis_index import AnalysisIndex, AnalysisIndexCache
+from analysis_loader import DependencyGraph
+from benchmark_coverage import SyntheticAnalysis
+from call_graph_index import CallGraphIndex
+from emb_coverage import EMBCoverage
+from test_support import SYMBOL_TABLE, build_sample_analysis, edge
+
+
+class TestAnalysisIndexCache(TestCase):
+    def setUp(self):
+        self.temporary_directory = tempfile.TemporaryDirectory()
+        self.cache = AnalysisIndexCache(Path(self.temporary_directory.name).joinpath('cache'))
+        self.analysis_json_path = Path(self.temporary_directory.name).joinpath('analysis.json')
+        self.analysis_json_path.write_bytes(b'{"symbol_table": {}, "version": "1"}')
+        self.analysis = build_sample_analysis()
+        self.builds = 0
+
+    def tearDown(self):
+        self.temporary_directory.cleanup()
+
+    def build_analysis(self):
+        self.builds += 1
+        return self.analysis
+
+    def test_get_or_build(self):
+        self.assertIsNone(self.cache.load(self.analysis_json_path))
+        built_index = self.cache.get_or_build(self.analysis_json_path, self.build_analysis)
+        cached_index = self.cache.get_or_build(self.analysis_json_path, self.build_analysis)
+        self.assertEqual(self.builds, 1)
+        self.assertEqual(cached_index.call_graph.methods, built_index.call_graph.methods)
+        self.assertEqual(cached_index.call_graph.successors, built_index.call_graph.successors)
+        self.assertEqual(cached_index.type_hierarchy.implementors, built_index.type_hierarchy.implementors)
+        endpoint = cached_index.call_graph.method_id('app.Controller', 'get(String)')
+        self.assertEqual(cached_index.call_graph.reachable(endpoint, 3),
+                         built_index.call_graph.reachable(endpoint, 3))
+
+    def test_content_change_invalidates(self):
+        self.cache.get_or_build(self.analysis_json_path, self.build_analysis)
+        self.analysis_json_path.write_bytes(b'{"symbol_table": {}, "version": "2"}')
+        self.cache.get_or_build(self.analysis_json_path, self.build_analysis)
+        self.assertEqual(self.builds, 2)
+
+    def test_load_corrupted(self):
+        index_path = Path(self.temporary_directory.name).joinpath('corrupted.index')
+        index_path.write_bytes(b'not an index')
+        self.assertIsNone(AnalysisIndex.load(index_path))
+
+    def test_index_only_reachable_methods(self):
+        analysis = SyntheticAnalysis(50, seed=2)
+        index_path = Path(self.temporary_directory.name).joinpath('synthetic.index')
+        AnalysisIndex.from_analysis(analysis).save(index_path)
+        index_coverage = EMBCoverage.from_index(AnalysisIndex.load(index_path), 0)
+        analysis_coverage = EMBCoverage(analysis, 0)
+        for endpoint in analysis_coverage.reachability.index.entrypoints:
+            endpoint_method = analysis_coverage.reachability.index.methods[endpoint]
+            self.assertEqual(index_coverage.reachability.get_reachable_methods(*endpoint_method),
+                             analysis_coverage.reachability.get_reachable_methods(*endpoint_method))
+
+    def test_index_without_method_code(self):
+        analysis_index = AnalysisIndex.from_analysis(self.analysis)
+        call_graph = analysis_index.call_graph
+        analysis_index.call_graph = CallGraphIndex(call_graph.methods, call_graph.start_lines, call_graph.end_lines,
+                                                   call_graph.successors, call_graph.entrypoints)
+        emb_coverage = EMBCoverage.from_index(analysis_index, 0)
+        with self.assertRaises(ValueError):
+            emb_coverage.reachability.get_reachable_methods('app.Controller', 'get(String)')
+
+    def test_get_or_build_without_cldk(self):
+        # Latin-1 encoding leaves an invalid UTF-8 byte in the symbol table
+        self.analysis_json_path.write_bytes(json.dumps(
+            {"system_dependency_graph": [edge("app.ServiceImpl", "find(String)", "app.Controller", "get(String)",
+                                              "CALL_DEP")],
+             "symbol_table": SYMBOL_TABLE, "version": "1.0"}, ensure_ascii=False).encode('latin-1'))
+        dependency_graph = DependencyGraph.load(self.analysis_json_path)
+        for analysis_index in (self.cache.get_or_build(self.analysis_json_path, dependency_graph=dependency_graph),
+                               self.cache.get_or_build(self.analysis_json_path)):
+            call_graph = analysis_index.call_graph
+            endpoint = call_graph.method_id('app.Controller', 'get(String)')
+            self.assertEqual(call_graph.entrypoints, [endpoint])
+            self.assertEqual([call_graph.methods[method_id] for method_id in call_graph.reachable(endpoint, 3)],
+                             [('app.Controller', 'get(String)'), ('app.ServiceImpl', 'find(String)')])
+            self.assertEqual(call_graph.successors[call_graph.method_id('app.ServiceImpl', 'find(String)')],
+                             (endpoint,))
+        self.assertEqual(self.builds, 0)
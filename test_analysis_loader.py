@@ -0,0 +1,55 @@
+import json
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+from analysis_loader import DependencyGraph, SymbolTable, iter_dependency_edges
+from test_support import SYMBOL_TABLE, edge
+
+
+class TestAnalysisLoader(TestCase):
+    def setUp(self):
+        self.edges = [edge("app.Controller", "get(java.lang.String)", "app.Service", "find(java.lang.String)",
+                           "CALL_DEP"),
+                      edge("app.Controller", "get(java.lang.String)", "app.Service", "find(java.lang.String)",
+                           "DATA_DEP"),
+                      edge("app.Service", "find(java.lang.String)", "app.Repository", "query()", "CALL_DEP")]
+        document = {"symbol_table": {"Controller.java": {"code": "say(\"Colômbia\\\\\"); } [ {",
+                                                         "lines": [1, 2.5, None, True]}},
+                    "system_dependency_graph": self.edges,
+                    "version": "1.0"}
+        self.temporary_directory = tempfile.TemporaryDirectory()
+        self.analysis_json_path = Path(self.temporary_directory.name).joinpath('analysis.json')
+        # Latin-1 encoding leaves an invalid UTF-8 byte in the symbol table
+        self.analysis_json_path.write_bytes(json.dumps(document, ensure_ascii=False, indent=2).encode('latin-1'))
+
+    def tearDown(self):
+        self.temporary_directory.cleanup()
+
+    def test_iter_dependency_edges(self):
+        for chunk_size in (3, 17, 1 << 16):
+            self.assertEqual(list(iter_dependency_edges(self.analysis_json_path, chunk_size)), self.edges)
+
+    def test_load(self):
+        dependency_graph = DependencyGraph.load(self.analysis_json_path, chunk_size=5)
+        self.assertEqual(dependency_graph.classes, ["app.Controller", "app.Service", "app.Repository"])
+        self.assertEqual(len(dependency_graph.nodes), 3)
+        self.assertEqual(list(dependency_graph.get_edges("DATA_DEP")), [(0, 1)])
+        self.assertEqual(list(dependency_graph.get_call_edges()),
+                         [(("get(java.lang.String)", "app.Controller"), ("find(java.lang.String)", "app.Service")),
+                          (("find(java.lang.String)", "app.Service"), ("query()", "app.Repository"))])
+        self.assertEqual(list(dependency_graph.get_edges("CONTROL_DEP")), [])
+
+    def test_symbol_table(self):
+        self.analysis_json_path.write_bytes(json.dumps({"symbol_table": SYMBOL_TABLE, "version": "1.0"},
+                                                       ensure_ascii=False).encode('latin-1'))
+        symbol_table = SymbolTable.load(self.analysis_json_path, chunk_size=7)
+        self.assertEqual(list(symbol_table.get_classes()), ["app.Controller", "app.Service", "app.ServiceImpl"])
+        method = symbol_table.get_method("app.Controller", qualified_method_name="get(String)")
+        self.assertTrue(method.is_entrypoint)
+        self.assertEqual((method.start_line, method.end_line), (10, 14))
+        self.assertEqual(method.code, 'say("Col\ufffdmbia");')
+        self.assertEqual(method.call_sites[0].receiver_type, "app.Service")
+        self.assertEqual(method.crud_operations, [])
+        self.assertEqual(symbol_table.get_class("app.ServiceImpl").implements_list, ["app.Service"])
+        self.assertIsNone(symbol_table.get_method("app.Missing", "get()"))
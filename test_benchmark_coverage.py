@@ -0,0 +1,44 @@
+import json
+from unittest import TestCase
+
+from analysis_index import AnalysisIndex
+from benchmark_coverage import (SyntheticAnalysis, StandInAgentServer, benchmark_size, compare_with_baseline,
+                                generate_payloads)
+from emb_coverage import EMBCoverage
+
+
+class TestBenchmarkCoverage(TestCase):
+    def setUp(self):
+        self.analysis = SyntheticAnalysis(num_classes=20, methods_per_class=4, interface_fan_out=2, call_depth=3,
+                                          crud_density=0.5, entity_density=0.5, transactional_density=0.5)
+
+    def test_synthetic_analysis(self):
+        analysis_index = AnalysisIndex.from_analysis(self.analysis)
+        self.assertEqual(len(analysis_index.call_graph.entrypoints), 7 * 4)
+        self.assertEqual(analysis_index.type_hierarchy.concrete_classes('app.layer1.Interface0'),
+                         ['app.layer1.Class7', 'app.layer1.Class8'])
+        self.assertTrue(any(any(method[3]) for methods in analysis_index.db_lines.methods_by_class.values()
+                            for method in methods))
+        # Same keyword arguments as JavaAnalysis.get_method
+        qualified_class_name, method_signature = analysis_index.call_graph.methods[0]
+        self.assertIsNotNone(self.analysis.get_method(qualified_class_name=qualified_class_name,
+                                                      qualified_method_name=method_signature))
+
+    def test_stand_in_agent(self):
+        payloads = generate_payloads(self.analysis)
+        with StandInAgentServer(payloads) as server:
+            emb_coverage = EMBCoverage(self.analysis, server.port, reachability_depth=3, agent_host=server.host)
+            reachability_coverage, app_coverage = emb_coverage.evaluate()
+            emb_coverage.agent_client.close()
+        self.assertEqual(app_coverage["line_coverage"], json.loads(payloads["/appcoverage"])["app"]["line"])
+        self.assertGreater(reachability_coverage["overall_coverage"][0]["line_coverage"], 0.0)
+        self.assertGreater(reachability_coverage["overall_coverage"][0]["database_interaction_coverage"], 0.0)
+
+    def test_benchmark_size(self):
+        results = {"20": benchmark_size(20, repeat=1, methods_per_class=4)}
+        self.assertEqual(set(results["20"]), {"analysis_index", "capture", "reachable_methods", "db_coverage",
+                                              "reachability_coverage", "app_coverage"})
+        baseline = {"20": {phase: {"seconds": measurement["seconds"] / 10, "peak_bytes": measurement["peak_bytes"]}
+                           for phase, measurement in results["20"].items()}}
+        self.assertEqual(compare_with_baseline(results, results), [])
+        self.assertEqual(len(compare_with_baseline(results, baseline, min_seconds=0.0)), 6)
@@ -0,0 +1,75 @@
+import json
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+from coverage_aggregation import aggregate_runs, discover_runs
+
+
+def method_coverage(method_signature, line_coverage, database_interaction_coverage=-100.0,
+                    database_uncovered_lines=None):
+    return {"method_signature": method_signature, "line_coverage": line_coverage, "branch_coverage": -100.0,
+            "instruction_coverage": line_coverage, "database_interaction_coverage": database_interaction_coverage,
+            "database_uncovered_lines": database_uncovered_lines}
+
+
+def overall_coverage(line_coverage):
+    return [{"line_coverage": line_coverage, "branch_coverage": -100, "instruction_coverage": line_coverage,
+             "database_interaction_coverage": -100, "database_uncovered_lines": "{}"}]
+
+
+class TestCoverageAggregation(TestCase):
+    def setUp(self):
+        self.temporary_directory = tempfile.TemporaryDirectory()
+        self.covs_dir = Path(self.temporary_directory.name)
+        reports = {
+            'shop_100': {"app.Repository": [method_coverage("save()", 50.0, 0.0, [3, 4])],
+                         "app.Service": [method_coverage("find()", 0.0)],
+                         "overall_coverage": overall_coverage(40.0)},
+            'shop_101': {"app.Repository": [method_coverage("save()", 100.0, 50.0, [4])],
+                         "overall_coverage": overall_coverage(60.0)},
+        }
+        for run, reachability_coverage in reports.items():
+            run_dir = self.covs_dir.joinpath(run)
+            run_dir.mkdir()
+            run_dir.joinpath('reachability_coverage.json').write_text(json.dumps(reachability_coverage))
+            run_dir.joinpath('application_coverage.json').write_text(json.dumps(
+                {"line_coverage": 70.0, "branch_coverage": 50.0, "instruction_coverage": 75.0,
+                 "database_interaction_line_coverage": -100.0}))
+        self.covs_dir.joinpath('notes').mkdir()
+
+    def tearDown(self):
+        self.temporary_directory.cleanup()
+
+    def test_discover_runs(self):
+        runs = discover_runs(self.covs_dir)
+        self.assertEqual(list(runs), ['shop'])
+        self.assertEqual([seed for seed, _ in runs['shop']], [100, 101])
+
+    def test_aggregate_runs(self):
+        output_dir = self.covs_dir.joinpath('summaries')
+        summary = aggregate_runs(self.covs_dir, output_dir, max_workers=1)['shop']
+        self.assertEqual(summary["seeds"], [100, 101])
+        self.assertEqual(summary["overall_coverage"]["line_coverage"],
+                         {"mean": 50.0, "std": 10.0, "min": 40.0, "max": 60.0})
+        self.assertEqual(summary["overall_coverage"]["branch_coverage"]["mean"], -100.0)
+        save, = summary["reachability_coverage"]["app.Repository"]
+        self.assertEqual(save["line_coverage"]["mean"], 75.0)
+        self.assertEqual(save["database_uncovered_lines"], [4])
+        find, = summary["reachability_coverage"]["app.Service"]
+        self.assertEqual((find["seeds"], find["covered_seeds"]), (1, 0))
+        self.assertEqual(find["line_coverage"]["std"], 0.0)
+        self.assertEqual(summary["union_coverage"], {"reached_methods": 2, "covered_methods": 1,
+                                                     "method_coverage": 50.0})
+        self.assertEqual(summary["application_coverage"]["database_interaction_line_coverage"]["max"], -100.0)
+        self.assertTrue(output_dir.joinpath('shop_summary.json').exists())
+
+    def test_sut_without_reports(self):
+        self.covs_dir.joinpath('broken_100').mkdir()
+        self.covs_dir.joinpath('broken_101').mkdir()
+        self.covs_dir.joinpath('broken_101', 'reachability_coverage.json').write_text('{')
+        summaries = aggregate_runs(self.covs_dir, max_workers=2)
+        self.assertEqual(summaries['shop']['seeds'], [100, 101])
+        self.assertEqual(summaries['broken']['seeds'], [])
+        self.assertEqual(summaries['broken']['overall_coverage']['line_coverage']['mean'], -100.0)
+        self.assertEqual(summaries['broken']['union_coverage']['method_coverage'], -100.0)
@@ -0,0 +1,92 @@
+import pickle
+import socket
+import tempfile
+import time
+from pathlib import Path
+from unittest import TestCase
+
+from analysis_index import AnalysisIndex
+from benchmark_coverage import StandInAgentServer
+from coverage_coordinator import CoverageCoordinator, CoverageTarget
+from emb_coverage import EMBCoverage
+from test_support import build_sample_analysis, method_coverage
+
+
+class HangOnLoad:
+    """Sleeps when unpickled"""
+
+    def __reduce__(self):
+        return time.sleep, (60,)
+
+
+class HangingAnalysisIndex(AnalysisIndex):
+    """Analysis index whose joins hang in the join worker processes, which load it from its index file"""
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            pickle.dump(HangOnLoad(), f)
+
+
+class TestCoverageCoordinator(TestCase):
+    def setUp(self):
+        self.agent = StandInAgentServer({
+            '/appcoverage': {'app': {'line': 50.0, 'branch': 25.0, 'instruction': 75.0}},
+            '/methodcoverage': {'app.Controller': {'get:10': method_coverage(2, 4)}},
+            '/uncovered': {}})
+        # Accepts connections but never answers
+        self.silent_socket = socket.socket()
+        self.silent_socket.bind(('127.0.0.1', 0))
+        self.silent_socket.listen()
+        unused_socket = socket.socket()
+        unused_socket.bind(('127.0.0.1', 0))
+        self.unused_port = unused_socket.getsockname()[1]
+        unused_socket.close()
+        self.analysis = build_sample_analysis()
+        self.analysis_index = AnalysisIndex.from_analysis(self.analysis)
+
+    def tearDown(self):
+        self.agent.close()
+        self.silent_socket.close()
+
+    def test_collect(self):
+        targets = [CoverageTarget('running', self.agent.port, analysis=self.analysis, host='127.0.0.1'),
+                   CoverageTarget('stopped', self.unused_port, analysis_index=self.analysis_index,
+                                  host='127.0.0.1'),
+                   CoverageTarget('hanging', self.silent_socket.getsockname()[1], analysis_index=self.analysis_index,
+                                  host='127.0.0.1', timeout=0.2)]
+        with tempfile.TemporaryDirectory() as index_dir:
+            with CoverageCoordinator(targets, agent_timeout=2.0, agent_retries=0, max_join_workers=1,
+                                     index_dir=index_dir) as coordinator:
+                results = coordinator.collect()
+            # Only the index of the target that was captured is built
+            self.assertEqual([path.name for path in Path(index_dir).iterdir()], ['0.index'])
+        self.assertEqual(list(results), ['running', 'stopped', 'hanging'])
+
+        emb_coverage = EMBCoverage(self.analysis, self.agent.port, agent_host=self.agent.host)
+        self.assertTrue(results['running'].ok)
+        self.assertEqual((results['running'].reachability_coverage, results['running'].app_coverage),
+                         emb_coverage.evaluate())
+        self.assertIn('/methodcoverage', results['stopped'].error)
+        self.assertIsNone(results['stopped'].reachability_coverage)
+        self.assertEqual(results['hanging'].error, 'Timed out during capture')
+
+    def test_duplicate_names(self):
+        with self.assertRaises(ValueError):
+            CoverageCoordinator([CoverageTarget('a', 1, analysis_index=self.analysis_index),
+                                 CoverageTarget('a', 2, analysis_index=self.analysis_index)])
+
+    def test_join_timeout(self):
+        hanging_index = HangingAnalysisIndex(self.analysis_index.call_graph, self.analysis_index.type_hierarchy,
+                                             self.analysis_index.db_lines)
+        targets = [CoverageTarget('hanging', self.agent.port, analysis_index=hanging_index,
+                                  host='127.0.0.1', timeout=0.5),
+                   CoverageTarget('running', self.agent.port, analysis_index=self.analysis_index,
+                                  host='127.0.0.1', timeout=10.0)]
+        with CoverageCoordinator(targets, agent_timeout=2.0, agent_retries=0, max_join_workers=1) as coordinator:
+            for _ in range(2):
+                started_at = time.monotonic()
+                results = coordinator.collect()
+                # The hanging join is stopped, so it neither holds up the other join nor the next collection
+                self.assertLess(time.monotonic() - started_at, 10.0)
+                self.assertEqual(results['hanging'].error, 'Timed out during join')
+                self.assertTrue(results['running'].ok)
@@ -0,0 +1,40 @@
+from unittest import TestCase
+
+from coverage_join import DBCoverageIndex, MethodCoverageIndex, ReachabilityCoverageJoin
+from test_support import method_coverage
+
+
+class TestReachabilityCoverageJoin(TestCase):
+    def setUp(self):
+        self.method_coverage = MethodCoverageIndex({
+            "app.Service": {"find:12": method_coverage(3, 4),
+                            "find:30": method_coverage(1, 1),
+                            "save:21": method_coverage(0, 2)},
+        })
+        self.db_coverage = DBCoverageIndex({
+            "app.Service": [{"method_signature": "save(Entity)", "total_db_line_count": 2,
+                             "db_line_coverage": 50.0, "db_uncovered_lines": [22]}],
+        })
+
+    def test_get_method_coverage_interval(self):
+        self.assertEqual(self.method_coverage.get_method_coverage("app.Service", "find", 11, 15),
+                         [method_coverage(3, 4)])
+        self.assertEqual(len(self.method_coverage.get_method_coverage("app.Service", "find", 10, 40)), 2)
+        self.assertEqual(self.method_coverage.get_method_coverage("app.Service", "find", 13, 20), [])
+        self.assertEqual(self.method_coverage.get_method_coverage("app.Other", "find", 0, 100), [])
+
+    def test_add_method(self):
+        coverage_join = ReachabilityCoverageJoin(self.method_coverage, self.db_coverage)
+        coverage_join.add_method("app.Service", "find(String)", 11, 15)
+        coverage_join.add_method("app.Service", "save(Entity)", 20, 24)
+        self.assertEqual(coverage_join.add_method("app.Service", "find(String)", 11, 15), [])
+
+        coverage_dict = coverage_join.get_coverage_dict()
+        self.assertEqual([coverage["method_signature"] for coverage in coverage_dict["app.Service"]],
+                         ["find(String)", "save(Entity)"])
+        self.assertEqual(coverage_dict["app.Service"][0]["line_coverage"], 75.0)
+        self.assertEqual(coverage_dict["app.Service"][1]["database_interaction_coverage"], 50.0)
+        self.assertEqual(coverage_dict["app.Service"][1]["database_uncovered_lines"], [22])
+        overall_coverage = coverage_dict["overall_coverage"][0]
+        self.assertEqual(overall_coverage["line_coverage"], 50.0)
+        self.assertEqual(overall_coverage["branch_coverage"], -100)
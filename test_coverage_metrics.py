@@ -0,0 +1,52 @@
+import json
+from unittest import TestCase
+
+from benchmark_coverage import StandInAgentServer
+from coverage_metrics import EvaluationMetrics, timed
+from emb_coverage import EMBCoverage
+from test_support import build_sample_analysis, method_coverage
+
+
+class TestEvaluationMetrics(TestCase):
+    def test_export(self):
+        metrics = EvaluationMetrics()
+        metrics.increment("get_method_calls")
+        metrics.increment("get_method_calls", 2)
+        with timed(metrics, "join"):
+            pass
+        with timed(None, "join"):
+            pass
+        self.assertEqual(json.loads(metrics.to_json())["counters"], {"get_method_calls": 3})
+        exposition = metrics.to_prometheus(labels={"sut": 'shop "v2"'})
+        self.assertIn('emb_coverage_get_method_calls_total{sut="shop \\"v2\\""} 3\n', exposition)
+        self.assertIn('emb_coverage_phase_seconds_total{sut="shop \\"v2\\"",phase="join"} ', exposition)
+
+    def test_evaluate(self):
+        payloads = {
+            '/appcoverage': {'app': {'line': 50.0, 'branch': 25.0, 'instruction': 75.0}},
+            '/methodcoverage': {'app.Controller': {'get:10': method_coverage(2, 4)}},
+            '/uncovered': {}}
+        with StandInAgentServer(payloads) as agent:
+            emb_coverage = EMBCoverage(build_sample_analysis(), agent.port, collect_metrics=True,
+                                       agent_host=agent.host)
+            emb_coverage.evaluate()
+            first_metrics = emb_coverage.metrics.to_dict()
+            emb_coverage.evaluate()
+            metrics = emb_coverage.metrics.to_dict()
+            # Reports computed on their own only fetch the paths they read
+            emb_coverage.reset_metrics()
+            emb_coverage.get_reachability_coverage()
+            emb_coverage.get_app_coverage()
+            standalone_metrics = emb_coverage.reset_metrics().to_dict()
+            emb_coverage.agent_client.close()
+        self.assertEqual(standalone_metrics["counters"]["agent_requests"], 4)
+        # The first evaluation builds the indexes from the analysis
+        self.assertIn("index_build", first_metrics["phase_seconds"])
+        self.assertEqual(metrics["counters"]["agent_response_bytes"],
+                         sum(len(json.dumps(payload).encode()) for payload in payloads.values()))
+        # Metrics cover the last evaluation only, its reachable sets were memoized by the first one
+        self.assertEqual(metrics["counters"]["agent_requests"], 3)
+        self.assertEqual(metrics["counters"]["endpoints"], 2)
+        self.assertEqual(metrics["counters"]["reachability_memo_hits"], 2)
+        self.assertNotIn("reachability_steps", metrics["counters"])
+        self.assertEqual(set(metrics["phase_seconds"]), {"capture", "parse", "db_coverage", "reachability", "join"})
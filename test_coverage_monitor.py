@@ -0,0 +1,100 @@
+import contextlib
+import io
+import json
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+from benchmark_coverage import StandInAgentServer, SyntheticAnalysis, generate_payloads
+from coverage_monitor import CoverageMonitor
+from emb_coverage import EMBCoverage
+from line_coverage_store import LineCoverageStore
+from test_support import build_sample_analysis, method_coverage
+
+
+class TestCoverageMonitor(TestCase):
+    def setUp(self):
+        self.agent = StandInAgentServer({
+            '/appcoverage': {'app': {'line': 50.0, 'branch': 25.0, 'instruction': 75.0}},
+            '/methodcoverage': {'app.Controller': {'get:10': method_coverage(2, 4)},
+                                'app.ServiceImpl': {'find:6': method_coverage(0, 3)}},
+            '/uncovered': {}})
+        self.emb_coverage = EMBCoverage(build_sample_analysis(), self.agent.port, agent_host=self.agent.host)
+        self.temporary_directory = tempfile.TemporaryDirectory()
+        self.timeline_path = Path(self.temporary_directory.name).joinpath('timeline.jsonl')
+        self.monitor = CoverageMonitor(self.emb_coverage, self.timeline_path, interval=0.0)
+
+    def tearDown(self):
+        self.emb_coverage.agent_client.close()
+        self.agent.close()
+        self.temporary_directory.cleanup()
+
+    def test_sample(self):
+        record = self.monitor.sample()
+        self.assertEqual(record["reachability"]["line_coverage"], 2 / 7 * 100.0)
+        self.assertEqual(record["endpoints"], {"app.Controller.get(String)": [2, 7],
+                                               "app.Controller.post()": [2, 4]})
+        self.agent.payloads['/methodcoverage']['app.ServiceImpl']['find:6'] = method_coverage(3, 3)
+        record = self.monitor.sample()
+        self.assertEqual(record["changed_classes"], 1)
+        self.assertEqual(record["endpoints"], {"app.Controller.get(String)": [5, 7]})
+        overall_coverage = self.emb_coverage.get_reachability_coverage()["overall_coverage"][0]
+        del overall_coverage["database_uncovered_lines"]
+        self.assertEqual(record["reachability"], overall_coverage)
+        self.assertEqual(record["app"], self.emb_coverage.get_app_coverage())
+
+    def test_line_store(self):
+        line_store_path = Path(self.temporary_directory.name).joinpath('line_coverage.npz')
+        monitor = CoverageMonitor(self.emb_coverage, self.timeline_path, interval=0.0, line_store_path=line_store_path)
+        self.agent.payloads['/uncovered'] = {'app.Controller': {'get:10': [11, 12]}}
+        self.assertEqual(monitor.sample()["lines"], {"newly_covered_lines": 0, "lost_lines": 0,
+                                                     "newly_covered_db_lines": 0, "lost_db_lines": 0,
+                                                     "added_classes": 2})
+        self.agent.payloads['/uncovered'] = {'app.Controller': {'get:10': [12, 13]}}
+        record = monitor.sample()
+        self.assertEqual((record["lines"]["newly_covered_lines"], record["lines"]["lost_lines"]), (1, 1))
+        self.assertEqual(LineCoverageStore.load(line_store_path).get_uncovered_lines('app.Controller'), [12, 13])
+
+    def test_run(self):
+        self.monitor.run(max_samples=3)
+        records = [json.loads(line) for line in self.timeline_path.read_text().splitlines()]
+        self.assertEqual([record["changed_classes"] for record in records], [2, 0, 0])
+        self.assertEqual(records[2]["endpoints"], {})
+
+    def test_agent_outage(self):
+        self.monitor.sample()
+        method_coverage_payload = self.agent.payloads.pop('/methodcoverage')
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            self.assertIsNone(self.monitor.sample())
+            self.monitor.run(max_samples=2)
+        # The outage is printed once and every skipped sample is in the timeline
+        self.assertEqual(len(output.getvalue().splitlines()), 1)
+        self.agent.payloads['/methodcoverage'] = method_coverage_payload
+        record = self.monitor.sample()
+        self.assertEqual(record["changed_classes"], 0)
+        records = [json.loads(line) for line in self.timeline_path.read_text().splitlines()]
+        self.assertEqual([record.get("skipped") for record in records],
+                         [None] + [{"failed_paths": {"/methodcoverage": 404}}] * 3 + [None])
+        self.assertEqual(self.monitor.skipped_samples, 3)
+
+    def test_snapshot_ttl(self):
+        self.assertIsNot(self.emb_coverage.get_snapshot(), self.emb_coverage.get_snapshot())
+        self.emb_coverage.snapshot_ttl = 60.0
+        self.assertIs(self.emb_coverage.get_snapshot(), self.emb_coverage.get_snapshot())
+
+    def test_matches_reports(self):
+        analysis = SyntheticAnalysis(30, seed=2)
+        payloads = {}
+        with StandInAgentServer(payloads) as server:
+            emb_coverage = EMBCoverage(analysis, server.port, agent_host=server.host)
+            monitor = CoverageMonitor(emb_coverage, self.timeline_path, interval=0.0)
+            # The totals follow the uncovered database interaction lines up and down
+            for seed, coverage in [(1, 0.3), (2, 0.9), (3, 0.1)]:
+                payloads.update(generate_payloads(analysis, coverage=coverage, seed=seed))
+                record = monitor.sample()
+                overall_coverage = emb_coverage.get_reachability_coverage()["overall_coverage"][0]
+                del overall_coverage["database_uncovered_lines"]
+                self.assertEqual(record["reachability"], overall_coverage)
+                self.assertEqual(record["app"], emb_coverage.get_app_coverage())
+            emb_coverage.agent_client.close()
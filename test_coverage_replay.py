@@ -0,0 +1,95 @@
+import json
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+from analysis_index import AnalysisIndex, AnalysisIndexCache
+from benchmark_coverage import StandInAgentServer
+from coverage_replay import ANALYSIS_FILE, RECORDING_DIR, replay_run, replay_runs
+from coverage_snapshot import CoverageSnapshot
+from emb_coverage import EMBCoverage
+from line_coverage_store import LINE_COVERAGE_FILE, LineCoverageStore
+from test_support import SYMBOL_TABLE, build_sample_analysis, method_coverage
+
+
+class TestCoverageReplay(TestCase):
+    def setUp(self):
+        self.agent = StandInAgentServer({
+            '/appcoverage': {'app': {'line': 50.0, 'branch': 25.0, 'instruction': 75.0}},
+            '/methodcoverage': {'app.Controller': {'get:10': method_coverage(2, 4)}},
+            '/uncovered': {'app.Controller': {'get:10': [11, 12]}}})
+        self.temporary_dir = tempfile.TemporaryDirectory()
+        self.covs_dir = Path(self.temporary_dir.name, 'covs')
+        self.cache_dir = Path(self.temporary_dir.name, 'cache')
+        self.analysis = build_sample_analysis()
+
+    def tearDown(self):
+        self.agent.close()
+        self.temporary_dir.cleanup()
+
+    def record_run(self, name: str, analysis_content: str, cache_index: bool = True) -> tuple:
+        run_dir = self.covs_dir.joinpath(name)
+        run_dir.mkdir(parents=True)
+        run_dir.joinpath(ANALYSIS_FILE).write_text(analysis_content)
+        if cache_index:
+            cache = AnalysisIndexCache(self.cache_dir)
+            AnalysisIndex.from_analysis(self.analysis).save(
+                cache.get_index_path(cache.get_analysis_hash(run_dir.joinpath(ANALYSIS_FILE))))
+        emb_coverage = EMBCoverage(self.analysis, self.agent.port, recording_dir=run_dir.joinpath(RECORDING_DIR),
+                                   agent_host=self.agent.host)
+        return emb_coverage.evaluate()
+
+    def test_save_and_load_snapshot(self):
+        snapshot = CoverageSnapshot({'/methodcoverage': (200, '{"a": {}}'), '/uncovered': (404, ''),
+                                     '/appcoverage': (-100, 'ConnectionRefusedError()')})
+        snapshot.save(self.covs_dir)
+        self.assertEqual(CoverageSnapshot.load(self.covs_dir).responses, snapshot.responses)
+        with self.assertRaises(FileNotFoundError):
+            CoverageSnapshot.load(self.cache_dir)
+
+    def test_replay_run(self):
+        evaluation = self.record_run('app_1', '{"seed": 1}')
+        output_dir = Path(self.temporary_dir.name, 'replayed')
+        self.assertEqual(replay_run(self.covs_dir.joinpath('app_1'), self.cache_dir, output_dir=output_dir),
+                         evaluation)
+        with open(output_dir.joinpath('reachability_coverage.json')) as f:
+            self.assertEqual(json.load(f), evaluation[0])
+        line_store = LineCoverageStore.load(output_dir.joinpath(LINE_COVERAGE_FILE))
+        self.assertEqual(line_store.get_uncovered_lines('app.Controller'), [11, 12])
+
+    def test_replay_runs(self):
+        evaluations = {'app_1': self.record_run('app_1', '{}')}
+        self.agent.payloads['/methodcoverage'] = {'app.Controller': {'get:10': method_coverage(4, 4)}}
+        self.agent.payloads['/uncovered'] = {'app.Controller': {'get:10': []}}
+        evaluations['app_2'] = self.record_run('app_2', '{}')
+        self.record_run('other_1', '{"other": true}', cache_index=False)
+        self.covs_dir.joinpath('app_3').mkdir()
+
+        results = replay_runs(self.covs_dir, self.cache_dir, max_workers=2)
+        self.assertEqual(list(results), ['app_1', 'app_2', 'other_1'])
+        for name, evaluation in evaluations.items():
+            self.assertIsNone(results[name]['error'])
+            self.assertEqual((results[name]['reachability_coverage'], results[name]['app_coverage']), evaluation)
+        self.assertNotEqual(evaluations['app_1'][0], evaluations['app_2'][0])
+        self.assertIn('No cached analysis index', results['other_1']['error'])
+        self.assertIsNone(results['other_1']['reachability_coverage'])
+
+    def test_replay_runs_without_analysis(self):
+        self.record_run('app_1', '{}')
+        self.record_run('app_2', '{}')
+        self.covs_dir.joinpath('app_2', ANALYSIS_FILE).unlink()
+        results = replay_runs(self.covs_dir, self.cache_dir, max_workers=1)
+        self.assertIsNone(results['app_1']['error'])
+        self.assertIn('FileNotFoundError', results['app_2']['error'])
+        self.assertIsNone(results['app_2']['reachability_coverage'])
+
+    def test_replay_runs_build_missing(self):
+        self.record_run('restcountries_1', '{}', cache_index=False)
+        # Latin-1 encoding leaves an invalid UTF-8 byte in the symbol table, which CLDK cannot read
+        self.covs_dir.joinpath('restcountries_1', ANALYSIS_FILE).write_bytes(
+            json.dumps({"symbol_table": SYMBOL_TABLE, "version": "1.0"}, ensure_ascii=False).encode('latin-1'))
+        self.assertIn('No cached analysis index',
+                      replay_runs(self.covs_dir, self.cache_dir, max_workers=1)['restcountries_1']['error'])
+        result = replay_runs(self.covs_dir, self.cache_dir, max_workers=1, build_missing=True)['restcountries_1']
+        self.assertIsNone(result['error'])
+        self.assertEqual(result['reachability_coverage']['app.Controller'][0]['line_coverage'], 50.0)
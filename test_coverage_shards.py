@@ -0,0 +1,80 @@
+import json
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+import numpy as np
+
+from analysis_index import AnalysisIndex
+from benchmark_coverage import SyntheticAnalysis, generate_payloads
+from coverage_join import DBCoverageIndex, MethodCoverageIndex, ReachabilityCoverageJoin
+from coverage_shards import CoverageShardPool, SharedShardIndex, get_shards
+from coverage_snapshot import CoverageSnapshot
+from emb_coverage import EMBCoverage
+
+
+class TestCoverageShards(TestCase):
+    def setUp(self):
+        self.analysis = SyntheticAnalysis(40, seed=5)
+        self.responses = {path: (200, payload.decode())
+                          for path, payload in generate_payloads(self.analysis, seed=5).items()}
+        self.emb_coverage = EMBCoverage(self.analysis, 0)
+
+    def evaluate(self, emb_coverage: EMBCoverage) -> str:
+        snapshot = CoverageSnapshot(self.responses)
+        return json.dumps((emb_coverage.get_reachability_coverage(snapshot), emb_coverage.get_app_coverage(snapshot),
+                           emb_coverage.get_endpoint_coverage(snapshot),
+                           emb_coverage.get_reachability_coverage_table(snapshot).to_coverage_dict()))
+
+    def test_get_shards(self):
+        self.assertEqual(get_shards(list(range(7)), 3), [[0, 1, 2], [3, 4], [5, 6]])
+        self.assertEqual(get_shards([1, 2], 4), [[1], [2]])
+        self.assertEqual(get_shards([], 4), [])
+
+    def test_sharded_evaluation(self):
+        expected = self.evaluate(self.emb_coverage)
+        responses = dict(self.responses)
+        for shard_workers in (1, 3):
+            with EMBCoverage(self.analysis, 0, shard_workers=shard_workers) as emb_coverage:
+                self.assertEqual(self.evaluate(emb_coverage), expected)
+                self.responses['/uncovered'] = (200, '{}')
+                self.assertEqual(self.evaluate(emb_coverage), self.evaluate(self.emb_coverage))
+                self.responses['/uncovered'] = (-100, 'ConnectionRefusedError()')
+                self.assertEqual(self.evaluate(emb_coverage), self.evaluate(self.emb_coverage))
+                self.responses = dict(responses)
+
+    def test_index_file(self):
+        analysis_index = AnalysisIndex.from_analysis(self.analysis)
+        snapshot = CoverageSnapshot(self.responses)
+        db_coverage = analysis_index.db_lines.get_db_coverage(snapshot.uncovered_lines)
+        coverage_join = ReachabilityCoverageJoin(MethodCoverageIndex(snapshot.method_coverage),
+                                                 DBCoverageIndex(db_coverage))
+        method_ids = list(range(len(analysis_index.call_graph.methods)))
+        for method_id in method_ids:
+            qualified_class_name, method_signature = analysis_index.call_graph.methods[method_id]
+            coverage_join.add_method(qualified_class_name, method_signature,
+                                     analysis_index.call_graph.start_lines[method_id],
+                                     analysis_index.call_graph.end_lines[method_id])
+        with tempfile.TemporaryDirectory() as temporary_directory:
+            index_dir = Path(temporary_directory).joinpath('shared_index')
+            with CoverageShardPool(analysis_index, max_workers=2, index_dir=index_dir) as shard_pool:
+                self.assertEqual(shard_pool.get_db_coverage(snapshot.uncovered_lines), db_coverage)
+                sharded_join = ReachabilityCoverageJoin(MethodCoverageIndex({}), DBCoverageIndex({}))
+                shard_pool.join_methods(sharded_join, snapshot.method_coverage, db_coverage, method_ids)
+            self.assertTrue(index_dir.joinpath('start_lines.npy').exists())
+        self.assertEqual(json.dumps(sharded_join.get_coverage_dict()), json.dumps(coverage_join.get_coverage_dict()))
+
+    def test_shared_index(self):
+        analysis_index = AnalysisIndex.from_analysis(self.analysis)
+        with tempfile.TemporaryDirectory() as temporary_directory:
+            SharedShardIndex.save(analysis_index, temporary_directory)
+            shared_index = SharedShardIndex.load(temporary_directory)
+            self.assertTrue(all(isinstance(array, np.memmap) for array in shared_index.arrays.values()))
+            call_graph = analysis_index.call_graph
+            for method_id, method in enumerate(call_graph.methods):
+                self.assertEqual(shared_index.get_method(method_id),
+                                 (*method, call_graph.start_lines[method_id], call_graph.end_lines[method_id]))
+            classes = list(analysis_index.db_lines.methods_by_class)[::2] + ['app.Missing']
+            self.assertEqual(shared_index.get_db_line_index(classes).methods_by_class,
+                             {klazz: analysis_index.db_lines.methods_by_class[klazz] for klazz in classes[:-1]})
+            del shared_index
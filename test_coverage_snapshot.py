@@ -0,0 +1,55 @@
+import contextlib
+import io
+import socket
+from json import JSONDecodeError
+from unittest import TestCase
+
+from agent_client import AgentClient
+from benchmark_coverage import StandInAgentServer, SyntheticAnalysis
+from coverage_snapshot import AgentResponseError, CoverageSnapshot
+from emb_coverage import EMBCoverage
+from test_support import AGENT_PAYLOADS
+
+
+class TestCoverageSnapshot(TestCase):
+    def setUp(self):
+        self.agent = StandInAgentServer(dict(AGENT_PAYLOADS))
+        self.client = AgentClient(self.agent.port, host=self.agent.host, timeout=2.0)
+
+    def tearDown(self):
+        self.client.close()
+        self.agent.close()
+
+    def test_capture(self):
+        snapshot = CoverageSnapshot.capture(self.client)
+        self.assertEqual(snapshot.app_coverage, AGENT_PAYLOADS['/appcoverage'])
+        self.assertIs(snapshot.uncovered_lines, snapshot.uncovered_lines)
+        self.assertGreaterEqual(snapshot.age(), 0.0)
+        # The stand-in agent does not serve /methodcoverage
+        self.assertEqual(snapshot.responses['/methodcoverage'][0], 404)
+        with self.assertRaises(JSONDecodeError):
+            _ = snapshot.method_coverage
+
+    def test_failed_responses(self):
+        snapshot = CoverageSnapshot({'/methodcoverage': (-100, ConnectionRefusedError()), '/uncovered': (500, '{}'),
+                                     '/appcoverage': (200, '{"app": {}}')})
+        with self.assertRaises(AgentResponseError) as context:
+            _ = snapshot.method_coverage
+        self.assertEqual(context.exception.status_code, -100)
+        with self.assertRaises(JSONDecodeError):
+            _ = snapshot.uncovered_lines
+        self.assertEqual(snapshot.app_coverage, {'app': {}})
+
+    def test_closed_port(self):
+        with socket.socket() as unused_socket:
+            unused_socket.bind(('127.0.0.1', 0))
+            port = unused_socket.getsockname()[1]
+        for shard_workers in (None, 1):
+            with EMBCoverage(SyntheticAnalysis(10, seed=1), port, agent_retries=0, shard_workers=shard_workers,
+                             agent_host='127.0.0.1') as emb_coverage:
+                output = io.StringIO()
+                with contextlib.redirect_stdout(output):
+                    self.assertIsNone(emb_coverage.get_app_coverage())
+                self.assertIn('JSON Error', output.getvalue())
+                with self.assertRaises(JSONDecodeError):
+                    emb_coverage.get_reachability_coverage()
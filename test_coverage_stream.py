@@ -0,0 +1,63 @@
+import io
+import json
+from unittest import TestCase
+
+from benchmark_coverage import SyntheticAnalysis, generate_payloads
+from coverage_snapshot import CoverageSnapshot
+from emb_coverage import EMBCoverage
+
+
+class TestCoverageStream(TestCase):
+    def setUp(self):
+        analysis = SyntheticAnalysis(40, seed=3)
+        self.snapshot = CoverageSnapshot({path: (200, payload.decode())
+                                          for path, payload in generate_payloads(analysis, seed=3).items()})
+        self.emb_coverage = EMBCoverage(analysis, 0)
+        self.coverage_dict = self.emb_coverage.get_reachability_coverage(self.snapshot)
+
+    def test_iter_by_class(self):
+        items = list(self.emb_coverage.iter_reachability_coverage(self.snapshot, group_by='class'))
+        self.assertEqual(items[-1][0], "overall_coverage")
+        self.assertEqual(json.dumps(dict(items)), json.dumps(self.coverage_dict))
+
+    def test_iter_by_endpoint(self):
+        items = list(self.emb_coverage.iter_reachability_coverage(self.snapshot))
+        self.assertEqual(len(items) - 1, len(self.emb_coverage.reachability.index.entrypoints))
+        self.assertEqual(items[-1], ("overall_coverage", self.coverage_dict["overall_coverage"]))
+        # Every method is reported once, under the first endpoint reaching it
+        methods = sorted((qualified_class_name, json.dumps(coverage)) for _, endpoint_coverage in items[:-1]
+                         for qualified_class_name, class_coverage in endpoint_coverage.items()
+                         for coverage in class_coverage)
+        self.assertEqual(methods, sorted((qualified_class_name, json.dumps(coverage))
+                                         for qualified_class_name, class_coverage in self.coverage_dict.items()
+                                         if qualified_class_name != "overall_coverage"
+                                         for coverage in class_coverage))
+        # The first endpoint is yielded before the methods reachable from the others are computed
+        index = self.emb_coverage.reachability.index
+        reachable = index.reachable
+        computed_endpoints = []
+        index.reachable = lambda endpoint, depth: computed_endpoints.append(endpoint) or reachable(endpoint, depth)
+        next(self.emb_coverage.iter_reachability_coverage(self.snapshot))
+        self.assertEqual(computed_endpoints, index.entrypoints[:1])
+        with self.assertRaises(ValueError):
+            next(self.emb_coverage.iter_reachability_coverage(self.snapshot, group_by='method'))
+
+    def test_structured(self):
+        overall_coverage = dict(self.emb_coverage.iter_reachability_coverage(
+            self.snapshot, group_by='class', structured=True))["overall_coverage"][0]
+        db_uncovered_lines = json.loads(self.coverage_dict["overall_coverage"][0]["database_uncovered_lines"])
+        self.assertGreater(len(db_uncovered_lines), 0)
+        methods = [(qualified_class_name, method_signature, lines)
+                   for qualified_class_name, methods in overall_coverage["database_uncovered_lines"].items()
+                   for method_signature, lines in methods.items()]
+        self.assertEqual(len(methods), len(db_uncovered_lines))
+        for (qualified_class_name, method_signature, lines), (key, expected_lines) in zip(
+                sorted(methods), sorted(db_uncovered_lines.items())):
+            self.assertIn(repr(qualified_class_name), key)
+            self.assertIn(repr(method_signature), key)
+            self.assertEqual(lines, expected_lines)
+
+    def test_write(self):
+        output = io.BytesIO()
+        self.emb_coverage.write_reachability_coverage(output, self.snapshot, group_by='class')
+        self.assertEqual(json.loads(output.getvalue()), self.coverage_dict)
@@ -0,0 +1,88 @@
+import csv
+import json
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+import pytest
+
+from coverage_join import DBCoverageIndex, MethodCoverageIndex, ReachabilityCoverageJoin
+from coverage_table import ColumnarCoverageJoin
+from test_support import method_coverage
+
+
+class TestCoverageTable(TestCase):
+    def setUp(self):
+        self.method_coverage = MethodCoverageIndex({
+            "app.Service": {"find:12": method_coverage(3, 4),
+                            "save:21": method_coverage(0, 2)},
+            "app.Controller": {"get:5": method_coverage(1, 3),
+                               "post:9": method_coverage(0, 0)},
+        })
+        self.db_coverage = DBCoverageIndex({
+            "app.Service": [{"method_signature": "save(Entity)", "total_db_line_count": 2,
+                             "db_line_coverage": 50.0, "db_uncovered_lines": [22]}],
+        })
+        self.methods = [("app.Controller", "get()", 5, 7), ("app.Service", "find(String)", 12, 15),
+                        ("app.Controller", "post()", 9, 10), ("app.Service", "save(Entity)", 21, 24)]
+
+    def join(self, coverage_join):
+        for method in self.methods:
+            coverage_join.add_method(*method)
+        return coverage_join
+
+    def test_to_coverage_dict(self):
+        coverage_dict = self.join(ReachabilityCoverageJoin(self.method_coverage, self.db_coverage)).get_coverage_dict()
+        coverage_table = self.join(ColumnarCoverageJoin(self.method_coverage, self.db_coverage)).get_coverage_table()
+        self.assertEqual(len(coverage_table), 4)
+        self.assertEqual(json.dumps(coverage_table.to_coverage_dict()), json.dumps(coverage_dict))
+
+    def test_get_percentages(self):
+        coverage_table = self.join(ColumnarCoverageJoin(self.method_coverage, self.db_coverage)).get_coverage_table()
+        percentages = coverage_table.get_percentages()
+        self.assertEqual(percentages["line_coverage"].tolist(), [1 / 3 * 100.0, None, 75.0, 0.0])
+        self.assertEqual(percentages["database_interaction_coverage"].count(), 1)
+
+    def test_export(self):
+        coverage_table = self.join(ColumnarCoverageJoin(self.method_coverage, self.db_coverage)).get_coverage_table()
+        with tempfile.TemporaryDirectory() as temporary_directory:
+            csv_path = Path(temporary_directory).joinpath('coverage.csv')
+            coverage_table.to_csv(csv_path)
+            with open(csv_path, newline='') as f:
+                rows = list(csv.DictReader(f))
+            self.assertEqual([row["method_signature"] for row in rows],
+                             ["get()", "post()", "find(String)", "save(Entity)"])
+            self.assertEqual(rows[1]["line_coverage"], "")
+            self.assertEqual(rows[3]["database_uncovered_lines"], "22")
+
+    def test_to_json(self):
+        coverage_dict = self.join(ReachabilityCoverageJoin(self.method_coverage, self.db_coverage)).get_coverage_dict()
+        coverage_table = self.join(ColumnarCoverageJoin(self.method_coverage, self.db_coverage)).get_coverage_table()
+        with tempfile.TemporaryDirectory() as temporary_directory:
+            json_path = Path(temporary_directory).joinpath('coverage.json')
+            coverage_table.to_json(json_path)
+            self.assertEqual(json.loads(json_path.read_text()), json.loads(json.dumps(coverage_dict)))
+
+    def test_to_parquet(self):
+        pq = pytest.importorskip('pyarrow.parquet')
+        coverage_table = self.join(ColumnarCoverageJoin(self.method_coverage, self.db_coverage)).get_coverage_table()
+        with tempfile.TemporaryDirectory() as temporary_directory:
+            parquet_path = Path(temporary_directory).joinpath('coverage.parquet')
+            coverage_table.to_parquet(parquet_path)
+            table = pq.read_table(parquet_path)
+        # Missing percentages are read back as nulls and the class names and signatures as their values
+        self.assertEqual(table.to_pydict(), coverage_table.get_columns())
+        self.assertIsNone(table.column("line_coverage")[1].as_py())
+        self.assertEqual(json.loads(table.schema.metadata[b"overall_coverage"]), coverage_table.overall_coverage)
+
+    def test_columnar_join(self):
+        db_coverage = DBCoverageIndex({
+            "app.Service": [{"method_signature": "find(String)", "total_db_line_count": 1,
+                             "db_line_coverage": 100.0, "db_uncovered_lines": []}]})
+        coverage_join = self.join(ColumnarCoverageJoin(self.method_coverage, db_coverage))
+        self.assertEqual(coverage_join.add_method("app.Controller", "get()", 5, 7), [])
+        self.assertEqual(len(coverage_join.processed_methods), 4)
+        self.assertEqual(coverage_join.get_overall_coverage(),
+                         self.join(ReachabilityCoverageJoin(self.method_coverage, db_coverage)).get_overall_coverage())
+        empty_join = ColumnarCoverageJoin(self.method_coverage, db_coverage)
+        self.assertEqual(empty_join.get_overall_coverage()["line_coverage"], -100)
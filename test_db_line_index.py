@@ -0,0 +1,44 @@
+from types import SimpleNamespace
+from unittest import TestCase
+
+from db_line_index import DBLineIndex
+from test_support import InMemoryAnalysis, java_class, java_method
+
+
+class TestDBLineIndex(TestCase):
+    def setUp(self):
+        entity_call = SimpleNamespace(receiver_type='app.Product', callee_signature='getName()', start_line=14)
+        mapper_call = SimpleNamespace(receiver_type='app.ProductMapper', callee_signature='insert(app.Product)',
+                                      start_line=15)
+        analysis = InMemoryAnalysis(
+            {
+                'app.ProductService': java_class({
+                    'save(Product)': java_method(12, 18, [entity_call, mapper_call], crud_lines=[16]),
+                    'count()': java_method(20, 22),
+                    '<init>()': java_method(8, 10, is_constructor=True),
+                }),
+                'app.Product': java_class({'getName()': java_method(5, 7)}, annotations=['@Entity']),
+                'app.ProductMapper': java_class({'insert(Product)': java_method(3, 3, annotations=['@Transactional'])},
+                                                is_interface=True),
+                'app.ProductServiceTest': java_class({'testSave()': java_method(10, 20, crud_lines=[12])}),
+            }, [])
+        self.db_line_index = DBLineIndex.from_analysis(analysis)
+
+    def test_from_analysis(self):
+        methods = {method[0]: method for method in self.db_line_index.methods_by_class['app.ProductService']}
+        self.assertEqual(set(methods), {'save(Product)', 'count()'})
+        self.assertEqual(sorted(methods['save(Product)'][3]), [14, 15, 16])
+        self.assertEqual(methods['count()'][3], ())
+
+    def test_get_db_coverage(self):
+        db_coverage = self.db_line_index.get_db_coverage({
+            'app.ProductService': {'save:13': [15, 17], 'count:21': [21], 'lambda$0:40': []},
+            'app.ProductServiceTest': {'testSave:11': [12]},
+        })
+        self.assertEqual(list(db_coverage), ['app.ProductService'])
+        save_coverage, count_coverage = db_coverage['app.ProductService']
+        self.assertEqual(save_coverage['method_signature'], 'save(Product)')
+        self.assertEqual(save_coverage['total_db_line_count'], 3)
+        self.assertEqual(save_coverage['db_uncovered_lines'], [15])
+        self.assertAlmostEqual(save_coverage['db_line_coverage'], 200.0 / 3)
+        self.assertEqual(count_coverage['db_line_coverage'], -100.0)
@@ -40,3 +40,13 @@ class TestEMBCoverage(TestCase):
             # convert application_coverage to json
             json.dump(application_coverage, f)
         self.assertIsNotNone(application_coverage)
+
+    def test_evaluate(self):
+        # Both reports from one capture of the agent
+        reachability_coverage, application_coverage = self.emb_coverage.evaluate()
+        with open('./output/reachability_coverage.json', 'w') as f:
+            json.dump(reachability_coverage, f)
+        with open('./output/application_coverage.json', 'w') as f:
+            json.dump(application_coverage, f)
+        self.assertIsNotNone(reachability_coverage)
+        self.assertIsNotNone(application_coverage)
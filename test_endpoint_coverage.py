@@ -0,0 +1,47 @@
+from unittest import TestCase
+
+from endpoint_coverage import EndpointCoverage
+from reachability_emb import EMBReachability
+from test_support import build_sample_analysis
+
+
+class TestEndpointCoverage(TestCase):
+    def setUp(self):
+        self.index = EMBReachability(build_sample_analysis()).index
+        self.endpoint_coverage = EndpointCoverage(self.index, reachability_depth=2)
+
+    def test_get_bitset(self):
+        for endpoint in self.index.entrypoints:
+            for depth in range(4):
+                reachable_methods = self.index.reachable(endpoint, depth)
+                self.assertEqual(self.endpoint_coverage.get_method_ids(self.endpoint_coverage.get_bitset(
+                    reachable_methods)).tolist(), sorted(reachable_methods))
+        for endpoint_position, endpoint in enumerate(self.index.entrypoints):
+            method_ids = self.endpoint_coverage.get_endpoint_method_ids(endpoint_position)
+            self.assertEqual(method_ids.tolist(), sorted(self.index.reachable(endpoint, 2)))
+            self.assertIs(self.endpoint_coverage.get_endpoint_method_ids(endpoint_position), method_ids)
+        self.assertEqual(self.endpoint_coverage.get_method_ids(0).tolist(), [])
+        self.assertEqual(self.endpoint_coverage.get_bitset([]), 0)
+        self.assertEqual(self.endpoint_coverage.get_bitset([0, 2]), 0b101)
+
+    def test_get_exclusive_methods(self):
+        self.assertEqual(self.endpoint_coverage.get_exclusive_methods(0), [('app.ServiceImpl', 'find(String)')])
+        self.assertEqual(self.endpoint_coverage.get_exclusive_methods(1), [('app.Controller', 'post()')])
+        self.assertEqual(self.endpoint_coverage.get_method_signatures(self.endpoint_coverage.shared_methods),
+                         [('app.Controller', 'get(String)')])
+
+    def test_get_coverage_dict(self):
+        coverage_dict = self.endpoint_coverage.get_coverage_dict({
+            ('app.Controller', 'get(String)'): (2, 4, 1, 2, 4, 8, 0, 0),
+            ('app.ServiceImpl', 'find(String)'): (0, 3, 0, 0, 0, 6, 1, 2),
+            ('app.Repository', 'query()'): (4, 4, 0, 0, 8, 8, 0, 0)})
+        get, post = coverage_dict['app.Controller']
+        self.assertEqual(get["line_coverage"], 2 / 7 * 100.0)
+        self.assertEqual(get["database_interaction_coverage"], 50.0)
+        self.assertEqual((get["reachable_methods"], get["shared_methods"], get["exclusive_methods"]), (2, 1, 1))
+        self.assertEqual(post["line_coverage"], 50.0)
+        self.assertEqual(post["database_interaction_coverage"], -100.0)
+        overall_coverage = coverage_dict["overall_coverage"][0]
+        # Repository.query() is not reachable within depth 2
+        self.assertEqual(overall_coverage["line_coverage"], 2 / 7 * 100.0)
+        self.assertEqual(overall_coverage["reachable_methods"], 3)
@@ -0,0 +1,60 @@
+import json
+import pickle
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+from coverage_snapshot import CoverageSnapshot
+from line_coverage_store import STORE_FORMAT_VERSION, LineCoverageStore, to_bitmap, to_lines
+
+
+def create_snapshot(method_coverage, uncovered_lines):
+    return CoverageSnapshot({"/methodcoverage": (200, json.dumps(method_coverage)),
+                             "/uncovered": (200, json.dumps(uncovered_lines)),
+                             "/appcoverage": (200, '{}')})
+
+
+class TestLineCoverageStore(TestCase):
+    def setUp(self):
+        self.before = LineCoverageStore.from_snapshot(create_snapshot(
+            {"app.Service": {"find:12": {"coveredLines": 0}, "save:21": {"coveredLines": 2}},
+             "app.Old": {"run:3": {"coveredLines": 1}}},
+            {"app.Service": {"find:12": [12, 13, 14], "save:21": [23]}, "app.Old": {"run:3": []}}))
+        self.after = LineCoverageStore.from_snapshot(create_snapshot(
+            {"app.Service": {"find:12": {"coveredLines": 2}, "save:21": {"coveredLines": 0}},
+             "app.New": {"get:5": {"coveredLines": 1}}},
+            {"app.Service": {"find:12": [14], "save:21": [21, 22, 23]}, "app.New": {"get:5": [6]}}))
+
+    def test_bitmap(self):
+        self.assertEqual(to_lines(to_bitmap([0, 7, 8, 1000])), [0, 7, 8, 1000])
+        self.assertEqual(to_lines(to_bitmap([])), [])
+
+    def test_membership(self):
+        self.assertTrue(self.before.is_uncovered("app.Service", 13))
+        self.assertFalse(self.before.is_uncovered("app.Service", 21))
+        self.assertFalse(self.before.is_uncovered("app.Service", 5000))
+        self.assertFalse(self.before.is_uncovered("app.Missing", 13))
+        self.assertTrue(self.before.is_method_covered("app.Service", 21))
+        self.assertEqual(self.after.get_uncovered_lines("app.Service"), [14, 21, 22, 23])
+
+    def test_diff(self):
+        diff = self.before.diff(self.after)
+        self.assertEqual(diff["newly_covered_lines"], {"app.Service": [12, 13]})
+        self.assertEqual(diff["lost_lines"], {"app.Service": [21, 22]})
+        self.assertEqual(diff["newly_covered_methods"], {"app.Service": ["find:12"]})
+        self.assertEqual(diff["lost_methods"], {"app.Service": ["save:21"]})
+        self.assertEqual((diff["added_classes"], diff["removed_classes"]), (["app.New"], ["app.Old"]))
+
+    def test_save_load(self):
+        with tempfile.TemporaryDirectory() as temporary_directory:
+            path = Path(temporary_directory).joinpath('seed_100.lines')
+            self.before.save(path)
+            loaded = LineCoverageStore.load(path)
+            path.write_bytes(b'corrupt')
+            self.assertIsNone(LineCoverageStore.load(path))
+            # Pickled files are never loaded
+            path.write_bytes(pickle.dumps({"version": STORE_FORMAT_VERSION}))
+            self.assertIsNone(LineCoverageStore.load(path))
+        self.assertEqual((loaded.classes, loaded.method_names), (self.before.classes, self.before.method_names))
+        self.assertEqual(loaded.diff(self.after), self.before.diff(self.after))
+        self.assertEqual(self.before.diff(loaded)["newly_covered_lines"], {})
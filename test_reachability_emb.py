@@ -0,0 +1,81 @@
+from types import SimpleNamespace
+from unittest import TestCase
+
+from reachability_emb import EMBReachability
+from test_support import build_sample_analysis, java_class, java_method
+
+
+class TestEMBReachability(TestCase):
+    def setUp(self):
+        self.analysis = build_sample_analysis()
+        self.reachability = EMBReachability(self.analysis)
+
+    def test_get_reachable_methods(self):
+        reachable_methods = self.reachability.get_reachable_methods('app.Controller', 'get(String)', depth=3)
+        self.assertEqual([(method['qualified_class_name'], method['method_signature'])
+                          for method in reachable_methods],
+                         [('app.Controller', 'get(String)'), ('app.ServiceImpl', 'find(String)'),
+                          ('app.ServiceImpl', 'load()')])
+        self.assertEqual(reachable_methods[1]['start_line'], 5)
+
+    def test_get_reachable_methods_depth(self):
+        self.assertEqual(len(self.reachability.get_reachable_methods('app.Controller', 'post()', depth=1)), 1)
+        self.assertEqual(len(self.reachability.get_reachable_methods('app.Controller', 'post()', depth=5)), 5)
+        self.assertEqual(self.reachability.get_reachable_methods('app.Controller', 'post()', depth=0), [])
+
+    def test_get_reachable_methods_unknown_method(self):
+        self.assertEqual(self.reachability.get_reachable_methods('app.Controller', 'missing()'), [])
+
+    def test_entrypoints(self):
+        index = self.reachability.index
+        self.assertEqual([index.methods[endpoint] for endpoint in index.entrypoints],
+                         [('app.Controller', 'get(String)'), ('app.Controller', 'post()')])
+
+    def test_get_concrete_classes_transitive(self):
+        self.analysis.classes['app.CachedService'] = java_class({}, is_interface=True, extends_list=['app.Service'])
+        self.analysis.classes['app.AbstractCache'] = java_class({}, implements_list=['app.CachedService'],
+                                                                modifiers=['public', 'abstract'])
+        self.analysis.classes['app.MemoryCache'] = java_class({}, extends_list=['app.AbstractCache'])
+        reachability = EMBReachability(self.analysis)
+        self.assertEqual(reachability.get_concrete_classes('app.Service'), ['app.ServiceImpl', 'app.MemoryCache'])
+        self.assertEqual(reachability.get_concrete_classes('app.AbstractCache'), ['app.MemoryCache'])
+        self.assertEqual(reachability.get_concrete_classes('app.Repository'), [])
+
+    def test_callees_after_interface_dispatch(self):
+        # The callees of a method are its own, even if it shares a signature dispatched through an interface with
+        # another method of its class
+        self.analysis.classes['app.Controller'].callable_declarations['find(String)'] = java_method(22, 24)
+        self.analysis.classes['app.Audit'] = java_class({'log()': java_method(2, 4)})
+        self.analysis.call_graph.add_edge(('get(String)', 'app.Controller'), ('query()', 'app.Repository'))
+        self.analysis.call_graph.add_edge(('find(String)', 'app.Controller'), ('log()', 'app.Audit'))
+        reachability = EMBReachability(self.analysis)
+        reachable_methods = reachability.get_reachable_methods('app.Controller', 'get(String)', depth=2)
+        self.assertEqual([(method['qualified_class_name'], method['method_signature'])
+                          for method in reachable_methods],
+                         [('app.Controller', 'get(String)'), ('app.ServiceImpl', 'find(String)'),
+                          ('app.Repository', 'query()')])
+
+    def test_abstract_receiver_dispatch(self):
+        audit_call = SimpleNamespace(receiver_type='app.AbstractAudit', callee_signature='log()', start_line=8)
+        self.analysis.classes['app.ServiceImpl'].callable_declarations['find(String)'].call_sites.append(audit_call)
+        self.analysis.classes['app.AbstractAudit'] = java_class({'log()': java_method(2, 3)},
+                                                                modifiers=['public', 'abstract'])
+        self.analysis.classes['app.FileAudit'] = java_class({'log()': java_method(4, 7)},
+                                                            extends_list=['app.AbstractAudit'])
+        reachability = EMBReachability(self.analysis)
+        reachable_methods = reachability.get_reachable_methods('app.ServiceImpl', 'find(String)', depth=2)
+        self.assertEqual([(method['qualified_class_name'], method['method_signature'])
+                          for method in reachable_methods],
+                         [('app.ServiceImpl', 'find(String)'), ('app.FileAudit', 'log()'),
+                          ('app.ServiceImpl', 'load()')])
+
+    def test_constructor_source(self):
+        # Constructors are declared as <init>(...) but the call graph may name them after their class
+        self.analysis.classes['app.Repository'].callable_declarations['<init>(String)'] = java_method(
+            1, 2, is_constructor=True)
+        self.analysis.call_graph.add_edge(('Repository(String)', 'app.Repository'), ('query()', 'app.Repository'))
+        reachability = EMBReachability(self.analysis)
+        reachable_methods = reachability.get_reachable_methods('app.Repository', 'Repository(String)', depth=2)
+        self.assertEqual([(method['qualified_class_name'], method['method_signature'])
+                          for method in reachable_methods],
+                         [('app.Repository', '<init>(String)'), ('app.Repository', 'query()')])
@@ -0,0 +1,108 @@
+"""
+Fixtures shared by the tests: a stand-in for the CLDK analysis with a sample application, the analysis.json layout
+read by the lenient loader, and agent payload entries for the StandInAgentServer of benchmark_coverage
+"""
+from types import SimpleNamespace
+
+import networkx as nx
+
+
+def java_method(start_line, end_line, call_sites=(), is_entrypoint=False, is_constructor=False, annotations=(),
+                crud_lines=()):
+    return SimpleNamespace(start_line=start_line, end_line=end_line, call_sites=list(call_sites),
+                           is_entrypoint=is_entrypoint, is_constructor=is_constructor, declaration='', code='',
+                           accessed_fields=[], annotations=list(annotations),
+                           crud_operations=[SimpleNamespace(line_number=line) for line in crud_lines])
+
+
+def java_class(methods, is_interface=False, implements_list=(), extends_list=(), modifiers=('public',),
+               annotations=()):
+    return SimpleNamespace(callable_declarations=methods, is_interface=is_interface,
+                           implements_list=list(implements_list), extends_list=list(extends_list),
+                           modifiers=list(modifiers), annotations=list(annotations))
+
+
+class InMemoryAnalysis:
+    """Minimal stand-in for the parts of JavaAnalysis used by the reachability"""
+
+    def __init__(self, classes, call_edges):
+        self.classes = classes
+        self.call_graph = nx.DiGraph()
+        for (source_class, source_method), (target_class, target_method) in call_edges:
+            self.call_graph.add_edge((source_method, source_class), (target_method, target_class))
+
+    def get_classes(self):
+        return self.classes
+
+    def get_class(self, qualified_class_name):
+        return self.classes.get(qualified_class_name)
+
+    def get_method(self, qualified_class_name, qualified_method_name):
+        return self.classes[qualified_class_name].callable_declarations.get(qualified_method_name)
+
+    def get_methods_in_class(self, qualified_class_name):
+        return self.classes[qualified_class_name].callable_declarations
+
+    def get_call_graph(self):
+        return self.call_graph
+
+
+def build_sample_analysis():
+    service_call = SimpleNamespace(receiver_type='app.Service', callee_signature='find(java.lang.String)',
+                                   start_line=12)
+    return InMemoryAnalysis(
+        {
+            'app.Controller': java_class({'get(String)': java_method(10, 14, [service_call], True),
+                                          'post()': java_method(16, 20, [], True)}),
+            'app.Service': java_class({'find(String)': java_method(1, 1)}, is_interface=True),
+            'app.ServiceImpl': java_class({'find(String)': java_method(5, 9),
+                                           'load()': java_method(11, 13)},
+                                          implements_list=['app.Service']),
+            'app.Repository': java_class({'query()': java_method(3, 6)}),
+        },
+        [(('app.Controller', 'post()'), ('app.Controller', 'get(String)')),
+         (('app.ServiceImpl', 'find(String)'), ('app.ServiceImpl', 'load()')),
+         (('app.ServiceImpl', 'load()'), ('app.Repository', 'query()'))])
+
+
+def edge(source_class, source_signature, target_class, target_signature, edge_type):
+    return {"source_kind": "NORMAL", "destination_kind": "METHOD_ENTRY", "type": edge_type, "weight": "1",
+            "source": {"file_path": "", "type_declaration": source_class, "signature": source_signature,
+                       "callable_declaration": source_signature},
+            "target": {"file_path": "", "type_declaration": target_class, "signature": target_signature,
+                       "callable_declaration": target_signature}}
+
+
+def callable_declaration(signature, start_line, end_line, call_sites=(), is_entrypoint=False, code=''):
+    return {"signature": signature, "is_constructor": False, "is_entrypoint": is_entrypoint, "annotations": [],
+            "declaration": f"public void {signature}", "code": code, "start_line": start_line,
+            "end_line": end_line, "accessed_fields": [], "crud_operations": None,
+            "call_sites": [{"receiver_type": receiver_type, "callee_signature": callee_signature,
+                            "start_line": line} for receiver_type, callee_signature, line in call_sites]}
+
+
+def type_declaration(callable_declarations, is_interface=False, implements_list=None):
+    return {"is_interface": is_interface, "modifiers": ["public"], "implements_list": implements_list,
+            "extends_list": [], "annotations": [],
+            "callable_declarations": {declaration["signature"]: declaration
+                                      for declaration in callable_declarations}}
+
+
+SYMBOL_TABLE = {
+    "Controller.java": {"type_declarations": {"app.Controller": type_declaration(
+        [callable_declaration("get(String)", 10, 14, [("app.Service", "find(java.lang.String)", 12)], True,
+                              'say("Colômbia");')])}},
+    "Service.java": {"type_declarations": {
+        "app.Service": type_declaration([callable_declaration("find(String)", 1, 1)], is_interface=True),
+        "app.ServiceImpl": type_declaration([callable_declaration("find(String)", 5, 9)],
+                                            implements_list=["app.Service"])}}}
+
+
+def method_coverage(covered_lines, total_lines):
+    return {"totalLines": total_lines, "coveredLines": covered_lines, "totalBranches": 0,
+            "fullyCoveredBranches": 0, "totalInsts": total_lines * 2, "coveredInsts": covered_lines * 2}
+
+
+# Payloads of an agent that answers /appcoverage and /uncovered but not /methodcoverage
+AGENT_PAYLOADS = {'/appcoverage': {'app': {'line': 50.0, 'branch': 25.0, 'instruction': 75.0}},
+                  '/uncovered': {'app.Service': {'find:12': [13, 14]}}}
@@ -0,0 +1,75 @@
+from typing import TYPE_CHECKING, Dict, List
+
+if TYPE_CHECKING:
+    from cldk.analysis.java import JavaAnalysis
+
+
+class TypeHierarchyIndex:
+    """
+    Maps every interface and abstract class of the application to the concrete classes implementing it, following
+    implements and extends chains transitively. Built once per analysis.
+    """
+
+    def __init__(self, implementors: Dict[str, List[str]]):
+        self.implementors = implementors
+
+    @classmethod
+    def from_analysis(cls, analysis: 'JavaAnalysis') -> 'TypeHierarchyIndex':
+        """
+        Builds the index from the classes of the analysis
+        Args:
+            analysis: CLDK analysis of the application
+
+        Returns:
+            TypeHierarchyIndex: type hierarchy index
+        """
+        all_classes_in_application = analysis.get_classes()
+        supertypes: Dict[str, List[str]] = {}
+        concrete_classes = []
+        for klazz in all_classes_in_application:
+            class_details = all_classes_in_application[klazz]
+            if class_details is None:
+                continue
+            supertypes[klazz] = list(class_details.implements_list or []) + list(class_details.extends_list or [])
+            if hasattr(class_details, 'is_interface') and hasattr(class_details, 'modifiers'):
+                if class_details.is_interface is not None and class_details.modifiers is not None:
+                    if not class_details.is_interface and 'abstract' not in class_details.modifiers:
+                        concrete_classes.append(klazz)
+
+        implementors: Dict[str, List[str]] = {}
+        for concrete_class in concrete_classes:
+            for supertype in cls.__get_ancestors(concrete_class, supertypes):
+                implementors.setdefault(supertype, []).append(concrete_class)
+        return cls(implementors)
+
+    def concrete_classes(self, type_name: str) -> List[str]:
+        """
+        Returns the concrete classes that implement or extend the given interface or abstract class
+        Args:
+            type_name:
+
+        Returns:
+            List[str]: List of concrete classes
+        """
+        return self.implementors.get(type_name, [])
+
+    @staticmethod
+    def __get_ancestors(klazz: str, supertypes: Dict[str, List[str]]) -> List[str]:
+        """
+        Collects all the interfaces and classes the given class implements or extends, directly or transitively
+        Args:
+            klazz:
+            supertypes: direct supertypes of every class in the application
+
+        Returns:
+            List[str]: ancestors of the class
+        """
+        ancestors = {}
+        pending = list(supertypes.get(klazz, []))
+        while pending:
+            supertype = pending.pop()
+            if supertype in ancestors or supertype == klazz:
+                continue
+            ancestors[supertype] = None
+            pending.extend(supertypes.get(supertype, []))
+        return list(ancestors)